@@ -1,21 +1,34 @@
 from datetime import timedelta, datetime, timezone, date
 from typing import Optional, Dict, Any
-from sqlalchemy import func
+from sqlalchemy import insert
 from jose import jwt
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 import models
 import config
-from account import account_schema, account_router
+from database import AsyncCrud, run_db
+from account import account_schema, account_router, identity, nutrition_rollup, passwords
 from fastapi import HTTPException, status, Response,Request
 
 from models import UserEatenFood
+from utils import timeutil
 
-pwd_context = CryptContext(schemes = ["bcrypt"], deprecated="auto")
+# AsyncSession용: await account_crud.aio.get_user_profile(db=async_db, user_no=...)
+aio = AsyncCrud(__name__)
 
 
 def get_calories(db: Session, user_no: int):
-    db.query(models.DailyRecommendation).filter(models.DailyRecommendation.user_no == user_no).first()
+    """오늘(NUTRITION_ROLLUP_TIMEZONE 기준) 먹은 총 칼로리/탄단지. UserDailyNutrition 한 행만 읽습니다."""
+    today = nutrition_rollup.summarize(db, user_no, "day")
+    total = today["total"]
+    return {
+        "date": today["start"],
+        "total_calories": total["calories"],
+        "carbs_g": total["carbs_g"],
+        "protein_g": total["protein_g"],
+        "fat_g": total["fat_g"],
+        "meal_count": total["meal_count"],
+    }
 
 def get_eaten_food_by_no(db: Session, eaten_food_no: int, user_no: int):
     return (
@@ -28,42 +41,93 @@ def get_eaten_food_by_no(db: Session, eaten_food_no: int, user_no: int):
     )
 
 
-def create_eaten_food_record(db: Session, user_no: int, image_url: str, nutrition_data: dict):
+def _eaten_food_values(user_no: int, image_url: str, nutrition_data: dict) -> dict:
     food_items = nutrition_data.get("items", {})
     food_name_list = [item.get("name_ko", "알수없음") for item in food_items.values()]
     food_name = ", ".join(food_name_list)
 
     total_nutrition = nutrition_data.get("total", {})
 
-    db_eaten_food = models.UserEatenFood(
+    return dict(
         user_no=user_no,
         image_url=image_url,
         food_name=food_name,
         calories=total_nutrition.get("kcal", 0),
         carbs_g=total_nutrition.get("carb_g", 0),
         protein_g=total_nutrition.get("protein_g", 0),
-        fat_g=total_nutrition.get("fat_g", 0)
+        fat_g=total_nutrition.get("fat_g", 0),
+        created_at=timeutil.db_now()
     )
-    db.add(db_eaten_food)
-    db.commit()
+
+def create_eaten_food_record(db: Session, user_no: int, image_url: str, nutrition_data: dict):
+    values = _eaten_food_values(user_no, image_url, nutrition_data)
+    db_eaten_food = models.UserEatenFood(**values)
+    try:
+        db.add(db_eaten_food)
+        nutrition_rollup.add_eaten_foods(db, user_no, [values])  # 하루 합계도 같은 트랜잭션에서
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_eaten_food)
     return db_eaten_food
 
-def get_user_eaten_foods(db: Session, user_no : int, target_date: date):
+def create_eaten_food_records(db: Session, user_no: int, records: list) -> list:
+    """
+    여러 장의 분석 결과를 한 번의 multi-row INSERT ... RETURNING 으로 저장합니다.
+    records: [(image_url, nutrition_data), ...] → 같은 순서의 no 리스트 반환
+    """
+    rows = [_eaten_food_values(user_no, image_url, data) for image_url, data in records]
+    if not rows:
+        return []
+    try:
+        nos = db.scalars(
+            insert(models.UserEatenFood).returning(models.UserEatenFood.no, sort_by_parameter_order=True),
+            rows
+        ).all()
+        nutrition_rollup.add_eaten_foods(db, user_no, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return list(nos)
+
+def get_user_eaten_foods_between(db: Session, user_no: int, start: datetime, end: datetime):
+    """created_at이 [start, end) 인 기록. 컬럼을 그대로 비교하므로 (user_no, created_at) 인덱스를 탑니다."""
     return (db.query(models.UserEatenFood)
             .filter(
         models.UserEatenFood.user_no == user_no,
-        func.date(models.UserEatenFood.created_at) == target_date
+        models.UserEatenFood.created_at >= start,
+        models.UserEatenFood.created_at < end
     )
-    .order_by(models.UserEatenFood.no.asc()).all())
+    .order_by(models.UserEatenFood.created_at.asc(), models.UserEatenFood.no.asc()).all())
+
+def get_user_eaten_foods_page(db: Session, user_no: int, after_no: Optional[int], limit: int,
+                              start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+    """no 내림차순(최신 먼저)으로 after_no보다 작은 기록 limit + 1 개. start/end는 created_at [start, end) 필터."""
+    query = db.query(models.UserEatenFood).filter(models.UserEatenFood.user_no == user_no)
+    if after_no is not None:
+        query = query.filter(models.UserEatenFood.no < after_no)
+    if start is not None:
+        query = query.filter(models.UserEatenFood.created_at >= start)
+    if end is not None:
+        query = query.filter(models.UserEatenFood.created_at < end)
+    return query.order_by(models.UserEatenFood.no.desc()).limit(limit + 1).all()
+
+def get_user_eaten_foods(db: Session, user_no : int, target_date: date, tz: Optional[str] = None):
+    """사용자 시간대(tz) 기준 target_date 하루 동안 먹은 음식."""
+    start, end = timeutil.local_day_bounds(target_date, tz)
+    return get_user_eaten_foods_between(db, user_no, start, end)
 
 
 def update_user_profile(db: Session,
                         user_no : int,
-                        data: account_schema.UserProfileUpdate
+                        data: account_schema.UserProfileUpdate,
+                        db_user: Optional[models.User] = None
                         ):
 
-    db_user = get_user_data_from_no(user_no, db)
+    if db_user is None:
+        db_user = get_user_data_from_no(user_no, db)
 
     if not db_user:
         return None
@@ -96,6 +160,7 @@ def update_user_profile(db: Session,
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    identity.invalidate_user(user_no)
 
     return db_user
 
@@ -123,9 +188,9 @@ def get_user_data_from_no(user_no: int, db: Session):
 def get_user_data_from_email(email: str, db: Session):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(new_user: account_schema.CreateUserForm, db: Session):
-    db_user = get_user_data_from_id(new_user.id, db)
-    db_email = get_user_data_from_email(new_user.email, db)
+async def create_user(new_user: account_schema.CreateUserForm, db: AsyncSession):
+    db_user = await aio.get_user_data_from_id(new_user.id, db=db)
+    db_email = await aio.get_user_data_from_email(new_user.email, db=db)
 
     if db_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="id is already exists")
@@ -137,18 +202,14 @@ def create_user(new_user: account_schema.CreateUserForm, db: Session):
         user_name = new_user.username,
         user_id = new_user.id,
         email = new_user.email,
-        hashed_password = pwd_context.hash(new_user.password),
+        hashed_password = await passwords.hash_password(new_user.password),
 
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_db(db, Session.commit)
 
     return {"message" : "Signup successful"}
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -177,15 +238,19 @@ def decode_access_token(token: str):
             detail="Invalid token"
         )
 
-def login(response : Response, login_form : account_schema.LoginForm, db: Session):
-    db_user = get_user_data_from_id(login_form.id, db)
+async def login(response : Response, login_form : account_schema.LoginForm, db: AsyncSession):
+    db_user = await aio.get_user_data_from_id(login_form.id, db=db)
     if not db_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid username or password")
 
 
-    res = verify_password(login_form.password, db_user.hashed_password)
+    res, new_hash = await passwords.verify_and_update(login_form.password, db_user.hashed_password)
     if not res:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid username or password")
+    if new_hash:
+        # BCRYPT_ROUNDS가 바뀐 뒤 처음 로그인: 새 비용으로 다시 저장
+        db_user.hashed_password = new_hash
+        await run_db(db, Session.commit)
 
     access_token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(data = {"user_no": db_user.user_no}, expires_delta = access_token_expires)
@@ -201,13 +266,20 @@ def logout(response: Response, request: Request):
     if not access_token:
         raise HTTPException(status_code=400, detail="Token is not found")
     response.delete_cookie(key="access_token")
+    identity.forget_token(access_token)
 
     return {"message": "Logout successful"}
 
-def get_current_user(request: Request):
+def get_current_user(request: Request) -> identity.Identity:
+    """요청마다 한 번만 만들어 request.state.identity에 둡니다 (토큰 디코딩은 프로세스 캐시)."""
+    current = getattr(request.state, "identity", None)
+    if current is not None:
+        return current
+
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not token authenticated")
 
-    user_data = decode_access_token(token)
-    return user_data
\ No newline at end of file
+    user_data = identity.decode_cached(token, decode_access_token)
+    request.state.identity = identity.Identity(user_data)
+    return request.state.identity
\ No newline at end of file
@@ -1,44 +1,132 @@
+import asyncio
 from datetime import date
+from typing import Optional
 
 from account.account_crud import get_current_user
-from database import get_db
-from fastapi import APIRouter, Response, Request, HTTPException, status, Depends, UploadFile, File
+from database import get_async_db, get_db, get_read_db
+from fastapi import APIRouter, Response, Request, HTTPException, status, Depends, UploadFile, File, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from account import account_crud, account_schema
-from utils.s3 import upload_file_to_s3
+from account import account_crud, account_schema, nutrition_rollup
+from account.identity import Identity
+from utils.s3 import upload_bytes_to_s3_with_retry, delete_s3_object_by_url
 from api import Image
+from utils import image_cache, pagination, timeutil
+from utils.idempotency import run_idempotent, sha256_hex
+import config
 
 app = APIRouter(
     prefix="/users",
 )
 
 
-@app.get("recommended-amount/calories", description="총 칼로리 대체")
-def get_user_calories(db:Session = Depends(get_db),
+@app.get("/recommended-amount/calories", description="총 칼로리 대체")
+def get_user_calories(db:Session = Depends(get_read_db),
                       current_user: dict = Depends(account_crud.get_current_user)):
     user_no = current_user.get("user_no")
     data = account_crud.get_calories(db = db, user_no = user_no)
     total_calories = data.get("total_calories")
     return total_calories
 
+@app.get("/nutrition/{period}",
+         response_model = account_schema.NutritionSummary,
+         description="하루/주/월 섭취 합계 (period=day|week|month)")
+def get_user_nutrition(period: str,
+                       anchor: Optional[date] = None,
+                       db:Session = Depends(get_read_db),
+                       current_user: dict = Depends(account_crud.get_current_user)):
+    """anchor(기본 오늘)가 속한 기간. 날짜는 NUTRITION_ROLLUP_TIMEZONE 기준이며 UserDailyNutrition만 읽습니다."""
+    user_no = current_user.get("user_no")
+
+    try:
+        return nutrition_rollup.summarize(db, user_no, period, anchor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @app.get("/eaten-foods/today",
          response_model = list[account_schema.EatenFoodSimple],
          description="오늘 먹은 음식 전체 불러오기")
-def get_user_eaten_foods(db:Session = Depends(get_db),
+def get_user_eaten_foods(tz: Optional[str] = None,
+                         db:Session = Depends(get_read_db),
                          current_user: dict = Depends(account_crud.get_current_user)):
-
+    """tz: IANA 시간대 (예: Asia/Seoul). 없으면 DEFAULT_USER_TIMEZONE 기준 '오늘'."""
     user_no = current_user.get("user_no")
 
-    today = date.today()
-    foods = account_crud.get_user_eaten_foods(db = db, user_no = user_no, target_date = today)
+    try:
+        today = timeutil.today_in(tz)
+        foods = account_crud.get_user_eaten_foods(db = db, user_no = user_no, target_date = today, tz = tz)
+    except timeutil.InvalidTimezone as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     return foods
 
+@app.get("/eaten-foods/range",
+         response_model = list[account_schema.EatenFoodSimple],
+         description="기간별 먹은 음식 불러오기 (start~end 날짜 또는 period=day|week|month)")
+def get_user_eaten_foods_range(start: Optional[date] = None,
+                               end: Optional[date] = None,
+                               period: Optional[str] = None,
+                               anchor: Optional[date] = None,
+                               tz: Optional[str] = None,
+                               db:Session = Depends(get_read_db),
+                               current_user: dict = Depends(account_crud.get_current_user)):
+    """
+    - start / end: 사용자 시간대 기준 날짜 (둘 다 포함, end 생략 시 start 하루)
+    - period / anchor: anchor(기본 오늘)가 속한 하루/주(월요일 시작)/월
+    """
+    user_no = current_user.get("user_no")
+
+    try:
+        if period:
+            start, end = timeutil.period_days(period, anchor or timeutil.today_in(tz))
+        elif start is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start 또는 period가 필요합니다.")
+        end = end or start
+        if end < start:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end는 start보다 빠를 수 없습니다.")
+        if (end - start).days + 1 > config.EATEN_FOOD_RANGE_MAX_DAYS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"조회 기간은 최대 {config.EATEN_FOOD_RANGE_MAX_DAYS}일입니다.")
+        range_start, range_end = timeutil.local_range_bounds(start, end, tz)
+    except (ValueError, timeutil.InvalidTimezone) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return account_crud.get_user_eaten_foods_between(db = db, user_no = user_no, start = range_start, end = range_end)
+
+@app.get("/eaten-foods/history",
+         response_model = account_schema.EatenFoodPage,
+         description="먹은 음식 기록 목록 (최신순, 커서 페이지네이션)")
+def get_user_eaten_foods_history(cursor: Optional[str] = None,
+                                 limit: Optional[int] = None,
+                                 start: Optional[date] = None,
+                                 end: Optional[date] = None,
+                                 tz: Optional[str] = None,
+                                 db:Session = Depends(get_read_db),
+                                 current_user: dict = Depends(account_crud.get_current_user)):
+    """
+    - cursor: 이전 응답의 next_cursor (없으면 첫 페이지). next_cursor가 null이면 마지막 페이지입니다.
+    - start / end: 사용자 시간대(tz) 기준 날짜 필터 (둘 다 포함, 각각 생략 가능)
+    """
+    user_no = current_user.get("user_no")
+    limit = pagination.clamp_limit(limit)
+
+    try:
+        after_no = pagination.decode_cursor(cursor)
+        range_start = timeutil.local_day_bounds(start, tz)[0] if start else None
+        range_end = timeutil.local_day_bounds(end, tz)[1] if end else None
+    except (ValueError, timeutil.InvalidTimezone) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    rows = account_crud.get_user_eaten_foods_page(
+        db = db, user_no = user_no, after_no = after_no, limit = limit, start = range_start, end = range_end
+    )
+    return pagination.page(rows, limit, key=lambda food: food.no)
+
 @app.get("/eaten-foods/{eaten_food_no}",
          response_model=account_schema.EatenFoodDetail,
          description="먹은 음식 상세 정보")
 def read_eaten_food_details(
         eaten_food_no: int,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         current_user: dict = Depends(account_crud.get_current_user)
 ):
     user_no = current_user.get("user_no")
@@ -54,57 +142,212 @@ def read_eaten_food_details(
 
     return db_eaten_food
 
+def _analyze_with_cache(image_bytes: bytes, filename: str, user_no: int, detail: int = 2):
+    """
+    같은 사진이거나 이 사용자가 올린 거의 같은 사진이면 저장된 분석 결과를 재사용하고, 아니면 비전 분석을 수행합니다.
+    반환: (analysis_result, cached)
+    """
+    fingerprint = image_cache.fingerprint(image_bytes) if config.IMAGE_CACHE_ENABLED else None
+    analysis_result = (
+        image_cache.image_analysis_cache.get(fingerprint, detail=detail, user_no=user_no) if fingerprint else None
+    )
+    if analysis_result is not None:
+        return analysis_result, True
+
+    analysis_result = Image.analyze_image_bytes(
+        image_bytes=image_bytes,
+        filename=filename,
+        detail=detail
+    )
+    if fingerprint:
+        image_cache.image_analysis_cache.put(fingerprint, detail, analysis_result, user_no=user_no)
+    return analysis_result, False
+
+
 @app.post("/eaten-food-image", description= "먹은 음식 사진 올리기")
 async def upload_eaten_food_image(
+        response: Response,
         image_file: UploadFile = File(...),
-        db: Session = Depends(get_db),
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+        db: AsyncSession = Depends(get_async_db),
         current_user: dict = Depends(account_crud.get_current_user)
 ):
+    # 업로드는 한 번만 읽고, S3 업로드와 비전 분석이 같은 버퍼를 동시에 사용합니다.
     image_bytes = await image_file.read()
-
-    await image_file.seek(0)
-
     user_no = current_user.get("user_no")
-    image_url = upload_file_to_s3(file=image_file, user_no=user_no)
 
+    # 같은 Idempotency-Key로 재시도하면 분석/저장을 다시 하지 않고 처음 응답을 돌려줍니다.
+    return await run_idempotent(
+        db,
+        key=idempotency_key,
+        user_no=user_no,
+        endpoint="eaten-food-image",
+        fingerprint=sha256_hex(image_bytes),
+        handler=lambda: _save_eaten_food_image(db, user_no, image_bytes, image_file.filename, image_file.content_type),
+        response=response,
+    )
 
 
-    if not image_url:
-        return {"error": "S3 이미지 업로드에 실패했습니다."}
+async def _save_eaten_food_image(db: AsyncSession, user_no: int, image_bytes: bytes, filename: str, content_type: str):
+    # 두 작업은 서로 독립적이므로 동시에 실행 → 체감 지연 = max(업로드, 분석)
+    # - 분석 실패: 500. 이미 올라간 S3 객체는 삭제합니다.
+    # - 업로드 실패: S3_UPLOAD_RETRIES 만큼 재시도하고, 그래도 실패하면 분석 결과는 유지한 채
+    #   image_url 없이 기록을 저장합니다.
+    upload_task = asyncio.create_task(upload_bytes_to_s3_with_retry(
+        image_bytes,
+        filename=filename,
+        user_no=user_no,
+        content_type=content_type
+    ))
 
     try:
-        analysis_result = Image.analyze_image_bytes(
-            image_bytes=image_bytes,
-            filename=image_file.filename,
-            detail=2
+        analysis_result, cached = await asyncio.to_thread(
+            _analyze_with_cache, image_bytes, filename, user_no
         )
-
     except Exception as e:
         print(f"OpenAI API 호출 중 오류 발생: {e}")
+        image_url = await upload_task
+        if image_url:
+            await asyncio.to_thread(delete_s3_object_by_url, image_url)
         raise HTTPException(status_code=500, detail="이미지 영양 정보 분석에 실패했습니다.")
 
-    saved_data = account_crud.create_eaten_food_record(
+    image_url = await upload_task
+
+    saved_data = await account_crud.aio.create_eaten_food_record(
         db=db,
         user_no=user_no,
         image_url=image_url,
         nutrition_data=analysis_result
     )
 
-    return {
+    response = {
         "message": "이미지가 성공적으로 업로드 및 분석되었습니다.",
         "image_url": image_url,
         "no": saved_data.no,
-        "analysis": analysis_result
+        "analysis": analysis_result,
+        "cached": cached
+    }
+    if not image_url:
+        response["message"] = "분석 결과는 저장되었지만 S3 이미지 업로드에 실패했습니다."
+    return response
+
+
+async def _analyze_batch(images: list, user_no: int, detail: int = 2) -> list:
+    """
+    images: [(image_bytes, filename), ...] → 같은 순서의 [(analysis_result, cached, error), ...]
+    캐시를 먼저 확인하고, 남은 이미지가 BATCH_MULTI_IMAGE_MAX 장 이하이면 한 번의 다중 이미지 요청으로,
+    그보다 많거나 다중 요청이 실패하면 BATCH_ANALYSIS_CONCURRENCY 개씩 동시에 개별 분석합니다.
+    """
+    results = [None] * len(images)
+
+    fingerprints = [None] * len(images)
+    if config.IMAGE_CACHE_ENABLED:
+        fingerprints = await asyncio.gather(*[
+            asyncio.to_thread(image_cache.fingerprint, data) for data, _ in images
+        ])
+    pending = []
+    for idx, fp in enumerate(fingerprints):
+        cached = image_cache.image_analysis_cache.get(fp, detail=detail, user_no=user_no) if fp else None
+        if cached is not None:
+            results[idx] = (cached, True, None)
+        else:
+            pending.append(idx)
+
+    if 1 < len(pending) <= config.BATCH_MULTI_IMAGE_MAX:
+        try:
+            analyses = await asyncio.to_thread(
+                Image.analyze_images_bytes_multi, [images[i] for i in pending], detail=detail
+            )
+            for idx, analysis in zip(pending, analyses):
+                results[idx] = (analysis, False, None)
+            pending = []
+        except Exception as e:
+            print(f"다중 이미지 분석 실패, 개별 분석으로 전환합니다: {e}")
+
+    semaphore = asyncio.Semaphore(config.BATCH_ANALYSIS_CONCURRENCY)
+
+    async def analyze_one(idx):
+        data, filename = images[idx]
+        async with semaphore:
+            try:
+                analysis = await asyncio.to_thread(
+                    Image.analyze_image_bytes, image_bytes=data, filename=filename, detail=detail
+                )
+                results[idx] = (analysis, False, None)
+            except Exception as e:
+                print(f"OpenAI API 호출 중 오류 발생: {e}")
+                results[idx] = (None, False, "이미지 영양 정보 분석에 실패했습니다.")
+
+    await asyncio.gather(*[analyze_one(idx) for idx in pending])
+
+    for idx, fp in enumerate(fingerprints):
+        analysis, cached, error = results[idx]
+        if fp and analysis is not None and not cached:
+            image_cache.image_analysis_cache.put(fp, detail, analysis, user_no=user_no)
+    return results
+
+
+@app.post("/eaten-food-images", description="먹은 음식 사진 여러 장 한 번에 올리기")
+async def upload_eaten_food_images(
+        image_files: list[UploadFile] = File(...),
+        db: Session = Depends(get_db),
+        current_user: dict = Depends(account_crud.get_current_user)
+):
+    if len(image_files) > config.BATCH_IMAGE_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"한 번에 최대 {config.BATCH_IMAGE_MAX_FILES}장까지 올릴 수 있습니다."
+        )
+
+    user_no = current_user.get("user_no")
+    images = [(await f.read(), f.filename) for f in image_files]
+
+    # 업로드와 분석을 동시에 진행 (단건 엔드포인트와 같은 실패 처리 규칙)
+    upload_tasks = [
+        asyncio.create_task(upload_bytes_to_s3_with_retry(
+            data, filename=filename, user_no=user_no, content_type=f.content_type
+        ))
+        for (data, filename), f in zip(images, image_files)
+    ]
+    analyses = await _analyze_batch(images, user_no)
+    image_urls = await asyncio.gather(*upload_tasks)
+
+    to_save = []
+    results = []
+    for idx, ((analysis, cached, error), image_url) in enumerate(zip(analyses, image_urls)):
+        item = {"index": idx, "filename": images[idx][1], "image_url": image_url}
+        if error:
+            if image_url:
+                await asyncio.to_thread(delete_s3_object_by_url, image_url)
+            item.update(image_url=None, error=error)
+        else:
+            item.update(analysis=analysis, cached=cached)
+            to_save.append((idx, image_url, analysis))
+        results.append(item)
+
+    saved_nos = account_crud.create_eaten_food_records(
+        db=db,
+        user_no=user_no,
+        records=[(image_url, analysis) for _, image_url, analysis in to_save]
+    )
+    for (idx, _, _), no in zip(to_save, saved_nos):
+        results[idx]["no"] = no
+
+    return {
+        "message": f"{len(saved_nos)}장 저장, {len(results) - len(saved_nos)}장 실패",
+        "saved": len(saved_nos),
+        "failed": len(results) - len(saved_nos),
+        "results": results
     }
 
 
 @app.post(path="/signup", description="회원가입")
-async def signup(new_user: account_schema.CreateUserForm = Depends(), db:Session = Depends(get_db)):
-    return account_crud.create_user(new_user, db)
+async def signup(new_user: account_schema.CreateUserForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return await account_crud.create_user(new_user, db)
 
 @app.post("/login", description="로그인")
-async def login(response: Response, login_form: account_schema.LoginForm = Depends(), db: Session = Depends(get_db)):
-    return account_crud.login(response, login_form, db)
+async def login(response: Response, login_form: account_schema.LoginForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return await account_crud.login(response, login_form, db)
 
 @app.get(path="/logout", description="로그아웃")
 async def logout(response: Response, request: Request):
@@ -113,14 +356,15 @@ async def logout(response: Response, request: Request):
 @app.patch("/inital/info", description="초기 설문")
 def patch_inital_profile(data: account_schema.UserProfileUpdate,
                    db: Session = Depends(get_db),
-                   current_user: dict = Depends(account_crud.get_current_user)
+                   current_user: Identity = Depends(account_crud.get_current_user)
                    ):
     user_no = current_user.get("user_no")
 
     if user_no is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token data")
 
-    updated_user = account_crud.update_user_profile(db=db, user_no=user_no, data=data)
+    updated_user = account_crud.update_user_profile(db=db, user_no=user_no, data=data,
+                                                    db_user=current_user.user(db))
 
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -131,7 +375,7 @@ def patch_inital_profile(data: account_schema.UserProfileUpdate,
          description = "설문 정보 보기",
          response_model=account_schema.UserProfile)
 def get_profile(
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         current_user: dict = Depends(account_crud.get_current_user)
 ):
     user_no = current_user.get("user_no")
@@ -150,28 +394,26 @@ def get_profile(
          response_model=account_schema.UserInfo,
          description="개인 프로필")
 def get_my_info(
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(account_crud.get_current_user)
+        db: Session = Depends(get_read_db),
+        current_user: Identity = Depends(account_crud.get_current_user)
 ):
-    user_no = current_user.get("user_no")
-    db_user = account_crud.get_user_data_from_no(db=db, user_no=user_no)
+    db_user = current_user.snapshot(db)
 
     if not db_user:
-        raise HTTPException(status_code=status.HTTP_404_BAD_REQUEST, detail="User not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return db_user
 
 @app.get("/food-setting",
          response_model=account_schema.UserFoodSetting,
          description="음식 설정 정보")
 def get_food_setting(
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(account_crud.get_current_user)
+        db: Session = Depends(get_read_db),
+        current_user: Identity = Depends(account_crud.get_current_user)
 ):
-    user_no = current_user.get("user_no")
-    db_user = account_crud.get_user_data_from_no(db=db, user_no=user_no)
+    db_user = current_user.user(db)
 
     if not db_user:
-        raise HTTPException(status_code=status.HTTP_404_BAD_REQUEST, detail="User not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     return db_user
 
@@ -181,14 +423,16 @@ def get_food_setting(
 def update_food_setting(
         data: account_schema.UserFoodSetting,
         db: Session = Depends(get_db),
-        current_user: dict = Depends(account_crud.get_current_user)
+        current_user: Identity = Depends(account_crud.get_current_user)
 ):
     user_no = current_user.get("user_no")
     if not user_no:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    account_crud.update_user_profile(db=db, user_no=user_no, data=data)
-
-    db_user_updated = account_crud.food_setting(db, user_no=user_no)
+    # 요청에서 읽은 User를 그대로 수정해서 반환합니다 (수정 후 다시 조회하지 않음).
+    db_user_updated = account_crud.update_user_profile(db=db, user_no=user_no, data=data,
+                                                       db_user=current_user.user(db))
+    if not db_user_updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     return db_user_updated
\ No newline at end of file
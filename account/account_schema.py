@@ -13,6 +13,10 @@ class EatenFoodSimple(BaseModel):
     class Config:
         from_attributes = True
 
+class EatenFoodPage(BaseModel):
+    items: list[EatenFoodSimple]
+    next_cursor: Optional[str] = None
+
 class EatenFoodDetail(BaseModel):
     no: int
     food_name: Optional[str] = None
@@ -26,6 +30,29 @@ class EatenFoodDetail(BaseModel):
     class Config:
         from_attributes = True
 
+class NutritionDay(BaseModel):
+    day: date
+    calories: Decimal = Decimal("0")
+    carbs_g: Decimal = Decimal("0")
+    protein_g: Decimal = Decimal("0")
+    fat_g: Decimal = Decimal("0")
+    meal_count: int = 0
+
+class NutritionTotal(BaseModel):
+    calories: Decimal = Decimal("0")
+    carbs_g: Decimal = Decimal("0")
+    protein_g: Decimal = Decimal("0")
+    fat_g: Decimal = Decimal("0")
+    meal_count: int = 0
+
+class NutritionSummary(BaseModel):
+    period: str
+    start: date
+    end: date
+    timezone: str
+    total: NutritionTotal
+    days: list[NutritionDay]
+
 class EatLevel(BaseModel):
     breakfast: Optional[str] = None
     lunch: Optional[str] = None
@@ -0,0 +1,135 @@
+"""
+요청 단위 인증 사용자 (Identity) + 짧은 TTL 프로세스 캐시
+
+get_current_user가 매 요청 JWT를 디코딩하고, 핸들러가 다시 같은 Users 행을 조회하던 것을 줄입니다.
+
+- 토큰 캐시: 토큰 문자열 → 디코딩된 payload (AUTH_TOKEN_CACHE_SECONDS, 토큰 exp가 먼저 오면 그때까지)
+- 사용자 캐시: user_no → UserSnapshot (프로필 + 알레르기 이름, AUTH_USER_CACHE_SECONDS)
+  프로필을 수정하면 invalidate_user로 바로 지웁니다. 캐시는 워커 프로세스마다 따로이므로
+  다른 워커의 캐시는 TTL이 지나야 갱신됩니다 (TTL을 짧게 두는 이유).
+- Identity는 payload dict 그대로라 기존처럼 current_user.get("user_no")를 쓸 수 있고,
+  identity.user(db)는 요청 안에서 ORM User를 한 번만 읽습니다.
+
+cachetools가 없으면 프로세스 캐시 없이 요청 단위로만 재사용합니다.
+"""
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+import config
+import models
+
+# 선택적 임포트 - cachetools가 없으면 프로세스 캐시 비활성화
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+    print("경고: cachetools가 설치되지 않았습니다. 인증 사용자 캐시가 비활성화됩니다.")
+
+UserSnapshot = namedtuple("UserSnapshot", [
+    "user_no", "user_id", "user_name", "email", "gender", "age", "height", "weight",
+    "activity_level", "diet_goal", "preferred_food", "allergies",
+])
+
+_lock = threading.Lock()
+if CACHETOOLS_AVAILABLE:
+    _token_cache = TTLCache(maxsize=config.AUTH_CACHE_MAX_ENTRIES, ttl=config.AUTH_TOKEN_CACHE_SECONDS)
+    _user_cache = TTLCache(maxsize=config.AUTH_CACHE_MAX_ENTRIES, ttl=config.AUTH_USER_CACHE_SECONDS)
+else:
+    _token_cache = None
+    _user_cache = None
+
+
+def decode_cached(token: str, decode: Callable[[str], dict]) -> dict:
+    """캐시에 있고 만료 전이면 그 payload, 아니면 decode(token) 결과를 캐시에 넣고 반환합니다."""
+    if _token_cache is None:
+        return decode(token)
+    with _lock:
+        payload = _token_cache.get(token)
+    exp = payload.get("exp") if payload else None
+    if payload is not None and (exp is None or exp > time.time()):
+        return payload
+
+    payload = decode(token)
+    with _lock:
+        _token_cache[token] = payload
+    return payload
+
+
+def forget_token(token: Optional[str]) -> None:
+    if _token_cache is not None and token:
+        with _lock:
+            _token_cache.pop(token, None)
+
+
+def snapshot_of(user: models.User) -> UserSnapshot:
+    return UserSnapshot(
+        user_no=user.user_no,
+        user_id=user.user_id,
+        user_name=user.user_name,
+        email=user.email,
+        gender=user.gender,
+        age=user.age,
+        height=user.height,
+        weight=user.weight,
+        activity_level=user.activity_level,
+        diet_goal=user.diet_goal,
+        preferred_food=user.preferred_food,
+        allergies=tuple(a.allergy_name for a in user.allergies),
+    )
+
+
+def invalidate_user(user_no: int) -> None:
+    """프로필/알레르기를 바꾼 뒤 호출합니다."""
+    if _user_cache is not None:
+        with _lock:
+            _user_cache.pop(user_no, None)
+
+
+class Identity(dict):
+    """디코딩된 토큰 payload + 요청 안에서 한 번만 읽는 사용자."""
+
+    def __init__(self, payload: dict):
+        super().__init__(payload)
+        self._user = None
+        self._snapshot = None
+
+    @property
+    def user_no(self) -> Optional[int]:
+        return self.get("user_no")
+
+    def user(self, db: Session) -> Optional[models.User]:
+        """ORM User (수정이 필요한 핸들러용). 요청 안에서는 한 번만 조회합니다."""
+        if self._user is None and self.user_no is not None:
+            self._user = db.query(models.User).filter(models.User.user_no == self.user_no).first()
+        return self._user
+
+    def snapshot(self, db: Session) -> Optional[UserSnapshot]:
+        """읽기 전용 프로필 (알레르기 포함). 프로세스 캐시에 있으면 DB를 읽지 않습니다."""
+        if self._snapshot is not None or self.user_no is None:
+            return self._snapshot
+        if _user_cache is not None:
+            with _lock:
+                self._snapshot = _user_cache.get(self.user_no)
+            if self._snapshot is not None:
+                return self._snapshot
+
+        user = self._user
+        if user is None:
+            user = (
+                db.query(models.User)
+                .options(selectinload(models.User.allergies))
+                .filter(models.User.user_no == self.user_no)
+                .first()
+            )
+        if user is None:
+            return None
+        self._snapshot = snapshot_of(user)
+        if _user_cache is not None:
+            with _lock:
+                _user_cache[self.user_no] = self._snapshot
+        return self._snapshot
@@ -0,0 +1,179 @@
+"""
+유저별 하루 섭취 합계 (UserDailyNutrition)
+
+UserEatenFoods에 기록을 저장할 때 같은 트랜잭션에서 (user_no, 날짜) 행에 칼로리/탄단지/끼니 수를 더합니다.
+대시보드의 하루/주/월 조회는 원본 기록을 합산하지 않고 날짜별 합계 행 몇 개만 읽습니다.
+
+- 날짜는 NUTRITION_ROLLUP_TIMEZONE(비우면 DEFAULT_USER_TIMEZONE) 기준입니다.
+- PostgreSQL/SQLite는 INSERT ... ON CONFLICT DO UPDATE 한 문장으로 더하고, 그 외 DB는 행을 잠그고 읽어서 더합니다.
+- 합계가 원본과 어긋났으면(수동 수정, 기능 도입 전 기록 등) 원본에서 다시 만듭니다:
+  python -m account.nutrition_rollup              # 전체 사용자
+  python -m account.nutrition_rollup --user-no 12
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import config
+import models
+from utils import timeutil
+
+NUTRIENTS = ("calories", "carbs_g", "protein_g", "fat_g")
+
+
+def rollup_timezone() -> Optional[str]:
+    return config.NUTRITION_ROLLUP_TIMEZONE or None
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal("0")
+
+
+def _group_by_day(rows) -> dict:
+    """rows(created_at, calories, ... 키를 가진 dict/mapping) → {날짜: 합계 dict}"""
+    tz = rollup_timezone()
+    totals = defaultdict(lambda: dict({name: Decimal("0") for name in NUTRIENTS}, meal_count=0))
+    for row in rows:
+        day_total = totals[timeutil.local_date_of(row["created_at"], tz)]
+        for name in NUTRIENTS:
+            day_total[name] += _to_decimal(row[name])
+        day_total["meal_count"] += 1
+    return totals
+
+
+def _upsert_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def add_eaten_foods(db: Session, user_no: int, rows: list) -> None:
+    """
+    새로 저장하는 UserEatenFoods 값(dict, created_at 포함) 만큼 날짜별 합계를 더합니다.
+    커밋은 호출자가 합니다 (기록 INSERT와 같은 트랜잭션).
+    """
+    totals = _group_by_day(rows)
+    if not totals:
+        return
+    table = models.UserDailyNutrition.__table__
+    insert = _upsert_insert(db)
+
+    if insert is not None:
+        values = [dict(total, user_no=user_no, day=day) for day, total in totals.items()]
+        stmt = insert(table).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_no, table.c.day],
+            set_={
+                **{name: table.c[name] + stmt.excluded[name] for name in (*NUTRIENTS, "meal_count")},
+                "updated_at": datetime.now(),
+            },
+        )
+        db.execute(stmt)
+        return
+
+    for day, total in totals.items():
+        row = (
+            db.query(models.UserDailyNutrition)
+            .filter(models.UserDailyNutrition.user_no == user_no, models.UserDailyNutrition.day == day)
+            .with_for_update()
+            .first()
+        )
+        if row is None:
+            db.add(models.UserDailyNutrition(user_no=user_no, day=day, **total))
+            db.flush()
+            continue
+        for name, value in total.items():
+            setattr(row, name, (getattr(row, name) or 0) + value)
+
+
+def get_days(db: Session, user_no: int, first: date, last: date) -> list:
+    return (
+        db.query(models.UserDailyNutrition)
+        .filter(
+            models.UserDailyNutrition.user_no == user_no,
+            models.UserDailyNutrition.day >= first,
+            models.UserDailyNutrition.day <= last,
+        )
+        .order_by(models.UserDailyNutrition.day.asc())
+        .all()
+    )
+
+
+def summarize(db: Session, user_no: int, period: str, anchor: Optional[date] = None) -> dict:
+    """anchor(기본 오늘)가 속한 하루/주/월의 합계와 날짜별 값 (기록 없는 날은 0)."""
+    tz = rollup_timezone()
+    first, last = timeutil.period_days(period, anchor or timeutil.today_in(tz))
+    stored = {row.day: row for row in get_days(db, user_no, first, last)}
+
+    days = []
+    total = dict({name: Decimal("0") for name in NUTRIENTS}, meal_count=0)
+    for offset in range((last - first).days + 1):
+        day = first + timedelta(days=offset)
+        row = stored.get(day)
+        values = {name: (getattr(row, name) if row else 0) for name in (*NUTRIENTS, "meal_count")}
+        for name, value in values.items():
+            total[name] += value
+        days.append(dict(values, day=day))
+
+    return {
+        "period": period,
+        "start": first,
+        "end": last,
+        "timezone": tz or config.DEFAULT_USER_TIMEZONE,
+        "total": total,
+        "days": days,
+    }
+
+
+def rebuild(db: Session, user_no: Optional[int] = None) -> int:
+    """원본 UserEatenFoods에서 합계를 다시 만듭니다 (사용자마다 커밋). 다시 만든 사용자 수를 반환합니다."""
+    if user_no is not None:
+        user_nos = [user_no]
+    else:
+        user_nos = db.scalars(select(models.User.user_no).order_by(models.User.user_no)).all()
+
+    table = models.UserDailyNutrition.__table__
+    for no in user_nos:
+        rows = db.execute(
+            select(models.UserEatenFood.created_at, *[models.UserEatenFood.__table__.c[n] for n in NUTRIENTS])
+            .where(models.UserEatenFood.user_no == no)
+        ).mappings().all()
+        try:
+            db.execute(table.delete().where(table.c.user_no == no))
+            values = [dict(total, user_no=no, day=day) for day, total in _group_by_day(rows).items()]
+            if values:
+                db.execute(table.insert(), values)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return len(user_nos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild UserDailyNutrition from UserEatenFoods")
+    parser.add_argument("--user-no", type=int, help="rebuild one user only (default: all users)")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = rebuild(db, args.user_no)
+    finally:
+        db.close()
+    print(f"UserDailyNutrition: {count}명 다시 계산")
+
+
+if __name__ == "__main__":
+    main()
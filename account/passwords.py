@@ -0,0 +1,48 @@
+"""
+비밀번호 해시/검증 (bcrypt)
+
+bcrypt는 해시 한 번에 CPU 수백 ms가 드므로 async 핸들러에서 그대로 부르면 이벤트 루프 전체가 멈춥니다.
+전용 스레드 풀(PASSWORD_HASH_WORKERS, 기본 CPU 수)에서 실행합니다.
+bcrypt는 해시 중 GIL을 놓기 때문에 스레드 수만큼 코어를 나눠 씁니다.
+풀 크기가 동시에 해시할 수 있는 개수의 상한이고, 나머지는 큐에서 기다립니다.
+
+- 비용(라운드)은 BCRYPT_ROUNDS로 정합니다.
+- 저장된 해시의 라운드가 BCRYPT_ROUNDS와 다르면 로그인 성공 시 새 비용으로 다시 해시합니다 (verify_and_update).
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+import config
+
+# min/max를 현재 비용으로 고정해 두면 비용이 다른(올리든 내리든) 기존 해시는 needs_update로 잡힙니다.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=config.BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=config.PASSWORD_HASH_WORKERS or os.cpu_count() or 1,
+    thread_name_prefix="bcrypt",
+)
+
+
+async def hash_password(plain_password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.hash, plain_password)
+
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(일치 여부, 다시 저장할 새 해시 또는 None)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False)
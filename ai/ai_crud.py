@@ -1,9 +1,18 @@
+import json
+import uuid
+from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from account import account_schema, account_router
+from sqlalchemy import and_, func, insert, or_
 from sqlalchemy.orm import Session, joinedload
+import config
 import models
 from ai import ai_schema
 from sqlalchemy.orm import joinedload
+from database import AsyncCrud
+
+# AsyncSession용: await ai_crud.aio.get_pipeline_run(db=async_db, run_id=..., user_no=...)
+aio = AsyncCrud(__name__)
 
 def get_meal_kit_info(user_no: int, db: Session):
     return db.query(models.MealKit).filter_by(user_no=user_no).all()
@@ -17,64 +26,107 @@ def get_latest_recommedations_for_user(db: Session, user_no : int) -> list:
         .all()
     )
 
-def create_recommendation_from_analysis(db: Session, user_no: int, analysis_data: dict) -> models.DailyRecommendation:
-    try:
-        meal_kit_items = analysis_data.get("items", [])
-
-        total_calories = sum(item.get("calories", 0) for item in meal_kit_items)
-        total_carbs_g = sum(item.get("macros", {}).get("carb_g", 0) for item in meal_kit_items)
-        total_protein_g = sum(item.get("macros", {}).get("protein_g", 0) for item in meal_kit_items)
-        total_fat_g = sum(item.get("macros", {}).get("fat_g", 0) for item in meal_kit_items)
-
-        db_recommendation = models.DailyRecommendation(
-            user_no=user_no,
-            food_name=analysis_data.get("title", "AI 추천 식단"),
-            image_url=analysis_data.get("image_url"),
-            calories=total_calories,
-            carbs_g=total_carbs_g,
-            protein_g=total_protein_g,
-            fat_g=total_fat_g
+def get_recommendations_page(db: Session, user_no: int, after_id: Optional[int], limit: int) -> list:
+    """recommendation_id 내림차순(최신 먼저)으로 after_id보다 작은 추천 limit + 1 개."""
+    query = db.query(models.DailyRecommendation).filter(models.DailyRecommendation.user_no == user_no)
+    if after_id is not None:
+        query = query.filter(models.DailyRecommendation.recommendation_id < after_id)
+    return query.order_by(models.DailyRecommendation.recommendation_id.desc()).limit(limit + 1).all()
+
+def _recommendation_rows(user_no: int, analysis_data: dict):
+    """analysis_data → (DailyRecommendation 값, MealKit 값 목록, Recipe 값 또는 None, 재료 이름 목록)."""
+    meal_kit_items = analysis_data.get("items", [])
+
+    recommendation = dict(
+        user_no=user_no,
+        food_name=analysis_data.get("title", "AI 추천 식단"),
+        image_url=analysis_data.get("image_url"),
+        calories=sum(item.get("calories", 0) for item in meal_kit_items),
+        carbs_g=sum(item.get("macros", {}).get("carb_g", 0) for item in meal_kit_items),
+        protein_g=sum(item.get("macros", {}).get("protein_g", 0) for item in meal_kit_items),
+        fat_g=sum(item.get("macros", {}).get("fat_g", 0) for item in meal_kit_items),
+    )
+
+    meal_kits = [
+        dict(
+            meal_kit_name=item.get("name"),
+            purchase_link=item.get("purchase_link") or item.get("meal_kit_link"),
+            image_url=item.get("image_url"),
+            calories=item.get("calories"),
+            carbs_g=item.get("macros", {}).get("carb_g"),
+            protein_g=item.get("macros", {}).get("protein_g"),
+            fat_g=item.get("macros", {}).get("fat_g"),
         )
-        db.add(db_recommendation)
-        db.flush()
-
-        for item in meal_kit_items:
-            db_meal_kit = models.MealKit(
-                meal_kit_name=item.get("name"),
-                purchase_link=item.get("purchase_link") or item.get("meal_kit_link"),
-                image_url=item.get("image_url"),
-                calories=item.get("calories"),
-                carbs_g=item.get("macros", {}).get("carb_g"),
-                protein_g=item.get("macros", {}).get("protein_g"),
-                fat_g=item.get("macros", {}).get("fat_g"),
-                recommendation_id=db_recommendation.recommendation_id
-            )
-            db.add(db_meal_kit)
-
-        if "recipe" in analysis_data and analysis_data["recipe"]:
-            db_recipe = models.Recipe(
-                recipe_name=analysis_data.get("recipe_name", f"{db_recommendation.food_name} 레시피"),
-                cooking_method="\n".join(analysis_data.get("recipe", [])),
-                recipe_video_link=analysis_data.get("youtube_link"),
-                recommendation_id=db_recommendation.recommendation_id
-            )
-            db.add(db_recipe)
-            db.flush()
-
-            for item_str in analysis_data.get("ingredients", []):
-                db_ingredient = models.Ingredient(
-                    name=item_str,
-                    recipe_id=db_recipe.recipe_id
-                )
-                db.add(db_ingredient)
+        for item in meal_kit_items
+    ]
+
+    recipe, ingredients = None, []
+    if "recipe" in analysis_data and analysis_data["recipe"]:
+        recipe = dict(
+            recipe_name=analysis_data.get("recipe_name", f"{recommendation['food_name']} 레시피"),
+            cooking_method="\n".join(analysis_data.get("recipe", [])),
+            recipe_video_link=analysis_data.get("youtube_link"),
+        )
+        ingredients = list(analysis_data.get("ingredients", []))
+
+    return recommendation, meal_kits, recipe, ingredients
+
+
+def bulk_create_recommendations(db: Session, rows: list) -> list:
+    """
+    [(user_no, analysis_data), ...]를 테이블마다 multi-row INSERT 한 번씩으로 저장합니다.
+    (추천 → RETURNING id → 밀키트 / 레시피 → RETURNING id → 재료: 하루 3끼든 배치 수천 끼든 INSERT 4번)
+    커밋은 호출자가 합니다 (같은 트랜잭션에 다른 갱신을 묶을 수 있도록).
+    반환: 저장된 추천 값 dict 목록 (recommendation_id 포함, 입력 순서).
+    """
+    if not rows:
+        return []
+    parsed = [_recommendation_rows(user_no, analysis_data) for user_no, analysis_data in rows]
+    recommendations = [rec for rec, _, _, _ in parsed]
+
+    rec_ids = db.scalars(
+        insert(models.DailyRecommendation).returning(
+            models.DailyRecommendation.recommendation_id, sort_by_parameter_order=True
+        ),
+        recommendations,
+    ).all()
+
+    meal_kits, recipes, recipe_ingredients = [], [], []
+    for rec_id, (rec, kits, recipe, ingredients) in zip(rec_ids, parsed):
+        rec["recommendation_id"] = rec_id
+        meal_kits.extend(dict(kit, recommendation_id=rec_id) for kit in kits)
+        if recipe is not None:
+            recipes.append(dict(recipe, recommendation_id=rec_id))
+            recipe_ingredients.append(ingredients)
+
+    if meal_kits:
+        db.execute(insert(models.MealKit), meal_kits)
+    if recipes:
+        recipe_ids = db.scalars(
+            insert(models.Recipe).returning(models.Recipe.recipe_id, sort_by_parameter_order=True),
+            recipes,
+        ).all()
+        ingredients = [
+            {"name": name, "recipe_id": recipe_id}
+            for recipe_id, names in zip(recipe_ids, recipe_ingredients)
+            for name in names
+        ]
+        if ingredients:
+            db.execute(insert(models.Ingredient), ingredients)
+
+    return recommendations
 
-        db.commit()
-        db.refresh(db_recommendation)
-        return db_recommendation
 
-    except Exception as e:
+def create_day_recommendations(db: Session, user_no: int, meals: list) -> list:
+    """하루치(아점저) analysis_data를 한 트랜잭션으로 저장합니다. 실패하면 아무것도 남기지 않습니다."""
+    try:
+        saved = bulk_create_recommendations(db, [(user_no, meal) for meal in meals])
+        db.commit()
+        return saved
+    except Exception:
         db.rollback()
-        raise e
+        raise
+
 
 def get_recipe_for_recommendation(db: Session, recommendation_id: int) -> Optional[models.Recipe]:
 
@@ -118,4 +170,131 @@ def get_meal_kit_purchase_link(db: Session, meal_kit_id: int, user_no: int) -> O
         )
         .first()
     )
-    return purchase_link
\ No newline at end of file
+    return purchase_link
+
+
+def create_pool_entry(db: Session, segment_key: str, meals: list) -> models.RecommendationPool:
+    entry = models.RecommendationPool(
+        segment_key=segment_key,
+        meals_json=json.dumps(meals, ensure_ascii=False),
+        served_count=0,
+    )
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
+def get_pool_candidates(db: Session, segment_key: str, since: datetime, limit: int = 10) -> list:
+    """세그먼트의 유효한(since 이후 생성) 풀 항목을 적게 제공된 순서로."""
+    return (
+        db.query(models.RecommendationPool)
+        .filter(
+            models.RecommendationPool.segment_key == segment_key,
+            models.RecommendationPool.created_at >= since,
+        )
+        .order_by(models.RecommendationPool.served_count, models.RecommendationPool.pool_id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def count_pool_entries(db: Session, since: datetime) -> Dict[str, int]:
+    rows = (
+        db.query(models.RecommendationPool.segment_key, func.count(models.RecommendationPool.pool_id))
+        .filter(models.RecommendationPool.created_at >= since)
+        .group_by(models.RecommendationPool.segment_key)
+        .all()
+    )
+    return {key: count for key, count in rows}
+
+
+def mark_pool_served(db: Session, pool_id: int, commit: bool = True):
+    # 동시 요청에서도 누락 없이 세도록 DB에서 증가시킵니다.
+    # commit=False면 호출한 쪽 트랜잭션에 합류합니다 (일괄 생성 청크 저장과 함께 커밋).
+    db.query(models.RecommendationPool).filter(models.RecommendationPool.pool_id == pool_id).update(
+        {models.RecommendationPool.served_count: models.RecommendationPool.served_count + 1},
+        synchronize_session=False,
+    )
+    if commit:
+        db.commit()
+
+
+def delete_stale_pool_entries(db: Session, before: datetime) -> int:
+    deleted = (
+        db.query(models.RecommendationPool)
+        .filter(models.RecommendationPool.created_at < before)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def create_pipeline_run(db: Session, user_no: int) -> models.PipelineRun:
+    run = models.PipelineRun(run_id=uuid.uuid4().hex, user_no=user_no, status="running")
+    db.add(run)
+    db.commit()
+    return run
+
+
+def get_pipeline_run(db: Session, run_id: str, user_no: int) -> Optional[models.PipelineRun]:
+    return (
+        db.query(models.PipelineRun)
+        .filter(models.PipelineRun.run_id == run_id, models.PipelineRun.user_no == user_no)
+        .first()
+    )
+
+
+def _stale_before() -> datetime:
+    return datetime.now() - timedelta(seconds=config.PIPELINE_LOCK_TIMEOUT_SECONDS)
+
+
+def is_resumable(run: models.PipelineRun) -> bool:
+    """실패했거나, running인데 PIPELINE_LOCK_TIMEOUT_SECONDS 동안 갱신이 없는(처리하던 요청이 죽은) run."""
+    if run.status == "failed":
+        return True
+    return run.status == "running" and run.updated_at < _stale_before()
+
+
+def get_resumable_pipeline_run(db: Session, user_no: int, since: datetime) -> Optional[models.PipelineRun]:
+    """since 이후 시작해 이어서 할 수 있는(is_resumable) 가장 최근 run. 다른 요청이 처리 중인 run은 제외합니다."""
+    return (
+        db.query(models.PipelineRun)
+        .filter(
+            models.PipelineRun.user_no == user_no,
+            models.PipelineRun.created_at >= since,
+            or_(
+                models.PipelineRun.status == "failed",
+                and_(models.PipelineRun.status == "running", models.PipelineRun.updated_at < _stale_before()),
+            ),
+        )
+        .order_by(models.PipelineRun.created_at.desc())
+        .first()
+    )
+
+
+def claim_pipeline_run(db: Session, run: models.PipelineRun) -> bool:
+    """
+    조회한 뒤로 아무도 건드리지 않았을 때만 run을 running으로 가져옵니다 (조건부 UPDATE).
+    다른 요청이 먼저 가져갔으면 False.
+    """
+    claimed = (
+        db.query(models.PipelineRun)
+        .filter(
+            models.PipelineRun.run_id == run.run_id,
+            models.PipelineRun.status == run.status,
+            models.PipelineRun.updated_at == run.updated_at,
+        )
+        .update(
+            {
+                models.PipelineRun.status: "running",
+                models.PipelineRun.error: None,
+                models.PipelineRun.updated_at: datetime.now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if claimed:
+        db.refresh(run)
+    return bool(claimed)
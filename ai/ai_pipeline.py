@@ -0,0 +1,274 @@
+"""
+식단 추천 생성 파이프라인 (DB 저장 전 단계)
+
+run_generation(식단) → make_pictures_for_meals(이미지) → analyze_foods(유튜브 레시피) 결과를
+끼니별 analysis_data(ai_crud.bulk_create_recommendations 입력 형식)로 묶습니다.
+
+- run_staged_pipeline: 생성 API용. 단계(plan → ingredients → images → recipes → saved)마다 결과를
+  PipelineRuns 행에 저장하고, 실패 후 같은 run으로 재시도하면 첫 미완료 단계부터 이어서 합니다.
+  (S3 업로드나 analyze_foods가 실패해도 식단과 이미 올린 이미지는 다시 만들지 않습니다.)
+- generate_meals_for_payloads: 야간 식단 풀/일괄 생성용. 저장 없이 한 번에 끝까지 돌리고,
+  식단 후처리는 postprocess_to_full_batch로 한 번에 합니다.
+"""
+import json
+import os
+import uuid
+
+from ai import ai_crud
+from api import test4
+from api.meal_to_food import analyze_foods
+from api.meal_to_img import make_pictures_for_meals
+from api.user_to_meal import attach_coupang_search_links, generate_ingredients_for, run_generation
+from api.user_to_meal import finish_plan, generate_raw_plan, postprocess_to_full_batch
+from api.user_to_meal import payload_from_user_row
+from utils.s3 import upload_file_to_s3
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner")
+STAGES = ("plan", "ingredients", "images", "recipes", "saved")
+
+
+def user_row(user) -> dict:
+    """User ORM 객체 → payload_from_user_row 입력 형식."""
+    return {
+        "age": user.age,
+        "gender": user.gender,
+        "height": user.height,
+        "weight": user.weight,
+        "activity_level": user.activity_level,
+        "diet_goal": user.diet_goal,
+    }
+
+
+def upload_meal_image(local_image_path: str, user_no: int, save_path: str):
+    """로컬 이미지를 S3에 올리고 URL을 반환합니다. 성공하면 로컬 파일은 삭제, 실패하면 None (파일은 남김)."""
+    try:
+        with open(local_image_path, "rb") as image_file:
+            s3_image_url = upload_file_to_s3(file=image_file, user_no=user_no, save_path=save_path)
+    except Exception as s3_error:
+        print(f"S3 업로드 실패: {s3_error}")
+        return None
+    if s3_image_url:
+        # 서버에 남은 임시 이미지 파일 삭제
+        os.remove(local_image_path)
+    return s3_image_url
+
+
+def upload_meal_images(generated_image_paths: dict, user_no: int, save_path: str) -> dict:
+    """끼니별 로컬 이미지 → {끼니: S3 URL 또는 None}. 업로드에 실패해도 None으로 두고 진행합니다."""
+    image_urls = {}
+    for meal_type, local_image_path in generated_image_paths.items():
+        if local_image_path and os.path.exists(local_image_path):
+            image_urls[meal_type] = upload_meal_image(local_image_path, user_no, save_path)
+        else:
+            image_urls[meal_type] = None
+    return image_urls
+
+
+def assemble_meals(result: dict, image_urls: dict, detailed_analyses: list) -> list:
+    """식단 결과에 끼니별 이미지 URL과 대표 음식의 레시피 분석을 붙여 analysis_data 목록으로 반환합니다."""
+    meals = []
+    for meal_type in MEAL_TYPES:
+        if meal_type not in result or not isinstance(result[meal_type], dict):
+            continue
+        meal_data = result[meal_type]
+        meal_data["image_url"] = image_urls.get(meal_type)
+
+        first_item_name = (meal_data.get("items") or [{}])[0].get("name")
+        if first_item_name:
+            matched_youtube_info = next(
+                (info for info in detailed_analyses if info.get("food_name") == first_item_name),
+                None,
+            )
+            if matched_youtube_info:
+                matched_youtube_info["recipe_name"] = matched_youtube_info.get("food_name", "AI 추천 레시피")
+                meal_data.update(matched_youtube_info)
+
+        meal_data["meal_type"] = meal_type
+        meals.append(meal_data)
+    return meals
+
+
+def _make_images(plan: dict, skip=(), on_saved=None) -> dict:
+    """make_pictures_for_meals는 파일 경로를 받으므로 식단을 임시 파일로 써서 넘깁니다."""
+    os.makedirs("out", exist_ok=True)
+    plan_path = os.path.join("out", f"plan_{uuid.uuid4().hex}.json")
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False)
+    try:
+        return make_pictures_for_meals(plan_path, skip=skip, on_saved=on_saved)
+    finally:
+        os.remove(plan_path)
+
+
+def _meals_from_plan(final: dict, user_no: int, save_path: str) -> list:
+    """후처리된 식단 → 재료/이미지/레시피를 붙인 끼니별 analysis_data 목록."""
+    plan_path = os.path.join("out", f"plan_{uuid.uuid4().hex}.json")
+    result = finish_plan(final, print_pretty=False, save_pretty_file=False, out_path=plan_path)
+
+    try:
+        generated_image_paths = make_pictures_for_meals(plan_path)
+        food_names = test4.extract_foods_from_plan(plan_path)
+    finally:
+        os.remove(plan_path)
+
+    image_urls = upload_meal_images(generated_image_paths, user_no=user_no, save_path=save_path)
+    detailed_analyses = analyze_foods(food_names)
+    return assemble_meals(result, image_urls, detailed_analyses)
+
+
+def _raw_plan(user_payload: dict):
+    return generate_raw_plan(user_payload, print_pretty=False)[0]
+
+
+def _or_none(user_no: int, fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:
+        print(f"! user_no={user_no} 생성 실패: {e}")
+        return None
+
+
+def generate_meals_for_payloads(user_payloads: list, user_nos: list, save_path: str, executor=None) -> list:
+    """
+    여러 식단을 한꺼번에 만듭니다 (야간 풀/일괄 생성용).
+    LLM 호출(executor로 동시) → 식단 후처리는 postprocess_to_full_batch 한 번 → 재료/이미지/레시피(executor로 동시).
+    입력 순서대로 끼니별 analysis_data 목록, 실패한 항목은 None. executor가 없으면 순서대로 실행합니다.
+    """
+    run = executor.map if executor is not None else map
+    raws = list(run(lambda payload, user_no: _or_none(user_no, _raw_plan, payload), user_payloads, user_nos))
+
+    done = [i for i, raw in enumerate(raws) if raw is not None]
+    finals = postprocess_to_full_batch([raws[i] for i in done], [user_payloads[i] for i in done])
+
+    results = [None] * len(user_payloads)
+    meals = run(
+        lambda i, final: _or_none(user_nos[i], _meals_from_plan, final, user_nos[i], save_path),
+        done, finals,
+    )
+    for i, meal_list in zip(done, meals):
+        results[i] = meal_list
+    return results
+
+
+# =====================
+# 단계별 저장 파이프라인 (생성 API)
+# =====================
+
+def _done(run, stage: str) -> bool:
+    return run.stage is not None and STAGES.index(run.stage) >= STAGES.index(stage)
+
+
+def _save(db, run, stage: str = None, **columns):
+    for name, value in columns.items():
+        setattr(run, name, json.dumps(value, ensure_ascii=False))
+    if stage:
+        run.stage = stage
+    db.commit()
+
+
+def _summary(recommendation: dict) -> dict:
+    calories = recommendation["calories"]
+    return {
+        "food_name": recommendation["food_name"],
+        "recommendation_id": recommendation["recommendation_id"],
+        "image_url": recommendation["image_url"],
+        "calories": float(calories) if calories is not None else None,
+    }
+
+
+def run_staged_pipeline(db, run, user, save_path: str = "ai_recommendations") -> list:
+    """
+    run(PipelineRun)의 첫 미완료 단계부터 끝까지 실행하고 저장된 추천 요약 목록을 반환합니다.
+    실패하면 run을 failed로 남기고 예외를 다시 던집니다. 같은 run으로 다시 호출하면 이어서 합니다.
+    """
+    user_no = user.user_no
+    try:
+        run.status = "running"
+        run.error = None
+        db.commit()
+
+        # 1) 식단 (재료 없이)
+        if not _done(run, "plan"):
+            plan_path = os.path.join("out", f"plan_{run.run_id}.json")
+            payload = payload_from_user_row(user_row(user))
+            plan = run_generation(
+                payload, print_pretty=False, save_pretty_file=False, out_path=plan_path, with_ingredients=False
+            )
+            if os.path.exists(plan_path):
+                os.remove(plan_path)
+            if "error" in plan:
+                raise RuntimeError(f"run_generation 실패: {plan['error']}")
+            _save(db, run, "plan", plan_json=plan)
+        plan = json.loads(run.plan_json)
+
+        # 2) 재료 (음식별로 이어서 생성)
+        ingredients = json.loads(run.ingredients_json or "{}")
+        if not _done(run, "ingredients"):
+            try:
+                names = dict.fromkeys(
+                    (item.get("name") or "").strip()
+                    for meal_type in MEAL_TYPES
+                    for item in (plan.get(meal_type) or {}).get("items") or []
+                )
+                for name in names:
+                    if name and name not in ingredients:
+                        ingredients[name] = generate_ingredients_for(name)
+            finally:
+                _save(db, run, ingredients_json=ingredients)
+            _save(db, run, "ingredients")
+        for meal_type in MEAL_TYPES:
+            for item in (plan.get(meal_type) or {}).get("items") or []:
+                ings = ingredients.get((item.get("name") or "").strip())
+                if ings:
+                    item["ingredients"] = ings
+        plan = attach_coupang_search_links(plan)
+
+        # 3) 이미지 생성 → S3 업로드 (끼니마다 만들자마자 올리고 S3 URL만 저장)
+        # 로컬 경로는 이 서버에서만 의미가 있으므로 저장하지 않습니다. 다른 워커가 이어받으면
+        # 업로드까지 끝난 끼니는 건너뛰고 나머지만 다시 만듭니다.
+        images = json.loads(run.images_json or "{}")
+        if not _done(run, "images"):
+            images.pop("paths", None)  # 예전 형식(로컬 경로)은 버립니다.
+            urls = images.setdefault("urls", {})
+            pending = []
+
+            def _upload(meal_type, path):
+                url = upload_meal_image(path, user_no, save_path)
+                if url is None:
+                    pending.append(meal_type)
+                    os.remove(path)  # 다음 시도에서 다시 만듭니다.
+                    return
+                urls[meal_type] = url
+                _save(db, run, images_json=images)
+
+            paths = _make_images(plan, skip=set(urls), on_saved=_upload)
+            for meal_type, path in paths.items():
+                if path is None:
+                    urls.setdefault(meal_type, None)  # 생성에 실패한 끼니는 이미지 없이 진행
+            _save(db, run, images_json=images)
+            if pending:
+                raise RuntimeError(f"이미지 업로드 실패: {', '.join(pending)}")
+            _save(db, run, "images")
+        image_urls = images.get("urls", {})
+
+        # 4) 유튜브 레시피 추출
+        if not _done(run, "recipes"):
+            _save(db, run, "recipes", recipes_json=analyze_foods(test4.foods_from_plan(plan)))
+        detailed_analyses = json.loads(run.recipes_json)
+
+        # 5) 저장 (추천 저장과 run 완료 표시를 한 트랜잭션으로)
+        meals = assemble_meals(plan, image_urls, detailed_analyses)
+        recommendations = ai_crud.bulk_create_recommendations(db, [(user_no, meal) for meal in meals])
+        saved = [_summary(r) for r in recommendations]
+        run.result_json = json.dumps(saved, ensure_ascii=False)
+        run.stage = "saved"
+        run.status = "completed"
+        db.commit()
+        return saved
+
+    except Exception as e:
+        db.rollback()
+        run.status = "failed"
+        run.error = str(e)
+        db.commit()
+        raise
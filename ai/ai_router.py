@@ -1,18 +1,23 @@
 from sqlalchemy.sql.functions import current_user
 
 from account.account_crud import get_current_user
-from database import get_db
-from fastapi import APIRouter, Response, Request, HTTPException, status
+from database import SessionLocal, get_async_db, get_read_db, run_db
+from fastapi import APIRouter, Response, Request, HTTPException, status, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi.params import Depends
 from account import account_crud, account_schema
-from api import test4, meal_to_food
-from ai import ai_crud, ai_schema
+from account.identity import Identity
+from ai import ai_crud, ai_schema, ai_pipeline, recommendation_pool
+import config
 import models
+import asyncio
 import json
 import re
-from utils.s3 import upload_file_to_s3
-import os # os 모듈을 import 합니다 (파일 삭제용)
+from datetime import datetime, timedelta
+from typing import Optional
+from utils.idempotency import run_idempotent, sha256_hex
+from utils import pagination
 import traceback
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -24,7 +29,7 @@ app = APIRouter(
          description="가장 최근에 추천 받은 식단 목록(아점저) 가져오기",
          response_model = list[ai_schema.RecommendationSimple])
 def read_latest_recommendations(
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         current_user: dict = Depends(account_crud.get_current_user)
 ):
     user_no = current_user.get("user_no")
@@ -38,87 +43,153 @@ def read_latest_recommendations(
         return []
 
     return latest_recommendations
+
+@app.get("/recommendations/history",
+         description="추천 받은 식단 전체 목록 (최신순, 커서 페이지네이션)",
+         response_model = ai_schema.RecommendationPage)
+def read_recommendation_history(
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        db: Session = Depends(get_read_db),
+        current_user: dict = Depends(account_crud.get_current_user)
+):
+    """cursor: 이전 응답의 next_cursor (없으면 첫 페이지). next_cursor가 null이면 마지막 페이지입니다."""
+    user_no = current_user.get("user_no")
+
+    if user_no is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail = "Invalid token data")
+
+    limit = pagination.clamp_limit(limit)
+    try:
+        after_id = pagination.decode_cursor(cursor)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    rows = ai_crud.get_recommendations_page(db=db, user_no=user_no, after_id=after_id, limit=limit)
+    return pagination.page(rows, limit, key=lambda rec: rec.recommendation_id)
+
 @app.post("/generate-recommendation/food",
           description="AI 식단 추천 생성 및 분석 후 DB 저장")
 async def generate_recommendation_analyze_and_save(
         request: Request,
-        db: Session = Depends(get_db),
-        current_user: dict = Depends(account_crud.get_current_user),
+        response: Response,
+        run_id: Optional[str] = None,
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Identity = Depends(account_crud.get_current_user),
 ):
+    """
+    run_id를 주면 그 실행을 이어서 합니다(이미 완료된 실행이면 저장된 결과를 그대로 반환).
+    없으면 세그먼트 풀 → 최근 미완료 실행 이어서 하기 → 새 실행 순서로 처리합니다.
+    실패 응답의 run_id로 다시 요청하면 완료된 단계(식단/재료/이미지/레시피)는 다시 만들지 않습니다.
+    Idempotency-Key 헤더를 주면 같은 키의 중복 요청은 원래 요청의 응답을 그대로 받습니다.
+    """
     user_no = current_user.get("user_no")
-    user_data = account_crud.get_user_data_from_no(user_no, db)
-    user_id = user_data.user_id
+    return await run_idempotent(
+        db,
+        key=idempotency_key,
+        user_no=user_no,
+        endpoint="generate-recommendation/food",
+        fingerprint=sha256_hex(run_id or ""),
+        handler=lambda: _generate_recommendation(db, current_user, run_id),
+        response=response,
+    )
+
+
+def _run_pipeline_in_thread(run_id: str, user_data) -> list:
+    """LLM/이미지 생성처럼 오래 걸리는 동기 파이프라인은 스레드에서 자기 세션으로 돌립니다 (이벤트 루프를 막지 않음)."""
+    with SessionLocal() as db:
+        run = db.get(models.PipelineRun, run_id)
+        return ai_pipeline.run_staged_pipeline(db, run, user_data)
+
+
+async def _claim_or_conflict(db, run: models.PipelineRun) -> None:
+    """
+    이어서 할 run을 이 요청이 가져옵니다. 다른 요청이 처리 중이면(갱신된 지 PIPELINE_LOCK_TIMEOUT_SECONDS 이내)
+    또는 조건부 UPDATE에서 다른 요청에 밀리면 409 — 같은 run을 두 스레드가 동시에 돌리지 않게 합니다.
+    """
+    if not ai_crud.is_resumable(run) or not await run_db(db, ai_crud.claim_pipeline_run, run):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"이미 처리 중인 요청입니다 (run_id={run.run_id}). 잠시 후 다시 시도하세요.",
+        )
+
+
+async def _generate_recommendation(db: AsyncSession, current_user: Identity, run_id: Optional[str]):
+    # 프로필은 읽기만 하므로 캐시된 스냅샷(알레르기 포함)을 씁니다 → 캐시 적중 시 Users 조회 없음
+    user_no = current_user.user_no
+    user_data = await run_db(db, current_user.snapshot)
+    if user_data is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    run = None
+    if run_id:
+        run = await ai_crud.aio.get_pipeline_run(db=db, run_id=run_id, user_no=user_no)
+        if run is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pipeline run not found")
+        if run.status == "completed":
+            return {
+                "success": True,
+                "message": "식단 추천 생성 및 저장 완료 되었습니다",
+                "saved_recommendations": json.loads(run.result_json or "[]"),
+                "source": "live",
+                "run_id": run.run_id,
+            }
+        await _claim_or_conflict(db, run)
 
     try:
-        result, plan_path, food_names, generated_image_paths = test4.generate_for_user(user_id)
-        detailed_analyses = meal_to_food.analyze_foods(food_names)
-
-        base_url = str(request.base_url)
-
-        saved_recommendations = []
-
-        for meal_type in ['breakfast', 'lunch', 'dinner']:
-            if meal_type in result and isinstance(result[meal_type], dict):
-
-                meal_data = result[meal_type]
-
-                s3_image_url = None
-                # 2. 해당 끼니(meal_type)의 로컬 이미지 경로를 가져옵니다.
-                local_image_path = generated_image_paths.get(meal_type)
-
-                if local_image_path and os.path.exists(local_image_path):
-                    try:
-                        # 3. 로컬 이미지 파일을 열어서 S3에 업로드합니다.
-                        with open(local_image_path, "rb") as image_file:
-                            # 기존 S3 업로드 함수를 재활용합니다.
-                            # 이 함수는 파일 객체를 받아 S3 URL을 반환해야 합니다.
-                            s3_image_url = upload_file_to_s3(file=image_file, user_no=user_no,
-                                                             save_path="ai_recommendations")
-
-                        # 4. (선택사항) 서버에 남은 임시 이미지 파일을 삭제합니다.
-                        os.remove(local_image_path)
-
-                    except Exception as s3_error:
-                        print(f"S3 업로드 실패: {s3_error}")
-                        # 업로드에 실패해도 일단 진행하도록 s3_image_url은 None으로 둡니다.
-
-                # 5. meal_data에 최종 S3 URL을 저장합니다.
-                meal_data["image_url"] = s3_image_url
-
-                first_item_name = meal_data.get("items", [{}])[0].get("name")
-                if first_item_name:
-                    matched_youtube_info = next(
-                        (info for info in detailed_analyses if info.get('food_name') == first_item_name),
-                        None
-                    )
-                    if matched_youtube_info:
-                        matched_youtube_info["recipe_name"] = matched_youtube_info.get("food_name", "AI 추천 레시피")
-                        meal_data.update(matched_youtube_info)
-
-                saved_item = ai_crud.create_recommendation_from_analysis(
-                    db=db,
-                    user_no=user_no,
-                    analysis_data=meal_data,
-                )
-                saved_recommendations.append({
-                    "food_name": saved_item.food_name,
-                    "recommendation_id": saved_item.recommendation_id,
-                    "image_url" : saved_item.image_url,
-                    "calories" : saved_item.calories
-                })
+        if run is None:
+            # 프로필이 사전 생성 풀의 세그먼트에 속하면 바로 제공합니다.
+            meals = None
+            if config.RECOMMENDATION_POOL_ENABLED:
+                meals = await run_db(db, recommendation_pool.take_for_user, user_data)
+            if meals is not None:
+                saved = await ai_crud.aio.create_day_recommendations(db=db, user_no=user_no, meals=meals)
+                saved_recommendations = [
+                    {
+                        "food_name": rec["food_name"],
+                        "recommendation_id": rec["recommendation_id"],
+                        "image_url": rec["image_url"],
+                        "calories": rec["calories"],
+                    }
+                    for rec in saved
+                ]
+                return {
+                    "success": True,
+                    "message": "식단 추천 생성 및 저장 완료 되었습니다",
+                    "saved_recommendations": saved_recommendations,
+                    "source": "pool",
+                }
+
+            since = datetime.now() - timedelta(hours=config.PIPELINE_RESUME_HOURS)
+            run = await ai_crud.aio.get_resumable_pipeline_run(db=db, user_no=user_no, since=since)
+            if run is None:
+                # 새 run은 만들 때부터 이 요청이 running으로 잡고 있습니다.
+                run = await ai_crud.aio.create_pipeline_run(db=db, user_no=user_no)
+            else:
+                await _claim_or_conflict(db, run)
+
+        saved_recommendations = await asyncio.to_thread(_run_pipeline_in_thread, run.run_id, user_data)
 
         return {
             "success": True,
             "message": "식단 추천 생성 및 저장 완료 되었습니다",
-            "saved_recommendations": saved_recommendations
+            "saved_recommendations": saved_recommendations,
+            "source": "live",
+            "run_id": run.run_id,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
+        detail = f"처리 중 서버 오류 발생: {str(e)}"
+        if run is not None:
+            detail += f" (run_id={run.run_id}, 같은 run_id로 다시 요청하면 이어서 처리합니다)"
         raise HTTPException(
             status_code=500,
-            detail=f"처리 중 서버 오류 발생: {str(e)}"
+            detail=detail
         )
 
 
@@ -127,7 +198,7 @@ async def generate_recommendation_analyze_and_save(
          description="추천식단 id별 밀키트 조회")
 def read_meal_kit_details(
         recommendation_id: int,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         current_user: dict = Depends(account_crud.get_current_user)
 ):
     user_no = current_user.get("user_no")
@@ -147,7 +218,7 @@ def read_meal_kit_details(
 @app.get("/recommendations/{recommendation_id}/recipe",
          response_model=ai_schema.RecipeDetail,
          description="레시피 상세 정보")
-def read_recommendation_recipe(recommendation_id: int, db: Session = Depends(get_db)):
+def read_recommendation_recipe(recommendation_id: int, db: Session = Depends(get_read_db)):
 
     db_recipe = ai_crud.get_recipe_for_recommendation(db, recommendation_id=recommendation_id)
 
@@ -161,7 +232,7 @@ def read_recommendation_recipe(recommendation_id: int, db: Session = Depends(get
          description="밀키트 구매 링크")
 def get_purchase_link_for_meal_kit(
         meal_kit_id: int,
-        db:Session = Depends(get_db),
+        db:Session = Depends(get_read_db),
         current_user : dict = Depends(account_crud.get_current_user)):
 
     user_no = current_user.get("user_no")
@@ -13,6 +13,10 @@ class RecommendationSimple(BaseModel):
     class Config:
         from_attributes = True
 
+class RecommendationPage(BaseModel):
+    items: list[RecommendationSimple]
+    next_cursor: Optional[str] = None
+
 class FoodDetailPage(BaseModel):
     food_name: Optional[str] = None
     calories: Optional[Decimal] = None
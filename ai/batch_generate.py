@@ -0,0 +1,222 @@
+"""
+활성 사용자 전체 아침 식단 일괄 생성
+
+최근 BATCH_ACTIVE_DAYS 일 안에 가입했거나 먹은 음식을 기록한 사용자를 user_no 순으로
+BATCH_GENERATION_CHUNK_SIZE 명씩 읽어, 스레드 풀(BATCH_GENERATION_WORKERS)로 식단을 생성합니다.
+(LLM 호출과 이미지/레시피는 스레드 풀에서 동시에, 식단 후처리는 청크마다 postprocess_to_full_batch 한 번)
+세그먼트 풀(ai/recommendation_pool.py)에 맞는 식단이 있으면 생성 없이 그것을 씁니다.
+
+- 청크 하나가 끝나면 결과를 한 번에 저장(bulk_create_recommendations)하고,
+  같은 트랜잭션에서 체크포인트(BatchCheckpoints.last_user_no)를 그 청크의 마지막 user_no로 올립니다.
+  풀 항목 제공 횟수(served_count)와 실패한 사용자(BatchFailedUsers)도 같은 트랜잭션으로 커밋합니다.
+  중간에 죽으면 다음 실행이 마지막으로 커밋된 청크 다음부터 이어서 합니다.
+- 실패한 사용자는 체크포인트를 지나가도 BatchFailedUsers에 남아, 같은 job_key로 다시 실행하면
+  (이미 완료된 실행이어도) 먼저 다시 시도합니다.
+- 청크마다, 그리고 끝나면 처리 속도(users/min)를 출력합니다.
+
+사용법 (프로젝트 루트에서, cron 등으로 매일 아침 실행):
+  python -m ai.batch_generate
+  python -m ai.batch_generate --workers 8 --chunk-size 100
+  python -m ai.batch_generate --job-key daily_plan:2025-01-31   # 특정 실행 이어서 하기
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
+
+import config
+import models
+from ai import ai_crud, recommendation_pool
+from ai.ai_pipeline import generate_meals_for_payloads, user_row
+from api.user_to_meal import payload_from_user_row
+from database import SessionLocal
+from utils.timeutil import db_now
+
+SAVE_PATH = "ai_recommendations"
+
+
+def active_user_chunks(db, after_user_no: int, chunk_size: int, since: datetime):
+    """user_no > after_user_no인 활성 사용자를 chunk_size씩 (키셋 페이지네이션)."""
+    recently_ate = (
+        db.query(models.UserEatenFood.no)
+        .filter(
+            models.UserEatenFood.user_no == models.User.user_no,
+            models.UserEatenFood.created_at >= since,
+        )
+        .exists()
+    )
+    while True:
+        users = (
+            db.query(models.User)
+            .options(selectinload(models.User.allergies))
+            .filter(
+                models.User.user_no > after_user_no,
+                or_(models.User.created_at >= since, recently_ate),
+            )
+            .order_by(models.User.user_no)
+            .limit(chunk_size)
+            .all()
+        )
+        if not users:
+            return
+        yield users
+        after_user_no = users[-1].user_no
+
+
+def _load_checkpoint(db, job_key: str) -> models.BatchCheckpoint:
+    checkpoint = db.get(models.BatchCheckpoint, job_key)
+    if checkpoint is None:
+        checkpoint = models.BatchCheckpoint(job_key=job_key, last_user_no=0, processed=0, failed=0)
+        db.add(checkpoint)
+        db.commit()
+    return checkpoint
+
+
+def _generate_chunk(db, executor, users) -> tuple:
+    """청크 하나를 생성합니다. (저장할 [(user_no, analysis_data)], 실패한 user_no 목록) — 커밋하지 않습니다."""
+    rows, payloads, user_nos = [], [], []
+    for user in users:
+        meals = (
+            recommendation_pool.take_for_user(db, user, commit=False)
+            if config.RECOMMENDATION_POOL_ENABLED else None
+        )
+        if meals is not None:
+            rows.extend((user.user_no, meal) for meal in meals)
+            continue
+        payloads.append(payload_from_user_row(user_row(user)))
+        user_nos.append(user.user_no)
+
+    # 청크의 식단 후처리는 postprocess_to_full_batch 한 번으로 합니다.
+    failed = []
+    for user_no, meals in zip(user_nos, generate_meals_for_payloads(payloads, user_nos, SAVE_PATH, executor)):
+        if not meals:
+            failed.append(user_no)
+            continue
+        rows.extend((user_no, meal) for meal in meals)
+    return rows, failed
+
+
+def _failed_user_nos(db, job_key: str) -> list:
+    return [
+        user_no for (user_no,) in
+        db.query(models.BatchFailedUser.user_no)
+        .filter(models.BatchFailedUser.job_key == job_key)
+        .order_by(models.BatchFailedUser.user_no)
+    ]
+
+
+def _record_failures(db, job_key: str, user_nos: list, failed: list):
+    """user_nos 중 failed는 실패로 남기고(시도 횟수 +1) 나머지는 실패 목록에서 지웁니다. 커밋하지 않습니다."""
+    failed_set = set(failed)
+    resolved = [no for no in user_nos if no not in failed_set]
+    if resolved:
+        db.query(models.BatchFailedUser).filter(
+            models.BatchFailedUser.job_key == job_key,
+            models.BatchFailedUser.user_no.in_(resolved),
+        ).delete(synchronize_session=False)
+    for user_no in failed:
+        row = db.get(models.BatchFailedUser, (job_key, user_no))
+        if row is None:
+            db.add(models.BatchFailedUser(job_key=job_key, user_no=user_no, attempts=1))
+        else:
+            row.attempts += 1
+
+
+def _retry_chunks(db, user_nos: list, chunk_size: int):
+    """이전에 실패한 사용자를 chunk_size씩 다시 읽습니다. (그 사이 탈퇴한 사용자는 빠진 채로)"""
+    for i in range(0, len(user_nos), chunk_size):
+        chunk = user_nos[i:i + chunk_size]
+        users = (
+            db.query(models.User)
+            .options(selectinload(models.User.allergies))
+            .filter(models.User.user_no.in_(chunk))
+            .order_by(models.User.user_no)
+            .all()
+        )
+        yield chunk, users
+
+
+def run(job_key: str, workers: int, chunk_size: int) -> dict:
+    db = SessionLocal()
+    try:
+        checkpoint = _load_checkpoint(db, job_key)
+        retry = _failed_user_nos(db, job_key)
+        if checkpoint.finished_at is not None and not retry:
+            print(f"{job_key}: 이미 완료된 실행입니다 ({checkpoint.finished_at}).")
+            return {"job_key": job_key, "processed": checkpoint.processed, "failed": checkpoint.failed}
+        if retry:
+            print(f"{job_key}: 이전에 실패한 {len(retry)}명을 먼저 다시 시도합니다.")
+        if checkpoint.last_user_no and checkpoint.finished_at is None:
+            print(f"{job_key}: user_no {checkpoint.last_user_no} 이후부터 이어서 실행합니다.")
+
+        since = db_now() - timedelta(days=config.BATCH_ACTIVE_DAYS)
+        started = time.perf_counter()
+        done_this_run = 0
+
+        def save_chunk(user_nos, users, is_retry):
+            nonlocal done_this_run
+            try:
+                rows, failed = _generate_chunk(db, executor, users)
+                ai_crud.bulk_create_recommendations(db, rows)
+                _record_failures(db, job_key, user_nos, failed)
+                succeeded = len(users) - len(failed)
+                checkpoint.processed += succeeded
+                if is_retry:
+                    checkpoint.failed -= len(user_nos) - len(failed)
+                else:
+                    checkpoint.last_user_no = user_nos[-1]
+                    checkpoint.failed += len(failed)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+            done_this_run += len(users)
+            elapsed = time.perf_counter() - started
+            label = "재시도" if is_retry else f"user_no ~{checkpoint.last_user_no}"
+            print(
+                f"- {label}: {len(users)}명 (실패 {len(failed)}), "
+                f"누적 {done_this_run}명, {done_this_run / elapsed * 60:.1f} users/min"
+            )
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-gen") as executor:
+            for user_nos, users in _retry_chunks(db, retry, chunk_size):
+                save_chunk(user_nos, users, is_retry=True)
+            if checkpoint.finished_at is None:
+                for users in active_user_chunks(db, checkpoint.last_user_no, chunk_size, since):
+                    save_chunk([u.user_no for u in users], users, is_retry=False)
+
+        if checkpoint.finished_at is None:
+            checkpoint.finished_at = datetime.now()
+        db.commit()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "job_key": job_key,
+            "users_this_run": done_this_run,
+            "processed": checkpoint.processed,
+            "failed": checkpoint.failed,
+            "elapsed_s": round(elapsed, 1),
+            "users_per_min": round(done_this_run / elapsed * 60, 1) if elapsed else None,
+        }
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate daily plans for all active users with checkpointing")
+    parser.add_argument("--job-key", default=f"daily_plan:{date.today().isoformat()}")
+    parser.add_argument("--workers", type=int, default=config.BATCH_GENERATION_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=config.BATCH_GENERATION_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    stats = run(args.job_key, args.workers, args.chunk_size)
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+세그먼트별 사전 생성 식단 풀
+
+load_user_payload_from_db가 만드는 페이로드는 나이/성별/키/몸무게/활동량(3단계)/목표뿐이라,
+비슷한 프로필끼리는 같은 식단을 받아도 됩니다. 사용자를 아래 구간으로 묶어 세그먼트 키를 만들고,
+야간 배치가 실제 사용자가 있는 세그먼트마다 완성된 하루 식단(이미지·레시피 포함)을 미리 만들어 둡니다.
+
+- 성별 / 나이(10세 단위) / BMI(대한비만학회 기준 저체중·정상·과체중·비만) / 활동량 / 목표(감량·유지·증량)
+- 알레르기가 등록된 사용자는 풀에서 제공하지 않고 항상 실시간 생성합니다.
+
+생성 API는 사용자의 세그먼트에 RECOMMENDATION_POOL_MAX_AGE_HOURS 이내에 만든 항목이 있으면 바로 제공하고,
+없으면 기존처럼 실시간으로 생성합니다.
+
+사용법 (프로젝트 루트에서, cron 등으로 매일 밤 실행):
+  python -m ai.recommendation_pool
+  python -m ai.recommendation_pool --per-segment 5 --max-segments 100
+  python -m ai.recommendation_pool --dry-run     # 세그먼트 분포와 생성할 개수만 출력
+"""
+import argparse
+import json
+import statistics
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+import config
+import models
+from ai import ai_crud
+from ai.ai_pipeline import generate_meals_for_payloads, user_row
+from api.user_to_meal import payload_from_user_row
+from database import SessionLocal
+
+POOL_SAVE_PATH = "recommendation_pool"
+POOL_USER_NO = 0  # 풀 이미지는 특정 사용자 소유가 아니므로 S3 경로에 0을 씁니다.
+
+_AGE_BANDS = ((20, "~19"), (30, "20s"), (40, "30s"), (50, "40s"), (60, "50s"))
+_BMI_BANDS = ((18.5, "under"), (23.0, "normal"), (25.0, "over"))
+_LOSE_WORDS = ("감량", "감소", "다이어트", "체지방", "빼", "줄이")
+_GAIN_WORDS = ("증량", "증가", "벌크", "근육", "찌우", "늘리")
+
+
+def _age_band(age: int) -> str:
+    for upper, label in _AGE_BANDS:
+        if age < upper:
+            return label
+    return "60+"
+
+
+def _bmi_band(height_cm: float, weight_kg: float) -> str:
+    bmi = weight_kg / ((height_cm / 100) ** 2)
+    for upper, label in _BMI_BANDS:
+        if bmi < upper:
+            return label
+    return "obese"
+
+
+def goal_category(goals: list) -> str:
+    text = " ".join(goals or [])
+    if any(w in text for w in _LOSE_WORDS):
+        return "lose"
+    if any(w in text for w in _GAIN_WORDS):
+        return "gain"
+    return "maintain"
+
+
+def segment_key(payload: dict) -> Optional[str]:
+    """user_payload → 세그먼트 키. 필요한 값이 비어 있으면 None(풀 대상 아님)."""
+    sex = payload.get("sex")
+    age = payload.get("age")
+    height = payload.get("height_cm")
+    weight = payload.get("weight_kg")
+    if not sex or not age or not height or not weight:
+        return None
+    return "|".join((
+        sex,
+        _age_band(int(age)),
+        _bmi_band(float(height), float(weight)),
+        payload.get("activity_level") or "moderate",
+        goal_category(payload.get("goals")),
+    ))
+
+
+def representative_payload(payloads: list) -> dict:
+    """세그먼트 구성원들의 중앙값 프로필 (모델 입력용)."""
+    first = payloads[0]
+    goals = Counter(g for p in payloads for g in p.get("goals") or [])
+    return {
+        "age": int(statistics.median(p["age"] for p in payloads)),
+        "sex": first["sex"],
+        "height_cm": int(statistics.median(p["height_cm"] for p in payloads)),
+        "weight_kg": round(statistics.median(p["weight_kg"] for p in payloads), 1),
+        "activity_level": first["activity_level"],
+        "goals": [goals.most_common(1)[0][0]] if goals else [],
+        "dietary_preferences": [],
+        "allergies": [],
+        "daily_calorie_target": None,
+        "notes": "",
+    }
+
+
+def _fresh_since() -> datetime:
+    return datetime.now() - timedelta(hours=config.RECOMMENDATION_POOL_MAX_AGE_HOURS)
+
+
+# =====================
+# 제공 (생성 API)
+# =====================
+
+def take_for_user(db, user, commit: bool = True) -> Optional[list]:
+    """
+    사용자의 세그먼트에 유효한 풀 항목이 있으면 끼니별 analysis_data 목록을, 없으면 None을 반환합니다.
+    같은 세그먼트 안에서는 덜 제공된 항목부터, 직전 추천과 제목이 겹치지 않는 항목을 고릅니다.
+    commit=False면 제공 횟수 증가를 커밋하지 않고 호출한 쪽 트랜잭션에 남깁니다.
+    """
+    if user is None or user.allergies:
+        return None
+    key = segment_key(payload_from_user_row(user_row(user)))
+    if key is None:
+        return None
+
+    candidates = ai_crud.get_pool_candidates(db, key, since=_fresh_since())
+    if not candidates:
+        return None
+
+    recent = {r.food_name for r in ai_crud.get_latest_recommedations_for_user(db, user.user_no)}
+    parsed = [(entry, json.loads(entry.meals_json)) for entry in candidates]
+    chosen, meals = next(
+        ((entry, m) for entry, m in parsed if not recent.intersection(meal.get("title") for meal in m)),
+        parsed[0],
+    )
+
+    ai_crud.mark_pool_served(db, chosen.pool_id, commit=commit)
+    return meals
+
+
+# =====================
+# 야간 배치
+# =====================
+
+def collect_segments(db) -> dict:
+    """알레르기 없는 사용자를 세그먼트별로 묶어 {키: [payload, ...]}."""
+    segments = defaultdict(list)
+    rows = (
+        db.query(
+            models.User.age, models.User.gender, models.User.height, models.User.weight,
+            models.User.activity_level, models.User.diet_goal,
+        )
+        .filter(~models.User.allergies.any())
+        .yield_per(1000)
+    )
+    for row in rows:
+        payload = payload_from_user_row(dict(row._mapping))
+        key = segment_key(payload)
+        if key is not None:
+            segments[key].append(payload)
+    return segments
+
+
+def build_pool(per_segment: int, max_segments: int, dry_run: bool = False) -> dict:
+    db = SessionLocal()
+    try:
+        segments = collect_segments(db)
+        ranked = sorted(segments.items(), key=lambda kv: len(kv[1]), reverse=True)[:max_segments]
+        existing = ai_crud.count_pool_entries(db, since=_fresh_since())
+        covered_users = sum(len(members) for _, members in ranked)
+        total_users = sum(len(members) for members in segments.values())
+        print(f"세그먼트 {len(segments)}개 중 상위 {len(ranked)}개 (사용자 {covered_users}/{total_users}명 포함)")
+
+        stats = {"segments": len(ranked), "created": 0, "failed": 0, "skipped": 0}
+        jobs = []  # (세그먼트 키, 대표 payload) — 만들 개수만큼
+        for key, members in ranked:
+            missing = max(0, per_segment - existing.get(key, 0))
+            print(f"- {key}: 사용자 {len(members)}명, 기존 {existing.get(key, 0)}개, 생성 {missing}개")
+            if dry_run or not missing:
+                stats["skipped"] += 1
+                continue
+            payload = representative_payload(members)
+            jobs.extend((key, payload) for _ in range(missing))
+
+        # BATCH_GENERATION_CHUNK_SIZE개씩 만들어 식단 후처리를 postprocess_to_full_batch 한 번으로 합니다.
+        chunk_size = max(1, config.BATCH_GENERATION_CHUNK_SIZE)
+        for start in range(0, len(jobs), chunk_size):
+            chunk = jobs[start:start + chunk_size]
+            results = generate_meals_for_payloads(
+                [payload for _, payload in chunk], [POOL_USER_NO] * len(chunk), POOL_SAVE_PATH
+            )
+            for (key, _), meals in zip(chunk, results):
+                if not meals:
+                    print(f"! {key} 생성 실패")
+                    stats["failed"] += 1
+                    continue
+                ai_crud.create_pool_entry(db, key, meals)
+                stats["created"] += 1
+
+        if not dry_run:
+            stats["deleted"] = ai_crud.delete_stale_pool_entries(db, before=_fresh_since())
+        return stats
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendation pool per user segment")
+    parser.add_argument("--per-segment", type=int, default=config.RECOMMENDATION_POOL_PER_SEGMENT)
+    parser.add_argument("--max-segments", type=int, default=config.RECOMMENDATION_POOL_MAX_SEGMENTS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    stats = build_pool(args.per_segment, args.max_segments, dry_run=args.dry_run)
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
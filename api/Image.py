@@ -3,7 +3,8 @@ Image.py
 
 이미지 속 음식을 항목별로 인식 → 각 항목의 kcal/탄/단/지(g) 추정 → JSON 반환 및 저장
 - OpenAI API (예: gpt-4o)를 사용합니다.
-- 로컬 이미지 파일을 바로 base64로 인코딩하여 전송합니다.
+- 이미지는 EXIF 회전 반영 → 모델 해상도로 축소 → JPEG/WebP 재압축(메타데이터 제거) 후 base64로 전송합니다.
+  (utils/image_preprocess.py, config.IMAGE_* 설정)
 - 모델이 반환한 JSON을 검증하고, 총합(total)만 포함한 JSON을 <입력파일명>.nutrition.json 으로 저장합니다.
 
 백엔드 연동(예: FastAPI) 예시:
@@ -18,6 +19,11 @@ Image.py
                                 --model gpt-4o \
                                 --out ./result.json
 
+배치 사용법 (디렉터리/glob/manifest → JSONL, 중단 후 같은 --jsonl로 재실행하면 이어서 처리):
+  python Image.py --dir ./archive --recursive --jsonl ./scores.jsonl --workers 8 --rps 4
+  python Image.py --glob "archive/2024-*/*.jpg" --jsonl ./scores.jsonl
+  python Image.py --manifest ./paths.txt --jsonl ./scores.jsonl
+
 사전 준비:
   - 환경변수 OPENAI_API_KEY 설정 필요
 """
@@ -28,20 +34,27 @@ from dotenv import load_dotenv, find_dotenv
 __all__ = [
     "analyze_image_with_openai",
     "analyze_image_bytes",
+    "analyze_images_bytes_multi",
 ]
 import argparse
+import glob
 import json
 import os
-import re
 import sys
-from typing import Any, Dict
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Optional
 
-from typing import Tuple
+from typing import List, Tuple
 import config
 
 
 import base64
-from openai import OpenAI
+from utils.openai_client import get_openai_client
+from utils.image_preprocess import preprocess_image_bytes
+from utils.resilience import OPENAI_CHAT, call_with_retry
+from utils.llm_json import loads_model_json
+from utils.nutrition_reference import check_payload
 
 # .env 로드
 load_dotenv(override=True)
@@ -137,47 +150,6 @@ VISION_RULES_BLOCK = (
 # =====================
 
 
-def extract_json(text: str) -> str:
-    """모델이 실수로 텍스트를 덧붙였을 경우, JSON 블록만 뽑아냅니다."""
-    # 먼저 코드블록 안의 JSON을 시도
-    codeblock = re.search(r"```(?:json)?\n(.*?)\n```", text, re.S | re.I)
-    if codeblock:
-        return codeblock.group(1).strip()
-    # 중괄호 범위를 최대한 보수적으로 추출
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        return text[start : end + 1].strip()
-    return text.strip()
-
-
-def clean_json_text(s: str) -> str:
-    """LLM가 생성한 JSON 유사 텍스트를 실제 JSON으로 가까이 정리.
-    - 스마트쿼트 → 일반 쿼트
-    - 코드펜스/마크다운 제거
-    - // 주석, /* */ 주석 제거
-    - 닫기 직전의 꼬리 콤마 제거
-    """
-    if not s:
-        return s
-    # 코드펜스 제거
-    s = re.sub(r"```(?:json)?\n|```", "", s, flags=re.I)
-    # 스마트 쿼트 → 일반 쿼트
-    s = (
-        s.replace("\u201c", '"')
-        .replace("\u201d", '"')
-        .replace("\u2018", "'")
-        .replace("\u2019", "'")
-    )
-    # 주석 제거
-    s = re.sub(r"/\*.*?\*/", "", s, flags=re.S)
-    s = re.sub(r"(^|\n)\s*//.*?(?=\n|$)", "\n", s)
-    # 꼬리 콤마 제거
-    s = re.sub(r",\s*([}\]])", r"\1", s)
-    # 공백 정리
-    return s.strip()
-
-
 def validate_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     """필수 스키마 최소 검증 및 숫자형 강제 변환/반올림(소수점 1자리)"""
 
@@ -340,36 +312,27 @@ def _analyze_b64_core(
     debug: bool = False,
     detail: int = 1,
 ) -> Dict[str, Any]:
-    # Build prompts (reuse existing constants)
-    system_prompt = (
-        SYSTEM_PROMPT + "\n" + DISAMBIGUATION_BLOCK + "\n" + VISION_RULES_BLOCK
-    )
-    base_up = USER_PROMPT_TEMPLATE.split("이미지 설명:")[0].rstrip()
-    extras = []
-    if detail >= 2:
-        extras.append(USER_PROMPT_DETAIL2)
-    if detail >= 3:
-        extras.append(USER_PROMPT_DETAIL3)
-    user_prompt = (
-        base_up
-        + "\n"
-        + ("\n".join(extras) if extras else "")
-        + f"\n이미지 설명: {image_caption}\n"
-    )
+    system_prompt, user_prompt = _build_prompts(detail, image_caption)
 
     api_key = config.OPENAI_API_KEY
     if not api_key:
         raise EnvironmentError(
             "환경변수 OPENAI_API_KEY가 설정되어 있지 않습니다. 'export OPENAI_API_KEY=...' 후 다시 실행하세요."
         )
-    client = OpenAI(api_key=api_key)
+    # 공용 클라이언트를 재사용해 요청마다 TLS 핸드셰이크가 발생하지 않도록 합니다.
+    client = get_openai_client()
+    if client is None:
+        raise RuntimeError("OpenAI 클라이언트를 초기화할 수 없습니다. openai/httpx 설치 여부를 확인하세요.")
 
     if verbose:
         print(f"[INFO] 모델 호출: {model}")
 
     # OpenAI Responses API with image input and JSON forcing
     try:
-        resp = client.responses.create(
+        resp = call_with_retry(
+            client.responses.create,
+            breaker=OPENAI_CHAT,
+            timeout_kwarg="timeout",
             model=model,
             response_format={"type": "json_object"},
             temperature=0.0,
@@ -418,7 +381,10 @@ def _analyze_b64_core(
             },
         ]
         try:
-            chat_resp = client.chat.completions.create(
+            chat_resp = call_with_retry(
+                client.chat.completions.create,
+                breaker=OPENAI_CHAT,
+                timeout_kwarg="timeout",
                 model=(model or "gpt-4o-mini"),
                 messages=chat_messages,
                 temperature=0.0,
@@ -427,7 +393,10 @@ def _analyze_b64_core(
             )
         except TypeError:
             # Very old SDKs: no response_format supported; rely on prompt-only JSON
-            chat_resp = client.chat.completions.create(
+            chat_resp = call_with_retry(
+                client.chat.completions.create,
+                breaker=OPENAI_CHAT,
+                timeout_kwarg="timeout",
                 model=(model or "gpt-4o-mini"),
                 messages=chat_messages,
                 temperature=0.0,
@@ -439,18 +408,18 @@ def _analyze_b64_core(
         print("[DEBUG] 1차 응답 원본:")
         print(text)
 
-    raw_json = extract_json(text)
-    cleaned = clean_json_text(raw_json)
-
     try:
-        parsed = json.loads(cleaned)
+        parsed = loads_model_json(text)
     except json.JSONDecodeError as e1:
         if debug:
             print(
-                f"[WARN] 1차 JSON 파싱 실패: {e1}\n---RAW BEGIN---\n{raw_json}\n---RAW END---"
+                f"[WARN] 1차 JSON 파싱 실패: {e1}\n---RAW BEGIN---\n{text}\n---RAW END---"
             )
         # Retry by explicitly re-prompting for JSON only
-        resp2 = client.responses.create(
+        resp2 = call_with_retry(
+            client.responses.create,
+            breaker=OPENAI_CHAT,
+            timeout_kwarg="timeout",
             model=model,
             response_format={"type": "json_object"},
             temperature=0.0,
@@ -480,11 +449,40 @@ def _analyze_b64_core(
         if debug:
             print("[DEBUG] 2차 응답 원본:")
             print(text2)
-        cleaned2 = clean_json_text(extract_json(text2))
-        parsed = json.loads(cleaned2)
+        parsed = loads_model_json(text2)
+
+    return _finalize(parsed, detail)
+
 
+def _build_prompts(detail: int, image_caption: str = "") -> Tuple[str, str]:
+    # Build prompts (reuse existing constants)
+    system_prompt = (
+        SYSTEM_PROMPT + "\n" + DISAMBIGUATION_BLOCK + "\n" + VISION_RULES_BLOCK
+    )
+    base_up = USER_PROMPT_TEMPLATE.split("이미지 설명:")[0].rstrip()
+    extras = []
+    if detail >= 2:
+        extras.append(USER_PROMPT_DETAIL2)
+    if detail >= 3:
+        extras.append(USER_PROMPT_DETAIL3)
+    user_prompt = (
+        base_up
+        + "\n"
+        + ("\n".join(extras) if extras else "")
+        + f"\n이미지 설명: {image_caption}\n"
+    )
+    return system_prompt, user_prompt
+
+
+def _finalize(parsed: Any, detail: int) -> Dict[str, Any]:
+    """스키마 검증 → 기준표 검증/보정 → detail에 맞게 필드 정리."""
     validated = validate_payload(parsed)
+    if config.NUTRITION_CHECK_ENABLED:
+        validated = check_payload(validated)
+    return _strip_extras(validated, detail)
 
+
+def _strip_extras(validated: Dict[str, Any], detail: int) -> Dict[str, Any]:
     if detail == 1:
         for k, v in list(validated.get("items", {}).items()):
             for extra_key in [
@@ -495,6 +493,8 @@ def _analyze_b64_core(
                 "fiber_g",
                 "serving_desc",
                 "bbox",
+                "macro_confidence",
+                "corrections",
             ]:
                 if extra_key in v:
                     v.pop(extra_key, None)
@@ -504,6 +504,82 @@ def _analyze_b64_core(
     return validated
 
 
+# =====================
+# Multi-image Vision Call (한 번의 요청으로 여러 장)
+# =====================
+
+MULTI_IMAGE_BLOCK = (
+    "[MULTI-IMAGE]\n"
+    "이미지가 {count}장 순서대로 주어집니다. 각 이미지를 서로 독립된 한 끼로 보고 위 스키마대로 분석하세요.\n"
+    "최종 응답은 반드시 다음 형태의 JSON 하나입니다: "
+    '{{"images": [<1번째 이미지 결과>, <2번째 이미지 결과>, ...]}}\n'
+    "images 배열 길이는 정확히 {count}이고, 순서는 입력 이미지 순서와 같아야 합니다.\n"
+)
+
+
+def analyze_images_bytes_multi(
+    images: List[Tuple[bytes, str]],
+    model: str = "gpt-4o",
+    verbose: bool = False,
+    debug: bool = False,
+    detail: int = 1,
+    preprocess: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+    """
+    여러 장의 (image_bytes, filename)을 한 번의 비전 요청으로 분석합니다.
+    반환 리스트는 입력 순서와 같고, 결과 개수가 맞지 않으면 ValueError를 던집니다.
+    """
+    if not images:
+        return []
+    api_key = config.OPENAI_API_KEY
+    if not api_key:
+        raise EnvironmentError(
+            "환경변수 OPENAI_API_KEY가 설정되어 있지 않습니다. 'export OPENAI_API_KEY=...' 후 다시 실행하세요."
+        )
+    client = get_openai_client()
+    if client is None:
+        raise RuntimeError("OpenAI 클라이언트를 초기화할 수 없습니다. openai/httpx 설치 여부를 확인하세요.")
+
+    system_prompt, user_prompt = _build_prompts(detail)
+    content: List[Dict[str, Any]] = [
+        {"type": "text", "text": user_prompt + "\n" + MULTI_IMAGE_BLOCK.format(count=len(images))}
+    ]
+    for idx, (image_bytes, filename) in enumerate(images, start=1):
+        mime, b64 = _prepare_b64(image_bytes, filename, preprocess=preprocess, verbose=verbose)
+        content.append({"type": "text", "text": f"[{idx}번째 이미지]"})
+        content.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}})
+
+    if verbose:
+        print(f"[INFO] 모델 호출(이미지 {len(images)}장): {model}")
+
+    chat_resp = call_with_retry(
+        client.chat.completions.create,
+        breaker=OPENAI_CHAT,
+        timeout_kwarg="timeout",
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": content},
+        ],
+        temperature=0.0,
+        max_tokens=1024 * len(images),
+        response_format={"type": "json_object"},
+    )
+    text = chat_resp.choices[0].message.content or ""
+    if debug:
+        print("[DEBUG] 다중 이미지 응답 원본:")
+        print(text)
+
+    parsed = loads_model_json(text)
+    results = parsed.get("images") if isinstance(parsed, dict) else None
+    if not isinstance(results, list) or len(results) != len(images):
+        raise ValueError(
+            f"다중 이미지 응답 개수가 맞지 않습니다: expected {len(images)}, "
+            f"got {len(results) if isinstance(results, list) else 'none'}"
+        )
+    return [_finalize(r, detail) for r in results]
+
+
 # =====================
 # OpenAI Vision Call
 # =====================
@@ -516,6 +592,7 @@ def analyze_image_with_openai(
     verbose: bool = False,
     debug: bool = False,
     detail: int = 1,
+    preprocess: Optional[bool] = None,
 ) -> Dict[str, Any]:
     api_key = config.OPENAI_API_KEY
     if not api_key:
@@ -523,21 +600,46 @@ def analyze_image_with_openai(
             "환경변수 OPENAI_API_KEY가 설정되어 있지 않습니다. 'export OPENAI_API_KEY=...' 후 다시 실행하세요."
         )
 
-    # MIME + base64 from file path
-    mime, b64 = _read_image_b64(image_path)
     if verbose:
-        print(f"[INFO] 이미지 로드: {image_path} ({mime})")
-    return _analyze_b64_core(
-        mime,
-        b64,
+        print(f"[INFO] 이미지 로드: {image_path}")
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    return analyze_image_bytes(
+        image_bytes,
+        filename=os.path.basename(image_path),
         model=model,
         image_caption=image_caption,
         verbose=verbose,
         debug=debug,
         detail=detail,
+        preprocess=preprocess,
     )
 
 
+# =====================
+# Image preprocessing → base64
+# =====================
+
+
+def _prepare_b64(
+    image_bytes: bytes,
+    filename: str,
+    preprocess: Optional[bool] = None,
+    verbose: bool = False,
+) -> Tuple[str, str]:
+    """EXIF 회전/축소/재압축 후 (mime, base64) 반환. 전처리가 꺼져 있으면 원본 그대로."""
+    data, mime, stats = preprocess_image_bytes(image_bytes, filename, enabled=preprocess)
+    if stats["applied"]:
+        if verbose:
+            print(
+                f"[INFO] 전처리: {stats['original_size']} → {stats['output_size']}, "
+                f"{stats['original_bytes']:,}B → {stats['output_bytes']:,}B ({stats['elapsed_ms']}ms)"
+            )
+    else:
+        mime = _guess_mime_from_filename(filename)
+    return mime, base64.b64encode(data).decode("utf-8")
+
+
 # =====================
 # Public API: analyze_image_bytes
 # =====================
@@ -551,6 +653,7 @@ def analyze_image_bytes(
     verbose: bool = False,
     debug: bool = False,
     detail: int = 1,
+    preprocess: Optional[bool] = None,
 ) -> Dict[str, Any]:
     api_key = config.OPENAI_API_KEY
     if not api_key:
@@ -558,9 +661,8 @@ def analyze_image_bytes(
             "환경변수 OPENAI_API_KEY가 설정되어 있지 않습니다. 'export OPENAI_API_KEY=...' 후 다시 실행하세요."
         )
 
-    # Guess MIME from filename and b64-encode bytes
-    mime = _guess_mime_from_filename(filename)
-    b64 = base64.b64encode(image_bytes).decode("utf-8")
+    # 축소/재압축(설정에 따라) 후 b64-encode
+    mime, b64 = _prepare_b64(image_bytes, filename, preprocess=preprocess, verbose=verbose)
     if verbose:
         print(f"[INFO] 이미지(바이트) 수신: {filename or '[no name]'} ({mime})")
 
@@ -575,6 +677,158 @@ def analyze_image_bytes(
     )
 
 
+# =====================
+# Batch mode (디렉터리/glob/manifest → JSONL)
+# =====================
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def collect_batch_paths(
+    directory: Optional[str] = None,
+    pattern: Optional[str] = None,
+    manifest: Optional[str] = None,
+    recursive: bool = False,
+) -> List[str]:
+    """배치 입력 경로 목록. manifest는 한 줄에 경로 하나 또는 {"path": ...} JSON."""
+    paths: List[str] = []
+    if directory:
+        if recursive:
+            for root, _, files in os.walk(directory):
+                paths.extend(os.path.join(root, f) for f in files)
+        else:
+            paths.extend(os.path.join(directory, f) for f in os.listdir(directory))
+        paths = [p for p in paths if p.lower().endswith(IMAGE_EXTS)]
+    if pattern:
+        paths.extend(glob.glob(pattern, recursive=True))
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                paths.append(json.loads(line)["path"] if line.startswith("{") else line)
+
+    seen, out = set(), []
+    for p in paths:
+        if p not in seen:
+            seen.add(p)
+            out.append(p)
+    return sorted(out)
+
+
+def load_completed(jsonl_path: str) -> set:
+    """이미 status=ok 로 기록된 경로 집합 (재실행 시 건너뜀). 마지막 줄이 잘렸으면 무시."""
+    done = set()
+    if not os.path.exists(jsonl_path):
+        return done
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if rec.get("status") == "ok":
+                done.add(rec.get("path"))
+    return done
+
+
+class _RateLimiter:
+    """제출 간격을 1/rps 초 이상으로 유지합니다 (rps <= 0 이면 제한 없음)."""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval
+
+
+def _batch_worker(path: str, model: str, caption: str, detail: int, preprocess: Optional[bool]) -> Dict[str, Any]:
+    # 프로세스 풀에서 실행됩니다. OpenAI 클라이언트는 프로세스마다 하나씩 재사용됩니다.
+    started = time.perf_counter()
+    try:
+        result = analyze_image_with_openai(
+            path, model=model, image_caption=caption, detail=detail, preprocess=preprocess
+        )
+        # 단건 CLI와 같은 출력 형태: total만 저장
+        return {
+            "path": path,
+            "status": "ok",
+            "result": {"total": result.get("total", {})},
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    except Exception as e:
+        return {
+            "path": path,
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+
+def run_batch(
+    paths: List[str],
+    jsonl_path: str,
+    *,
+    model: str = "gpt-4o",
+    caption: str = "",
+    detail: int = 1,
+    preprocess: Optional[bool] = None,
+    workers: int = 4,
+    rps: float = 0.0,
+    quiet: bool = False,
+) -> Dict[str, Any]:
+    """
+    이미지 목록을 프로세스 풀로 분석하고 결과를 JSONL로 한 줄씩 기록합니다.
+    같은 JSONL로 다시 실행하면 status=ok 인 항목은 건너뜁니다(실패 항목은 재시도).
+    """
+    done = load_completed(jsonl_path)
+    todo = [p for p in paths if p not in done]
+    stats = {"total": len(paths), "skipped": len(paths) - len(todo), "ok": 0, "error": 0}
+    if not quiet:
+        print(f"[BATCH] 전체 {len(paths)}개, 완료됨 {stats['skipped']}개 건너뜀, 처리 {len(todo)}개")
+
+    limiter = _RateLimiter(rps)
+    started = time.perf_counter()
+    max_in_flight = max(1, workers) * 2
+
+    with open(jsonl_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        in_flight = set()
+
+        def drain(block_until_below: int):
+            nonlocal in_flight
+            while len(in_flight) >= block_until_below:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    rec = fut.result()
+                    out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    out.flush()
+                    stats[rec["status"]] += 1
+                    if not quiet:
+                        n = stats["ok"] + stats["error"]
+                        mark = "OK " if rec["status"] == "ok" else "ERR"
+                        print(f"[{n}/{len(todo)}] {mark} {rec['path']} ({rec['elapsed_ms']}ms)")
+
+        for path in todo:
+            drain(max_in_flight)
+            limiter.wait()
+            in_flight.add(pool.submit(_batch_worker, path, model, caption, detail, preprocess))
+        drain(1)
+
+    elapsed = time.perf_counter() - started
+    processed = stats["ok"] + stats["error"]
+    stats["elapsed_s"] = round(elapsed, 2)
+    stats["images_per_min"] = round(processed / elapsed * 60, 1) if elapsed > 0 else 0.0
+    stats["error_rate"] = round(stats["error"] / processed, 4) if processed else 0.0
+    return stats
+
+
 # =====================
 # CLI
 # =====================
@@ -584,9 +838,11 @@ def main():
     parser = argparse.ArgumentParser(
         description="Analyze food in an image and output nutrition JSON."
     )
-    parser.add_argument(
-        "--image", required=True, help="Path to an image file (jpg/png/webp)"
-    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--image", help="Path to an image file (jpg/png/webp)")
+    source.add_argument("--dir", help="Batch: analyze every image in a directory")
+    source.add_argument("--glob", help="Batch: analyze images matching a glob (e.g. 'archive/**/*.jpg')")
+    source.add_argument("--manifest", help="Batch: file with one image path (or {\"path\": ...}) per line")
     parser.add_argument(
         "--model",
         default="gpt-4o",
@@ -616,8 +872,42 @@ def main():
         default=1,
         help="Detail level: 1=basic macros(기본, 출력 최소화), 2=+portion/confidence/micro-nutrients, 3=+bbox if possible",
     )
+    parser.add_argument(
+        "--no-preprocess",
+        action="store_true",
+        help="Send the original image without resize/recompression",
+    )
+    parser.add_argument("--recursive", action="store_true", help="Batch: walk --dir recursively")
+    parser.add_argument(
+        "--jsonl",
+        default="nutrition_results.jsonl",
+        help="Batch: JSONL output. Re-running with the same file skips completed images",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Batch: worker processes")
+    parser.add_argument("--rps", type=float, default=2.0, help="Batch: max requests per second (0 = unlimited)")
     args = parser.parse_args()
 
+    if not args.image:
+        paths = collect_batch_paths(args.dir, args.glob, args.manifest, recursive=args.recursive)
+        stats = run_batch(
+            paths,
+            args.jsonl,
+            model=args.model,
+            caption=args.caption,
+            detail=args.detail,
+            preprocess=False if args.no_preprocess else None,
+            workers=args.workers,
+            rps=args.rps,
+            quiet=args.only_json,
+        )
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        if not args.only_json:
+            print(
+                f"\n[OK] {stats['ok']}개 성공, {stats['error']}개 실패 "
+                f"(오류율 {stats['error_rate'] * 100:.1f}%, {stats['images_per_min']}장/분) → {args.jsonl}"
+            )
+        sys.exit(1 if stats["error"] else 0)
+
     try:
         result_raw = analyze_image_with_openai(
             args.image,
@@ -626,6 +916,7 @@ def main():
             verbose=args.verbose,
             debug=args.debug,
             detail=args.detail,
+            preprocess=False if args.no_preprocess else None,
         )
         try:
             result = validate_payload(result_raw)
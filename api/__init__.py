@@ -4,8 +4,10 @@ from api.meal_to_img import make_pictures_for_meals
 from api.user_to_meal import run_generation, load_user_payload_from_db
 from api.test4 import generate_for_user
 from sqlalchemy.orm import Session
-from database import get_db
+from database import async_engine, engine, get_db, replica_engines
 from account import account_crud
+from utils.resilience import breaker_states
+from utils.db_pool import pool_metrics
 
 # API 라우터 생성
 app = APIRouter(prefix="/api", tags=["API"])
@@ -13,7 +15,21 @@ app = APIRouter(prefix="/api", tags=["API"])
 @app.get("/health")
 async def health_check():
     """API 상태 확인"""
-    return {"status": "healthy", "message": "API 모듈이 정상적으로 작동 중입니다."}
+    return {
+        "status": "healthy",
+        "message": "API 모듈이 정상적으로 작동 중입니다.",
+        "circuits": breaker_states(),
+    }
+
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """DB 커넥션 풀 사용량과 체크아웃 대기 시간 (용량 산정용)"""
+    metrics = {"primary": pool_metrics(engine)}
+    if async_engine is not None:
+        metrics["primary_async"] = pool_metrics(async_engine.sync_engine)
+    for index, replica in enumerate(replica_engines):
+        metrics[f"replica_{index}"] = pool_metrics(replica)
+    return metrics
 
 # @app.get("/generate-recommendation/{user_id}")
 # async def generate_recommendation(
@@ -2,6 +2,8 @@ import os, re, time, json
 from typing import List, Dict, Any, Tuple
 from dotenv import load_dotenv, find_dotenv
 import config
+from utils.openai_client import get_openai_client
+from utils.resilience import OPENAI_CHAT, YOUTUBE, CircuitOpenError, call_with_retry
 
 # 선택적 임포트 - 라이브러리가 없어도 애플리케이션이 실행되도록 함
 try:
@@ -45,11 +47,8 @@ client = None
 yt = None
 
 if OPENAI_AVAILABLE and OPENAI_API_KEY:
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-    except Exception as e:
-        print(f"OpenAI 클라이언트 초기화 실패: {e}")
-        client = None
+    # 공용 커넥션 풀을 쓰는 클라이언트 (utils/openai_client.py)
+    client = get_openai_client()
 
 if GOOGLE_API_AVAILABLE and YOUTUBE_API_KEY:
     try:
@@ -66,7 +65,7 @@ def search_recipe_videos(query: str, max_results: int = 3) -> List[Dict[str, str
     
     try:
         q = f"{query} 레시피 만드는 법 recipe how to make ingredients"
-        resp = yt.search().list(
+        request = yt.search().list(
             q=q,
             part="id,snippet",
             maxResults=max(1, min(5, max_results)),
@@ -74,7 +73,8 @@ def search_recipe_videos(query: str, max_results: int = 3) -> List[Dict[str, str
             safeSearch="moderate",
             relevanceLanguage="ko",
             videoCaption="any",
-        ).execute()
+        )
+        resp = call_with_retry(request.execute, breaker=YOUTUBE)
         out = []
         for it in resp.get("items", []):
             vid = it["id"]["videoId"]
@@ -94,17 +94,23 @@ def get_best_transcript(video_id: str, tries: int = 2) -> str:
         return ""
     
     langs_priority = [["ko","en"], ["en","ko"]]
-    for attempt in range(tries):
-        for langs in langs_priority:
-            try:
-                tr = YouTubeTranscriptApi.get_transcript(video_id, languages=langs)
-                return " ".join(seg.get("text", "") for seg in tr if seg.get("text"))
-            except (TranscriptsDisabled, NoTranscriptFound):
-                continue
-            except Exception:
-                time.sleep(0.3)
-                continue
-        time.sleep(0.4 * (attempt + 1))  # 백오프
+    for langs in langs_priority:
+        try:
+            # 일시적 오류만 지수 백오프로 재시도, 자막 없음은 바로 다음 언어로
+            tr = call_with_retry(
+                YouTubeTranscriptApi.get_transcript,
+                video_id,
+                languages=langs,
+                breaker=YOUTUBE,
+                retries=tries - 1,
+                give_up_on=(TranscriptsDisabled, NoTranscriptFound),
+            )
+            return " ".join(seg.get("text", "") for seg in tr if seg.get("text"))
+        except CircuitOpenError:
+            # YouTube 장애 중에는 기다리지 않고 영상 설명으로 대체
+            return ""
+        except Exception:
+            continue
     return ""
 
 def fetch_text_from_video_meta(video: Dict[str, str]) -> str:
@@ -237,7 +243,10 @@ def llm_refine_ingredients_steps(text: str, lang: str="ko") -> Tuple[List[str],
         f"{text[:12000]}"
     )
     try:
-        resp = client.chat.completions.create(
+        resp = call_with_retry(
+            client.chat.completions.create,
+            breaker=OPENAI_CHAT,
+            timeout_kwarg="timeout",
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": sys_msg},
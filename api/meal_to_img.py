@@ -3,7 +3,10 @@ import os, json, time, math, random, datetime
 from typing import Dict, Any
 from dotenv import load_dotenv, find_dotenv
 import config
+from utils.openai_client import get_openai_client
+from utils.resilience import OPENAI_IMAGES, call_with_retry
 import re
+import uuid
 import requests
 import traceback
 # 선택적 임포트 - 라이브러리가 없어도 애플리케이션이 실행되도록 함
@@ -22,14 +25,8 @@ OPENAI_API_KEY = config.OPENAI_API_KEY
 if not OPENAI_API_KEY:
     print("경고: 환경 변수 OPENAI_API_KEY가 비어 있습니다. 이미지 생성 기능이 제한됩니다.")
 
-# OpenAI 클라이언트
-client = None
-if OPENAI_AVAILABLE and OPENAI_API_KEY:
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-    except Exception as e:
-        print(f"OpenAI 클라이언트 초기화 실패: {e}")
-        client = None
+# OpenAI 클라이언트 (공용 커넥션 풀)
+client = get_openai_client()
 
 # --------------------------------
 # 설정
@@ -79,7 +76,10 @@ def generate_image_from_prompt(prompt: str, size: str = "1024x1024", quality: st
     try:
         # 아래는 예시 형식. 실제 SDK의 이미지 메서드/필드는 환경에 맞게 교체.
         # 공식 문서: platform.openai.com/docs/api-reference (엔드포인트/파라미터 확인)
-        result = client.images.generate(
+        result = call_with_retry(
+            client.images.generate,
+            breaker=OPENAI_IMAGES,
+            timeout_kwarg="timeout",
             model=IMAGE_MODEL,
             prompt=prompt,
             size=size,
@@ -92,15 +92,19 @@ def generate_image_from_prompt(prompt: str, size: str = "1024x1024", quality: st
             return base64.b64decode(result.data[0].b64_json)
         # URL 응답인 경우 직접 다운로드 필요
         if hasattr(result, "data") and result.data and hasattr(result.data[0], "url"):
-            import requests
-            url = result.data[0].url
-            resp = requests.get(url, timeout=30)
-            resp.raise_for_status()
-            return resp.content
+            return download_image(result.data[0].url)
         raise RuntimeError("이미지 생성 응답 형식이 예상과 다릅니다.")
     except Exception as e:
         raise RuntimeError(f"이미지 생성 중 오류 발생: {e}")
 
+def download_image(url: str) -> bytes:
+    """생성된 이미지 URL 다운로드 (이미지 생성과 같은 서킷 브레이커/재시도 적용)."""
+    def _get():
+        resp = requests.get(url, timeout=30)
+        resp.raise_for_status()
+        return resp.content
+    return call_with_retry(_get, breaker=OPENAI_IMAGES)
+
 def save_image(png_bytes: bytes, path: str):
     with open(path, "wb") as f:
         f.write(png_bytes)
@@ -113,7 +117,11 @@ def load_plan_json(path: str) -> Dict[str, Any]:
 import time
 
 
-def make_pictures_for_meals(plan_json_path: str, variability: float = 0.2) -> dict:
+def make_pictures_for_meals(plan_json_path: str, variability: float = 0.2, skip=(), on_saved=None) -> dict:
+    """
+    끼니별 이미지를 만들어 {끼니: 로컬 경로 또는 None}을 반환합니다.
+    skip에 든 끼니는 만들지 않고, on_saved(끼니, 경로)가 있으면 이미지 하나를 저장할 때마다 바로 호출합니다.
+    """
     saved_paths = {}
 
     with open(plan_json_path, "r", encoding="utf-8") as f:
@@ -121,7 +129,7 @@ def make_pictures_for_meals(plan_json_path: str, variability: float = 0.2) -> di
 
     for meal_key in ("breakfast",): #,"lunch", "dinner"):
         meal_info = data.get(meal_key)
-        if not meal_info or not isinstance(meal_info, dict):
+        if meal_key in skip or not meal_info or not isinstance(meal_info, dict):
             continue
 
         title = meal_info.get("title", "").strip()
@@ -133,7 +141,10 @@ def make_pictures_for_meals(plan_json_path: str, variability: float = 0.2) -> di
 
             prompt = build_image_prompt(title, meal_key, seed)
 
-            response = client.images.generate(
+            response = call_with_retry(
+                client.images.generate,
+                breaker=OPENAI_IMAGES,
+                timeout_kwarg="timeout",
                 model="dall-e-2", #dall-e-3은 2배 가격
                 prompt=prompt,  # 여기에 build_image_prompt 결과 사용
                 size="1024x1024",
@@ -142,16 +153,19 @@ def make_pictures_for_meals(plan_json_path: str, variability: float = 0.2) -> di
             )
 
             image_url = response.data[0].url
-            image_data = requests.get(image_url).content
+            image_data = download_image(image_url)
 
             sanitized_title = re.sub(r'[\\/*?:"<>|]', "", title).replace(" ", "_").replace(",", "")
-            out_path = os.path.join(OUT_DIR, f"{meal_key}_{sanitized_title}.png")
+            # 동시 생성(배치 워커) 시 같은 제목끼리 파일을 덮어쓰지 않도록 고유 접미사를 붙입니다.
+            out_path = os.path.join(OUT_DIR, f"{meal_key}_{sanitized_title}_{uuid.uuid4().hex[:8]}.png")
 
             with open(out_path, 'wb') as img_file:
                 img_file.write(image_data)
 
             print(f"[saved] {out_path}")
             saved_paths[meal_key] = out_path
+            if on_saved is not None:
+                on_saved(meal_key, out_path)
 
             # 각 이미지 생성 후 1초 대기 (rate limit 방지)
             time.sleep(1)
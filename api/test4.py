@@ -1,6 +1,7 @@
 import os
 import json
 import time
+import uuid
 from dotenv import load_dotenv, find_dotenv
 import re
 import traceback
@@ -13,9 +14,10 @@ load_dotenv(find_dotenv(usecwd=True))
 from .user_to_meal import run_generation, load_user_payload_from_db
 
 
-def step1_generate_recommendation():
+def step1_generate_recommendation(user_id: str = None):
     # DB 데이터만 사용 (더미 금지)
-    user_id = os.getenv("USER_ID")
+    # user_id를 직접 받습니다. 단독 실행(main) 때만 USER_ID 환경변수를 읽습니다.
+    user_id = user_id or os.getenv("USER_ID")
     if not user_id:
         raise RuntimeError(
             "USER_ID 환경변수가 없습니다. DB 데이터로만 실행하려면 USER_ID를 지정하세요."
@@ -28,23 +30,14 @@ def step1_generate_recommendation():
     print("\n[STEP 1] run_generation 호출 시작")
     print("- 입력: 최소 사용자 프로필 JSON 1개")
     try:
+        # 호출마다 고유한 파일에 저장합니다. (out/ 최신 파일을 찾으면 동시 요청끼리 결과가 섞임)
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        saved_path = os.path.join("out", f"recommendation_{ts}_{uuid.uuid4().hex[:8]}.json")
         result = run_generation(
-            user_payload, print_pretty=False, save_pretty_file=True
+            user_payload, print_pretty=False, save_pretty_file=True, out_path=saved_path
         )
-
-        # 가장 최근 recommendation_*.json 경로 찾기
-        out_dir = "out"
-        latest = None
-        latest_mtime = -1
-        if os.path.isdir(out_dir):
-            for fn in os.listdir(out_dir):
-                if fn.startswith("recommendation_") and fn.endswith(".json"):
-                    p = os.path.join(out_dir, fn)
-                    m = os.path.getmtime(p)
-                    if m > latest_mtime:
-                        latest_mtime = m
-                        latest = p
-        saved_path = latest
+        if "error" in result:
+            raise RuntimeError(result["error"])
 
         print("- 진행: 모델 호출 → 후처리 → 재료 생성 → 링크 부착 → 파일 저장 완료")
         print("- 출력 샘플(plan_meta만):")
@@ -161,6 +154,10 @@ def step3_analyze_foods(foods):
 def extract_foods_from_plan(plan_json_path):
     with open(plan_json_path, "r", encoding="utf-8") as f:
         plan = json.load(f)
+    return foods_from_plan(plan)
+
+
+def foods_from_plan(plan: dict):
     foods = []
     for meal_key in ("breakfast", "lunch", "dinner"):
         container = plan.get(meal_key) or {}
@@ -185,10 +182,7 @@ def generate_for_user(user_id: str):
     2) 이미지 생성
     3) 추천안에서 음식명 추출
     """
-    # USER_ID 환경변수 세팅 (step1_generate_recommendation 내부에서 사용)
-    os.environ["USER_ID"] = str(user_id)
-
-    result, plan_path = step1_generate_recommendation()
+    result, plan_path = step1_generate_recommendation(str(user_id))
     generated_image_paths = step2_make_images(plan_path)
     foods = extract_foods_from_plan(plan_path)
     return result, plan_path, foods, generated_image_paths
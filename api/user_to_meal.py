@@ -4,10 +4,15 @@ import time
 import json
 import datetime
 import random
+from itertools import islice
 from typing import List, Dict, Any, Tuple
 from urllib.parse import quote_plus
 import config
 from dotenv import load_dotenv, find_dotenv
+from utils.openai_client import get_openai_client
+from utils.resilience import OPENAI_CHAT, CircuitOpenError, DeadlineExceeded, call_with_retry, is_transient
+from utils.llm_json import parse_model_json
+from utils.nutrition_reference import estimate_macros
 # .env 로드
 load_dotenv(override=True)
 load_dotenv(find_dotenv(usecwd=True))
@@ -20,6 +25,13 @@ except ImportError:
     OPENAI_AVAILABLE = False
     print("경고: openai가 설치되지 않았습니다. OpenAI 기능이 제한됩니다.")
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("경고: numpy가 설치되지 않았습니다. 식단 일괄 후처리는 항목별 계산으로 대체됩니다.")
+
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -104,7 +116,14 @@ def load_user_payload_from_db(user_id: str) -> dict:
         finally:
             conn.close()
 
-    # --- 정규화 (공통 로직) ---
+    return payload_from_user_row(row_dict)
+
+
+def payload_from_user_row(row_dict: dict) -> dict:
+    """
+    Users 레코드(dict: age, gender, height, weight, activity_level, diet_goal)를 user_payload로 정규화.
+    이미 읽어 둔 행에서 DB 재조회 없이 페이로드를 만들 때도 씁니다.
+    """
     g = (row_dict.get("gender") or "").strip().upper()
     sex = (
         "male"
@@ -181,14 +200,8 @@ OPENAI_API_KEY = config.OPENAI_API_KEY
 if not OPENAI_API_KEY:
     print("경고: 환경 변수 OPENAI_API_KEY가 비어 있습니다. OpenAI 기능이 제한됩니다.")
 
-# --------- OpenAI 클라이언트 ---------
-client = None
-if OPENAI_AVAILABLE and OPENAI_API_KEY:
-    try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-    except Exception as e:
-        print(f"OpenAI 클라이언트 초기화 실패: {e}")
-        client = None
+# --------- OpenAI 클라이언트 (공용 커넥션 풀) ---------
+client = get_openai_client()
 
 # -----------------------------
 # PROMPTS
@@ -215,20 +228,20 @@ STRICT JSON RESPONSE:
 {concept_hint}
 """
 
-DEV = """
+DEV_TEMPLATE = """
 [출력 스키마]
 오직 아래 구조만 출력(최상위 키 3개: breakfast, lunch, dinner):
 {
-  "breakfast": { "title": string, "subtitle": string, "items": [ { "name": string, "macros": { "protein_g": number, "carb_g": number, "fat_g": number }, "prep_time_min": integer } ] },
-  "lunch":     { "title": string, "subtitle": string, "items": [ { "name": string, "macros": { "protein_g": number, "carb_g": number, "fat_g": number }, "prep_time_min": integer } ] },
-  "dinner":    { "title": string, "subtitle": string, "items": [ { "name": string, "macros": { "protein_g": number, "carb_g": number, "fat_g": number }, "prep_time_min": integer } ] }
+  "breakfast": { "title": string, "subtitle": string, "items": [ <ITEM> ] },
+  "lunch":     { "title": string, "subtitle": string, "items": [ <ITEM> ] },
+  "dinner":    { "title": string, "subtitle": string, "items": [ <ITEM> ] }
 }
 
 [출력 규칙]
 - 각 끼니(items) 배열 길이는 정확히 5.
 - 조화 규칙: 한 끼니는 한 가지 식문화/메뉴 컨셉으로 통일(예: 한식+한식). 메인 1개(탄수/단백 중심), 보조 반찬 2~3개, 음료/후식 0~1개로 구성. 무관한 조합 금지.
 - title은 12자 이내 핵심 문구, subtitle은 30자 이내 한 문장 요약.
-- 각 항목 키는 name, macros(protein_g/carb_g/fat_g), prep_time_min만 허용. 모든 수치는 숫자.
+- <ITEM_KEYS_RULE>
 - JSON 1개를 한 줄(minified)로만 출력.
 
 [타이틀·서브타이틀 규칙]
@@ -236,6 +249,21 @@ DEV = """
 - subtitle: 맛·식감·조리 포인트 한 문장(30자 이내)
 """
 
+_ITEM_WITH_MACROS = '{ "name": string, "macros": { "protein_g": number, "carb_g": number, "fat_g": number }, "prep_time_min": integer }'
+_ITEM_WITHOUT_MACROS = '{ "name": string, "prep_time_min": integer }'
+
+
+def build_dev_prompt(with_macros: bool = True) -> str:
+    """PLAN_LLM_MACROS=false면 macros 없이 이름/조리시간만 요청합니다 (탄단지는 기준표에서 채움)."""
+    if with_macros:
+        item, rule = _ITEM_WITH_MACROS, "각 항목 키는 name, macros(protein_g/carb_g/fat_g), prep_time_min만 허용. 모든 수치는 숫자."
+    else:
+        item, rule = _ITEM_WITHOUT_MACROS, "각 항목 키는 name, prep_time_min만 허용. name은 구체적인 한국어 음식명(예: 현미밥, 두부조림)."
+    return DEV_TEMPLATE.replace("<ITEM_KEYS_RULE>", rule).replace("<ITEM>", item)
+
+
+DEV = build_dev_prompt(config.PLAN_LLM_MACROS)
+
 MEAL_ITEM_SCHEMA = {
     "type": "object",
     "additionalProperties": False,
@@ -256,6 +284,16 @@ MEAL_ITEM_SCHEMA = {
     "required": ["name", "macros", "prep_time_min"],
 }
 
+MEAL_ITEM_SCHEMA_NO_MACROS = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "name": {"type": "string"},
+        "prep_time_min": {"type": "integer"},
+    },
+    "required": ["name", "prep_time_min"],
+}
+
 MEAL_CONTAINER_SCHEMA = {
     "type": "object",
     "additionalProperties": False,
@@ -266,7 +304,7 @@ MEAL_CONTAINER_SCHEMA = {
             "type": "array",
             "minItems": 5,
             "maxItems": 5,
-            "items": MEAL_ITEM_SCHEMA,
+            "items": MEAL_ITEM_SCHEMA if config.PLAN_LLM_MACROS else MEAL_ITEM_SCHEMA_NO_MACROS,
         },
     },
     "required": ["title", "subtitle", "items"],
@@ -300,69 +338,9 @@ def extract_json_text_chat(resp):
     return None
 
 
-def _strip_json_strings(src: str) -> str:
-    return re.sub(r'"(\\.|[^"\\])*"', "", src)
-
-
-def is_likely_truncated(text: str) -> bool:
-    if not text:
-        return True
-    stripped = text.strip()
-    if not stripped.endswith(("}", "]")):
-        return True
-    tmp = _strip_json_strings(stripped)
-    if tmp.count("{") != tmp.count("}"):
-        return True
-    if tmp.count("[") != tmp.count("]"):
-        return True
-    return False
-
-
-def _repair_model_json(src: str) -> str:
-    cleaned = src.replace("\u200b", "").strip()
-    cleaned = re.sub(r",(\s*[}\]])", r"\1", cleaned)
-
-    def _fix_key(m: re.Match) -> str:
-        prefix, key = m.group(1), m.group(2)
-        return f'{prefix}"{key}":'
-
-    cleaned = re.sub(r"([\{,]\s*)'([^']+)'\s*:", _fix_key, cleaned)
-
-    def _fix_value(m: re.Match) -> str:
-        value = m.group(1).replace('"', '\\"')
-        return f':"{value}"'
-
-    cleaned = re.sub(r":\s*'([^'\\]*)'", _fix_value, cleaned)
-    cleaned = re.sub(r"\bTrue\b", "true", cleaned)
-    cleaned = re.sub(r"\bFalse\b", "false", cleaned)
-    cleaned = re.sub(r"\bNone\b", "null", cleaned)
-    return cleaned
-
-
 def safe_parse_json(s):
-    if not s:
-        return None
-    s2 = s.replace("``````", "").strip()
-    s2 = (
-        s2.replace("\u2018", "'")
-        .replace("\u2019", "'")
-        .replace("\u201c", '"')
-        .replace("\u201d", '"')
-    )
-    s3 = _repair_model_json(s2)
-    for candidate in (s2, s3):
-        try:
-            return json.loads(candidate)
-        except Exception:
-            continue
-    for candidate in (s3, s2):
-        try:
-            m = re.search(r"(\{.*\}|\[.*\])", candidate, re.DOTALL)
-            if m:
-                return json.loads(m.group(1))
-        except Exception:
-            continue
-    return None
+    """모델 응답을 관대하게 파싱합니다. 실패하면 None (잘린 응답은 닫을 수 있는 만큼만 반환)."""
+    return parse_model_json(s).value if s else None
 
 
 def normalize_to_meals_obj(data):
@@ -403,6 +381,21 @@ def compute_kcal_from_macros(m):
     )
 
 
+def _item_macros(it):
+    """
+    항목 탄단지와 출처를 정합니다.
+    기준표에 있으면 결정적인 기준값("db"), 없으면 LLM 값("llm"),
+    LLM에게 탄단지를 요청하지 않은 경우에는 분류별 대략값("category").
+    """
+    name = it.get("name", "")
+    llm_macros = it.get("macros")
+    if config.PLAN_DB_MACROS_ENABLED or not isinstance(llm_macros, dict):
+        macros, source = estimate_macros(name)
+        if source == "db" or not isinstance(llm_macros, dict):
+            return macros, source
+    return llm_macros, "llm"
+
+
 def postprocess_to_full(raw, user_payload):
     out = {"plan_meta": {}, "breakfast": {}, "lunch": {}, "dinner": {}}
     daily_target = user_payload.get("daily_calorie_target")
@@ -423,7 +416,7 @@ def postprocess_to_full(raw, user_payload):
         arr = []
         for it in items:
             name = it.get("name", "")
-            macros = it.get("macros", {}) or {}
+            macros, macros_source = _item_macros(it)
             calories, breakdown, ratio = compute_kcal_from_macros(macros)
             item = {
                 "name": name,
@@ -435,6 +428,7 @@ def postprocess_to_full(raw, user_payload):
                 },
                 "kcal_breakdown": breakdown,
                 "macros_ratio": ratio,
+                "macros_source": macros_source,
                 "prep_time_min": int(it.get("prep_time_min", 0)),
             }
             total_p += item["macros"]["protein_g"]
@@ -463,6 +457,125 @@ def postprocess_to_full(raw, user_payload):
     return out
 
 
+def _pct(part, total):
+    """round(part * 100 / total) 배열 버전 (total == 0 이면 0)."""
+    out = np.zeros_like(total, dtype=np.float64)
+    np.divide(part * 100, total, out=out, where=total > 0)
+    return np.rint(out)
+
+
+def postprocess_to_full_batch(raws, user_payloads):
+    """
+    여러 식단을 한 번에 후처리합니다. 결과는 postprocess_to_full을 하나씩 부른 것과 완전히 같습니다.
+
+    - 항목 kcal / breakdown / 비율은 전체 항목을 한 배열로 모아 NumPy로 계산
+      (np.rint = round()와 같은 round-half-even, 나눗셈도 같은 IEEE 연산)
+    - 식단별 탄단지 합계는 항목 순서대로 열(column) 단위로 더해 파이썬의 순차 덧셈과 같은 값을 만듦
+      (np.sum의 pairwise 합산은 마지막 자리가 달라질 수 있어 쓰지 않음)
+    - 소수점 1자리 반올림은 round(x, 1)과 결과가 다를 수 있어 파이썬에서 처리
+    - 결과 dict 수십만 개를 만들 때는 순환 GC가 시간의 상당 부분을 차지합니다. GC 설정은 프로세스 전역이라
+      여기서 바꾸지 않습니다. 필요하면 오프라인 호출 쪽에서 자기 루프 주변에 gc.freeze()/gc.disable()을 쓰세요.
+    """
+    if not NUMPY_AVAILABLE:
+        return [postprocess_to_full(raw, payload) for raw, payload in zip(raws, user_payloads)]
+
+    meal_keys = ("breakfast", "lunch", "dinner")
+    n = len(raws)
+    flat = []  # (protein_g, carb_g, fat_g)
+    meta = []  # (name, macros_source, prep_time_min)
+    plan_idx, pos = [], []
+    layouts = []  # 식단별 [(meal_key, title, subtitle, 항목 수)]
+    for i, raw in enumerate(raws):
+        layout = []
+        k = 0
+        for meal_key in meal_keys:
+            meal = raw.get(meal_key) or {}
+            items = meal.get("items", []) or []
+            for it in items:
+                macros, source = _item_macros(it)
+                flat.append((
+                    float(macros.get("protein_g", 0)),
+                    float(macros.get("carb_g", 0)),
+                    float(macros.get("fat_g", 0)),
+                ))
+                meta.append((it.get("name", ""), source, int(it.get("prep_time_min", 0))))
+            plan_idx.extend([i] * len(items))
+            pos.extend(range(k, k + len(items)))
+            k += len(items)
+            layout.append((meal_key, meal.get("title", ""), meal.get("subtitle", ""), len(items)))
+        layouts.append(layout)
+
+    values = np.array(flat, dtype=np.float64).reshape(-1, 3)
+    P, C, F = values[:, 0], values[:, 1], values[:, 2]
+    pk = np.rint(P * 4)
+    ck = np.rint(C * 4)
+    fk = np.rint(F * 9)
+    kcal = pk + ck + fk
+    p_pct, c_pct, f_pct = _pct(pk, kcal), _pct(ck, kcal), _pct(fk, kcal)
+
+    # 식단별 합계: (식단 x 항목 위치) 행렬을 만들고 열 단위로 순서대로 더합니다.
+    plan_idx = np.asarray(plan_idx, dtype=np.int64)
+    pos = np.asarray(pos, dtype=np.int64)
+    width = int(pos.max()) + 1 if len(pos) else 0
+    totals = []
+    for values in (P, C, F, kcal):
+        grid = np.zeros((n, width), dtype=np.float64)
+        grid[plan_idx, pos] = values
+        acc = np.zeros(n, dtype=np.float64)
+        for j in range(width):
+            acc += grid[:, j]
+        totals.append(acc)
+    tot_p, tot_c, tot_f, tot_k = totals
+    tpk, tck, tfk = np.rint(tot_p * 4), np.rint(tot_c * 4), np.rint(tot_f * 9)
+    tot = tpk + tck + tfk
+    tp_pct, tc_pct, tf_pct = _pct(tpk, tot), _pct(tck, tot), _pct(tfk, tot)
+
+    # 파이썬 스칼라로 한 번에 변환 (int / float, JSON 직렬화 가능)
+    P, C, F = P.tolist(), C.tolist(), F.tolist()
+    pk, ck, kcal = pk.astype(np.int64).tolist(), ck.astype(np.int64).tolist(), kcal.astype(np.int64).tolist()
+    p_pct, c_pct, f_pct = (a.astype(np.int64).tolist() for a in (p_pct, c_pct, f_pct))
+    tot_p, tot_c, tot_f = tot_p.tolist(), tot_c.tolist(), tot_f.tolist()
+    tot_k = tot_k.astype(np.int64).tolist()
+    tp_pct, tc_pct, tf_pct = (a.astype(np.int64).tolist() for a in (tp_pct, tc_pct, tf_pct))
+
+    rows = iter(zip(meta, P, C, F, kcal, pk, ck, p_pct, c_pct, f_pct))
+    results = []
+    for i, (raw_payload, layout) in enumerate(zip(user_payloads, layouts)):
+        out = {"plan_meta": {}, "breakfast": {}, "lunch": {}, "dinner": {}}
+        daily_target = raw_payload.get("daily_calorie_target")
+        out["plan_meta"]["daily_calorie_target"] = (
+            int(daily_target) if isinstance(daily_target, (int, float)) else None
+        )
+        out["plan_meta"]["goal_note"] = "사용자 목표를 반영한 추천"
+        for meal_key, title, subtitle, count in layout:
+            arr = []
+            for (name, source, prep), p, c, f, k, pkv, ckv, pp, cp, fp in islice(rows, count):
+                arr.append({
+                    "name": name,
+                    "calories": k,
+                    "macros": {"protein_g": p, "carb_g": c, "fat_g": f},
+                    "kcal_breakdown": {"protein_kcal": pkv, "carb_kcal": ckv},
+                    "macros_ratio": {"protein_pct": pp, "carb_pct": cp, "fat_pct": fp},
+                    "macros_source": source,
+                    "prep_time_min": prep,
+                })
+            out[meal_key] = {"title": title, "subtitle": subtitle, "items": arr}
+
+        out["plan_meta"]["total_calories"] = tot_k[i]
+        out["plan_meta"]["macros_total"] = {
+            "protein_g": round(tot_p[i], 1),
+            "carb_g": round(tot_c[i], 1),
+            "fat_g": round(tot_f[i], 1),
+        }
+        out["plan_meta"]["macros_ratio"] = {
+            "protein_pct": tp_pct[i],
+            "carb_pct": tc_pct[i],
+            "fat_pct": tf_pct[i],
+        }
+        results.append(out)
+    return results
+
+
 def chat_once(
     messages,
     max_tokens=2048,
@@ -488,11 +601,20 @@ def chat_once(
         }
         if schema:
             kwargs["response_format"] = {"type": "json_object"}
-        resp = client.chat.completions.create(**kwargs)
+        resp = call_with_retry(
+            client.chat.completions.create, breaker=OPENAI_CHAT, timeout_kwarg="timeout", **kwargs
+        )
         text = extract_json_text_chat(resp)
         finish_reason = getattr(resp.choices[0], "finish_reason", None)
         return text, finish_reason
+    except (CircuitOpenError, DeadlineExceeded):
+        # 서비스 장애 중이거나 데드라인을 넘겼으면 프롬프트 재시도 루프를 돌지 않고 바로 실패시킵니다.
+        raise
     except Exception as e:
+        if is_transient(e):
+            # 재시도를 다 쓰고도 남은 일시적 오류(타임아웃/429/5xx)도 다른 프롬프트로 다시 부르면 느려지기만 합니다.
+            raise
+        # 그 밖의 오류(잘못된 요청 등)는 (None, None)으로 알려 호출 쪽이 다른 설정/프롬프트로 다시 시도합니다.
         print(f"OpenAI API 호출 중 오류 발생: {e}")
         return None, None
 
@@ -529,11 +651,11 @@ def attempt_prompt(messages, schema, attempts=2, max_tokens=2048):
         if finish_reason == "length":
             curr_max = min(int(curr_max * 1.5), 4096)
             continue
-        if not text or is_likely_truncated(text):
+        result = parse_model_json(text or "")
+        if result.truncated:
             curr_max = min(curr_max + 256, 4096)
             continue
-        parsed = safe_parse_json(text)
-        raw = normalize_to_meals_obj(parsed)
+        raw = normalize_to_meals_obj(result.value)
         if raw:
             titles_ok = all(
                 title_has_main_and_side((raw.get(k) or {}).get("title", ""))
@@ -550,8 +672,12 @@ def build_prompt_variants(user_payload):
         "오직 JSON 한 개(한 줄, minified)만 출력. 코드블록/주석/설명 금지.\n"
         "최상위 키는 breakfast, lunch, dinner 3개 모두 포함. 각 끼니는 {title, subtitle, items[5]} 구조.\n"
         "각 끼니의 items는 한 가지 컨셉으로 조화롭게 구성(메인 1, 보조 2~3, 음료/후식 0~1). 무관/중복 메뉴 금지.\n"
-        '각 항목 키는 name, macros, prep_time_min만. macros는 {"protein_g":number,"carb_g":number,"fat_g":number}.\n\n'
-        "[사용자]\n" + json.dumps(user_payload, ensure_ascii=False)
+        + (
+            '각 항목 키는 name, macros, prep_time_min만. macros는 {"protein_g":number,"carb_g":number,"fat_g":number}.\n\n'
+            if config.PLAN_LLM_MACROS
+            else "각 항목 키는 name, prep_time_min만. 탄단지 수치는 출력하지 마세요.\n\n"
+        )
+        + "[사용자]\n" + json.dumps(user_payload, ensure_ascii=False)
     )
     compact_user_msg = (
         "오직 JSON 한 개(한 줄). 최상위 키는 breakfast, lunch, dinner 3개 모두 포함. 각 끼니는 {title, subtitle, items[5]} 구조.\n"
@@ -663,12 +789,13 @@ def attach_coupang_search_links(plan_json: dict) -> dict:
     return plan_json
 
 
-def run_generation(
-    user_payload: dict, print_pretty: bool = True, save_pretty_file: bool = True
-) -> dict:
+def generate_raw_plan(user_payload: dict, print_pretty: bool = True):
+    """
+    LLM으로 후처리 전 원본 식단(raw)을 만듭니다.
+    반환: (raw, None) 또는 모델 출력이 JSON이 아니면 (None, 오류 payload).
+    """
     prompt_variants = build_prompt_variants(user_payload)
 
-    raw = None
     last_raw_text = None
     last_finish_reason = None
     last_max_output_tokens = None
@@ -684,51 +811,54 @@ def run_generation(
         if effective_max:
             last_max_output_tokens = effective_max
         if candidate_raw:
-            raw = candidate_raw
-            break
-
-    if raw is None:
-        debug_path = None
-        if last_raw_text:
-            out_dir = "out"
-            os.makedirs(out_dir, exist_ok=True)
-            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            debug_path = os.path.join(out_dir, f"raw_response_{ts}.txt")
-            with open(debug_path, "w", encoding="utf-8") as f:
-                f.write(last_raw_text)
-        payload = {"error": "MODEL_OUTPUT_NOT_JSON"}
-        if debug_path:
-            payload["debug_raw_path"] = debug_path
-        if last_finish_reason:
-            payload["last_finish_reason"] = last_finish_reason
-        if "last_max_output_tokens" in locals():
-            payload["last_max_output_tokens"] = last_max_output_tokens
-        if print_pretty:
-            print(json.dumps(payload, ensure_ascii=False, indent=2))
-        else:
-            print(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
-        return payload
+            return candidate_raw, None
+
+    debug_path = None
+    if last_raw_text:
+        out_dir = "out"
+        os.makedirs(out_dir, exist_ok=True)
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        debug_path = os.path.join(out_dir, f"raw_response_{ts}.txt")
+        with open(debug_path, "w", encoding="utf-8") as f:
+            f.write(last_raw_text)
+    payload = {"error": "MODEL_OUTPUT_NOT_JSON"}
+    if debug_path:
+        payload["debug_raw_path"] = debug_path
+    if last_finish_reason:
+        payload["last_finish_reason"] = last_finish_reason
+    payload["last_max_output_tokens"] = last_max_output_tokens
+    if print_pretty:
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+    return None, payload
 
-    final = postprocess_to_full(raw, user_payload)
 
-    for meal_key in ("breakfast", "lunch", "dinner"):
-        container = final.get(meal_key, {}) or {}
-        for item in container.get("items", []) or []:
-            ings = generate_ingredients_for(item.get("name", ""))
-            if ings:
-                item["ingredients"] = ings
+def finish_plan(
+    final: dict, print_pretty: bool = True, save_pretty_file: bool = True, out_path: str = None,
+    with_ingredients: bool = True,
+) -> dict:
+    """후처리된 식단에 재료/구매 링크를 붙이고 out_path(없으면 out/recommendation_<시각>.json)에 저장합니다."""
+    if with_ingredients:
+        for meal_key in ("breakfast", "lunch", "dinner"):
+            container = final.get(meal_key, {}) or {}
+            for item in container.get("items", []) or []:
+                ings = generate_ingredients_for(item.get("name", ""))
+                if ings:
+                    item["ingredients"] = ings
 
-    final = attach_coupang_search_links(final)
+        final = attach_coupang_search_links(final)
 
     if print_pretty:
         print(json.dumps(final, ensure_ascii=False, indent=2))
     else:
         print(json.dumps(final, ensure_ascii=False, separators=(",", ":")))
 
-    out_dir = "out"
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_path = os.path.join(out_dir, f"recommendation_{ts}.json")
+    if out_path is None:
+        out_dir = "out"
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        out_path = os.path.join(out_dir, f"recommendation_{ts}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     with open(out_path, "w", encoding="utf-8") as f:
         if save_pretty_file:
             json.dump(final, f, ensure_ascii=False, indent=2)
@@ -739,6 +869,28 @@ def run_generation(
     return final
 
 
+def run_generation(
+    user_payload: dict, print_pretty: bool = True, save_pretty_file: bool = True, out_path: str = None,
+    with_ingredients: bool = True,
+) -> dict:
+    """
+    out_path를 주면 결과를 그 경로에 저장합니다. 없으면 out/recommendation_<시각>.json.
+    동시에 여러 사용자를 생성할 때는 호출마다 고유한 out_path를 넘기세요.
+    with_ingredients=False면 재료 생성/구매 링크 부착을 건너뜁니다 (단계별로 저장하는 파이프라인용).
+    여러 식단을 한꺼번에 만들 때는 generate_raw_plan → postprocess_to_full_batch → finish_plan으로 나눠 부르세요.
+    """
+    raw, error = generate_raw_plan(user_payload, print_pretty=print_pretty)
+    if error is not None:
+        return error
+    return finish_plan(
+        postprocess_to_full(raw, user_payload),
+        print_pretty=print_pretty,
+        save_pretty_file=save_pretty_file,
+        out_path=out_path,
+        with_ingredients=with_ingredients,
+    )
+
+
 def main():
     # 예시 데이터 주입 실행
     _ = run_generation(EXAMPLE_USER_PAYLOAD, print_pretty=True, save_pretty_file=True)
@@ -0,0 +1,93 @@
+"""
+이미지 전처리 벤치마크
+
+업로드 한 건마다 원본 전송 대비 절약되는 바이트와 지연 시간을 출력합니다.
+- 전송 지연은 --mbps(업링크 대역폭) 기준으로 base64 페이로드 크기로부터 추정합니다.
+- --live 옵션을 주면 실제로 비전 API를 원본/전처리본으로 각각 호출해 왕복 시간을 잽니다.
+
+사용법 (프로젝트 루트에서):
+  python -m benchmarks.bench_image_preprocess photo1.jpg photo2.jpg --mbps 20
+  python -m benchmarks.bench_image_preprocess            # 이미지가 없으면 12MP 합성 사진 사용
+"""
+import argparse
+import base64
+import io
+import os
+import time
+
+from utils.image_preprocess import PIL_AVAILABLE, preprocess_image_bytes
+
+
+def _synthetic_photo() -> bytes:
+    """4000x3000 노이즈 섞인 사진(12MP)을 만들어 JPEG 바이트로 반환."""
+    from PIL import Image as PILImage
+
+    raw = os.urandom(400 * 300 * 3)
+    small = PILImage.frombytes("RGB", (400, 300), raw)
+    img = small.resize((4000, 3000), PILImage.BICUBIC)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def _b64_len(n: int) -> int:
+    return 4 * ((n + 2) // 3)
+
+
+def _upload_ms(n_bytes: int, mbps: float) -> float:
+    return n_bytes * 8 / (mbps * 1_000_000) * 1000
+
+
+def _live_ms(image_bytes: bytes, filename: str, preprocess: bool) -> float:
+    from api import Image
+
+    started = time.perf_counter()
+    Image.analyze_image_bytes(image_bytes, filename=filename, preprocess=preprocess)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing before vision analysis")
+    parser.add_argument("images", nargs="*", help="Image files (default: synthetic 12MP photo)")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Uplink bandwidth used for the estimate")
+    parser.add_argument("--live", action="store_true", help="Also call the vision API with both payloads")
+    args = parser.parse_args()
+
+    if not PIL_AVAILABLE:
+        raise SystemExit("Pillow가 필요합니다: pip install Pillow")
+
+    samples = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            samples.append((os.path.basename(path), f.read()))
+    if not samples:
+        samples.append(("synthetic_12mp.jpg", _synthetic_photo()))
+
+    total_saved = 0
+    total_latency_saved = 0.0
+    for name, data in samples:
+        out, mime, stats = preprocess_image_bytes(data, name, enabled=True)
+        b64_before = _b64_len(len(data))
+        b64_after = _b64_len(len(out))
+        up_before = _upload_ms(b64_before, args.mbps)
+        up_after = _upload_ms(b64_after, args.mbps) + stats["elapsed_ms"]
+        total_saved += b64_before - b64_after
+        total_latency_saved += up_before - up_after
+
+        print(f"[{name}] {stats['original_size']} → {stats['output_size']} ({mime})")
+        print(f"  payload(b64): {b64_before:,}B → {b64_after:,}B  (saved {b64_before - b64_after:,}B, "
+              f"{(1 - b64_after / b64_before) * 100:.1f}%)")
+        print(f"  preprocess: {stats['elapsed_ms']}ms")
+        print(f"  est. upload @{args.mbps}Mbps: {up_before:.0f}ms → {up_after:.0f}ms (incl. preprocess)")
+
+        if args.live:
+            live_before = _live_ms(data, name, preprocess=False)
+            live_after = _live_ms(data, name, preprocess=True)
+            print(f"  live round trip: {live_before:.0f}ms → {live_after:.0f}ms")
+
+    n = len(samples)
+    print(f"\n평균: 업로드당 {total_saved / n:,.0f}B 절약, 추정 지연 {total_latency_saved / n:.0f}ms 감소")
+
+
+if __name__ == "__main__":
+    main()
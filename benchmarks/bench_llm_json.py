@@ -0,0 +1,256 @@
+"""
+LLM 응답 JSON 파싱 벤치마크
+
+utils.llm_json.parse_model_json(단일 패스)와 이전 정규식 캐스케이드를 같은 응답 묶음에 돌려
+성공률과 응답당 파싱 시간을 비교합니다.
+
+- legacy_plan : 식단 생성 루프가 쓰던 is_likely_truncated + safe_parse_json(_repair_model_json)
+- legacy_image: Image.py가 쓰던 json.loads(clean_json_text(extract_json(text)))
+- single_pass : parse_model_json
+
+기록해 둔 응답이 있으면 --corpus 로 넘기세요 (JSONL, 한 줄에 {"text": "..."} 또는 {"kind": ..., "text": ...}).
+없으면 식단/재료/이미지 분석 응답 모양을 본뜬 합성 코퍼스를 만들어 씁니다.
+
+사용법 (프로젝트 루트에서):
+  python -m benchmarks.bench_llm_json
+  python -m benchmarks.bench_llm_json --corpus recorded_responses.jsonl --repeat 200
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+from utils.llm_json import parse_model_json
+
+
+# =====================
+# 이전 구현 (비교용으로 그대로 옮겨 둠)
+# =====================
+
+def _legacy_strip_json_strings(src):
+    return re.sub(r'"(\\.|[^"\\])*"', "", src)
+
+
+def legacy_is_likely_truncated(text):
+    if not text:
+        return True
+    stripped = text.strip()
+    if not stripped.endswith(("}", "]")):
+        return True
+    tmp = _legacy_strip_json_strings(stripped)
+    if tmp.count("{") != tmp.count("}"):
+        return True
+    if tmp.count("[") != tmp.count("]"):
+        return True
+    return False
+
+
+def _legacy_repair_model_json(src):
+    cleaned = src.replace("\u200b", "").strip()
+    cleaned = re.sub(r",(\s*[}\]])", r"\1", cleaned)
+    cleaned = re.sub(r"([\{,]\s*)'([^']+)'\s*:", lambda m: f'{m.group(1)}"{m.group(2)}":', cleaned)
+    cleaned = re.sub(r":\s*'([^'\\]*)'", lambda m: ':"%s"' % m.group(1).replace('"', '\\"'), cleaned)
+    cleaned = re.sub(r"\bTrue\b", "true", cleaned)
+    cleaned = re.sub(r"\bFalse\b", "false", cleaned)
+    cleaned = re.sub(r"\bNone\b", "null", cleaned)
+    return cleaned
+
+
+def legacy_safe_parse_json(s):
+    if not s:
+        return None
+    s2 = s.replace("``````", "").strip()
+    s2 = s2.replace("‘", "'").replace("’", "'").replace("“", '"').replace("”", '"')
+    s3 = _legacy_repair_model_json(s2)
+    for candidate in (s2, s3):
+        try:
+            return json.loads(candidate)
+        except Exception:
+            continue
+    for candidate in (s3, s2):
+        try:
+            m = re.search(r"(\{.*\}|\[.*\])", candidate, re.DOTALL)
+            if m:
+                return json.loads(m.group(1))
+        except Exception:
+            continue
+    return None
+
+
+def legacy_plan(text):
+    if legacy_is_likely_truncated(text):
+        return None
+    return legacy_safe_parse_json(text)
+
+
+def _legacy_extract_json(text):
+    codeblock = re.search(r"```(?:json)?\n(.*?)\n```", text, re.S | re.I)
+    if codeblock:
+        return codeblock.group(1).strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end != -1 and end > start:
+        return text[start : end + 1].strip()
+    return text.strip()
+
+
+def _legacy_clean_json_text(s):
+    if not s:
+        return s
+    s = re.sub(r"```(?:json)?\n|```", "", s, flags=re.I)
+    s = s.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
+    s = re.sub(r"/\*.*?\*/", "", s, flags=re.S)
+    s = re.sub(r"(^|\n)\s*//.*?(?=\n|$)", "\n", s)
+    s = re.sub(r",\s*([}\]])", r"\1", s)
+    return s.strip()
+
+
+def legacy_image(text):
+    try:
+        return json.loads(_legacy_clean_json_text(_legacy_extract_json(text)))
+    except Exception:
+        return None
+
+
+def single_pass(text):
+    result = parse_model_json(text)
+    return result.value if result.ok else None
+
+
+PARSERS = {
+    "legacy_plan": legacy_plan,
+    "legacy_image": legacy_image,
+    "single_pass": single_pass,
+}
+
+
+# =====================
+# 합성 코퍼스
+# =====================
+
+_DISHES = ["현미밥", "된장찌개", "계란말이", "닭가슴살 샐러드", "김치볶음밥", "두부조림", "미역국", "고등어구이"]
+
+
+def _plan(rng):
+    def meal():
+        items = []
+        for _ in range(rng.randint(2, 4)):
+            items.append({
+                "name": rng.choice(_DISHES),
+                "portion": f"{rng.randint(50, 300)}g",
+                "macros": {"carb_g": rng.randint(0, 80), "protein_g": rng.randint(0, 40), "fat_g": rng.randint(0, 25)},
+            })
+        return {"title": f"{rng.choice(_DISHES)} + {rng.choice(_DISHES)}", "subtitle": "균형 잡힌 한 끼", "items": items}
+    return {"breakfast": meal(), "lunch": meal(), "dinner": meal()}
+
+
+def _ingredients(rng):
+    return {"ingredients": [{"name": n, "amount": f"{rng.randint(1, 200)}g"} for n in rng.sample(_DISHES, 5)]}
+
+
+def _vision(rng):
+    return {
+        "foods": [{"name": rng.choice(_DISHES), "kcal": round(rng.uniform(50, 600), 1),
+                   "confidence": round(rng.random(), 2)} for _ in range(rng.randint(1, 4))],
+        "total": {"kcal": round(rng.uniform(200, 1200), 1), "is_estimate": True, "note": None},
+    }
+
+
+def _variants(obj, rng):
+    """같은 응답을 모델이 자주 내는 형태로 변형합니다. (kind, text, 기대 결과 or None=실패가 정답)"""
+    clean = json.dumps(obj, ensure_ascii=False)
+    pretty = json.dumps(obj, ensure_ascii=False, indent=2)
+    yield "clean", clean, obj
+    yield "fenced", f"```json\n{pretty}\n```", obj
+    yield "prose", f"요청하신 결과입니다.\n{pretty}\n도움이 되었길 바랍니다!", obj
+    yield "trailing_comma", re.sub(r"(\]|\}|\d|\")(\n\s*[\]\}])", r"\1,\2", pretty), obj
+    smart = re.sub(r'"([^"]*)"', lambda m: f"“{m.group(1)}”", clean)
+    yield "smart_quotes", smart, obj
+    py = repr(obj)
+    yield "python_literal", py, obj
+    cut = rng.randint(len(clean) // 3, len(clean) - 2)
+    yield "truncated", clean[:cut], None
+
+
+def synthetic_corpus(n, seed):
+    rng = random.Random(seed)
+    makers = [_plan, _ingredients, _vision]
+    corpus = []
+    for _ in range(n):
+        obj = rng.choice(makers)(rng)
+        corpus.extend(_variants(obj, rng))
+    return corpus
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            text = rec["text"] if isinstance(rec, dict) else str(rec)
+            kind = rec.get("kind", "recorded") if isinstance(rec, dict) else "recorded"
+            corpus.append((kind, text, rec.get("expected") if isinstance(rec, dict) else None))
+    return corpus
+
+
+# =====================
+# 측정
+# =====================
+
+def _correct(value, expected, has_expected):
+    if not has_expected:
+        return value is not None
+    if expected is None:
+        return value is None
+    return value == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-pass model JSON parser with the old regex cascade")
+    parser.add_argument("--corpus", help="JSONL of recorded responses ({'text': ..., 'kind'?, 'expected'?})")
+    parser.add_argument("--samples", type=int, default=200, help="Synthetic responses per variant")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions over the corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        has_expected = any(exp is not None for _, _, exp in corpus)
+    else:
+        corpus = synthetic_corpus(args.samples, args.seed)
+        has_expected = True
+
+    kinds = sorted({k for k, _, _ in corpus})
+    print(f"corpus: {len(corpus)} responses ({'recorded' if args.corpus else 'synthetic'})\n")
+
+    header = f"{'variant':<16}" + "".join(f"{name:>14}" for name in PARSERS)
+    print("정답률 (잘린 응답은 '파싱 거부'가 정답)")
+    print(header)
+    for kind in kinds:
+        rows = [(t, e) for k, t, e in corpus if k == kind]
+        cells = []
+        for fn in PARSERS.values():
+            ok = sum(_correct(fn(t), e, has_expected) for t, e in rows)
+            cells.append(f"{ok / len(rows) * 100:>13.1f}%")
+        print(f"{kind:<16}" + "".join(cells))
+
+    print("\n응답당 평균 파싱 시간")
+    print(header)
+    for kind in kinds + ["(all)"]:
+        texts = [t for k, t, _ in corpus if kind == "(all)" or k == kind]
+        cells = []
+        for fn in PARSERS.values():
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                for t in texts:
+                    fn(t)
+            us = (time.perf_counter() - started) / (args.repeat * len(texts)) * 1e6
+            cells.append(f"{us:>12.1f}us")
+        print(f"{kind:<16}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    main()
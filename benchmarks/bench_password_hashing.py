@@ -0,0 +1,65 @@
+"""
+비밀번호 검증 처리량 / 이벤트 루프 지연 벤치마크
+
+같은 이벤트 루프에서 로그인 N건을 동시에 처리하면서, 10ms마다 깨어나는 하트비트 작업의 최대 지연을 잽니다.
+
+- on_loop : 이전 방식. async 핸들러 안에서 pwd_context.verify를 그대로 호출 (루프가 bcrypt 동안 멈춤)
+- pool    : account.passwords.verify_and_update (전용 스레드 풀)
+
+사용법 (프로젝트 루트에서):
+  python -m benchmarks.bench_password_hashing
+  python -m benchmarks.bench_password_hashing --logins 64 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import time
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def _run(verify_one, logins: int):
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(_heartbeat(stop, lags))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*[verify_one() for _ in range(logins)])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    return logins / elapsed, max(lags) * 1000 if lags else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput and event-loop stall: bcrypt on the loop vs thread pool")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost (BCRYPT_ROUNDS)")
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from account import passwords  # config가 BCRYPT_ROUNDS를 읽은 뒤 임포트
+
+    hashed = passwords.pwd_context.hash("benchmark-password1")
+
+    async def on_loop():
+        passwords.pwd_context.verify("benchmark-password1", hashed)
+
+    async def pool():
+        await passwords.verify_and_update("benchmark-password1", hashed)
+
+    print(f"cpu: {os.cpu_count()}  bcrypt rounds: {args.rounds}  logins: {args.logins}  "
+          f"pool workers: {passwords._executor._max_workers}\n")
+    print(f"{'path':<10}{'logins/s':>10}{'max loop stall':>18}")
+    for name, verify_one in (("on_loop", on_loop), ("pool", pool)):
+        rate, stall = asyncio.run(_run(verify_one, args.logins))
+        print(f"{name:<10}{rate:>10.1f}{stall:>15.1f}ms")
+    passwords.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+식단 후처리 일괄(NumPy) vs 항목별 벤치마크
+
+합성 식단 N개(기본 10,000개, 식단당 15개 항목)를
+postprocess_to_full 반복 호출과 postprocess_to_full_batch로 각각 처리해 시간을 비교하고,
+두 결과가 JSON 직렬화 기준으로(타입까지) 완전히 같은지 확인합니다.
+결과 dict를 대량으로 만드는 동안 순환 GC가 시간을 잡아먹으므로, 측정 구간에서는 (이 스크립트가) GC를 멈춥니다.
+
+사용법 (프로젝트 루트에서):
+  python -m benchmarks.bench_plan_postprocess
+  python -m benchmarks.bench_plan_postprocess --plans 50000 --seed 3
+"""
+import argparse
+import gc
+import json
+import random
+import time
+
+import main  # noqa: F401  (api 패키지의 순환 임포트를 피하려고 앱을 먼저 로드)
+from api.user_to_meal import NUMPY_AVAILABLE, postprocess_to_full, postprocess_to_full_batch
+
+_NAMES = [
+    "현미밥", "잡곡밥", "두부조림", "시금치나물", "배추김치", "계란말이", "된장찌개", "불고기",
+    "닭가슴살 구이", "오이무침", "구운 연어", "그릭요거트", "바나나", "미소된장국", "고구마",
+]
+
+
+def _macro(rng):
+    # 모델 출력처럼 정수/소수 1자리/반올림 경계값(x.125 등)을 섞습니다.
+    kind = rng.random()
+    if kind < 0.3:
+        return rng.randint(0, 60)
+    if kind < 0.9:
+        return round(rng.uniform(0, 60), 1)
+    return rng.randint(0, 480) / 8
+
+
+def synthetic_plans(n, seed):
+    rng = random.Random(seed)
+    raws, payloads = [], []
+    for _ in range(n):
+        raw = {}
+        for meal_key in ("breakfast", "lunch", "dinner"):
+            items = []
+            for _ in range(5):
+                item = {"name": rng.choice(_NAMES), "prep_time_min": rng.randint(0, 40)}
+                if rng.random() < 0.9:
+                    item["macros"] = {"protein_g": _macro(rng), "carb_g": _macro(rng), "fat_g": _macro(rng)}
+                items.append(item)
+            raw[meal_key] = {"title": "현미밥과 두부조림", "subtitle": "담백한 한 끼", "items": items}
+        raws.append(raw)
+        payloads.append({"daily_calorie_target": rng.choice([1600, 1800.0, 2000, None])})
+    return raws, payloads
+
+
+class _gc_paused:
+    """단일 스레드 오프라인 루프용: 측정 구간 동안 순환 GC를 멈추고 끝나면 되돌립니다."""
+
+    def __enter__(self):
+        gc.collect()
+        gc.freeze()
+        self._was_enabled = gc.isenabled()
+        gc.disable()
+
+    def __exit__(self, *exc):
+        if self._was_enabled:
+            gc.enable()
+        gc.unfreeze()
+
+
+def main_():
+    parser = argparse.ArgumentParser(description="Benchmark batch (NumPy) vs per-item meal plan post-processing")
+    parser.add_argument("--plans", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        raise SystemExit("numpy가 필요합니다: pip install numpy")
+
+    raws, payloads = synthetic_plans(args.plans, args.seed)
+    postprocess_to_full_batch(raws[:10], payloads[:10])  # 이름 인덱스 캐시 워밍업
+
+    with _gc_paused():
+        started = time.perf_counter()
+        scalar = [postprocess_to_full(r, p) for r, p in zip(raws, payloads)]
+        scalar_s = time.perf_counter() - started
+
+    with _gc_paused():
+        started = time.perf_counter()
+        batch = postprocess_to_full_batch(raws, payloads)
+        batch_s = time.perf_counter() - started
+
+    mismatches = sum(
+        json.dumps(a, ensure_ascii=False, sort_keys=True) != json.dumps(b, ensure_ascii=False, sort_keys=True)
+        for a, b in zip(scalar, batch)
+    )
+    items = sum(len(r[k]["items"]) for r in raws for k in ("breakfast", "lunch", "dinner"))
+    print(f"plans: {args.plans:,}  items: {items:,}")
+    print(f"scalar: {scalar_s * 1000:,.0f}ms  ({args.plans / scalar_s:,.0f} plans/s)")
+    print(f"batch : {batch_s * 1000:,.0f}ms  ({args.plans / batch_s:,.0f} plans/s)  x{scalar_s / batch_s:.2f}")
+    print(f"mismatched plans: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main_()
@@ -8,12 +8,111 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = float(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
+# 읽기 복제본 (database.get_read_db): 쉼표로 구분한 DB URL 목록, 비우면 모든 읽기를 primary에서
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+# primary에 쓴 클라이언트의 읽기를 primary로 고정하는 시간 (복제 지연보다 길게)
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# DB 커넥션 풀 (utils/db_pool.py). SQLite는 크기/오버플로/타임아웃을 적용하지 않습니다.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 초, -1이면 재활용 안 함
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# 시간대 (utils/timeutil.py)
+# DB_TIMEZONE: naive DateTime 컬럼을 저장/해석하는 기준 (비우면 서버 로컬 시간)
+DB_TIMEZONE = os.getenv("DB_TIMEZONE", "")
+DEFAULT_USER_TIMEZONE = os.getenv("DEFAULT_USER_TIMEZONE", "Asia/Seoul")
+EATEN_FOOD_RANGE_MAX_DAYS = int(os.getenv("EATEN_FOOD_RANGE_MAX_DAYS", "93"))
+# UserDailyNutrition 합계를 나누는 날짜 기준 (비우면 DEFAULT_USER_TIMEZONE)
+NUTRITION_ROLLUP_TIMEZONE = os.getenv("NUTRITION_ROLLUP_TIMEZONE", "")
+# 기록 목록 커서 페이지네이션 (기본/최대 페이지 크기)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "100"))
+# 인증 캐시 (account/identity.py): 디코딩된 토큰 / 사용자 프로필 스냅샷
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_TOKEN_CACHE_SECONDS = int(os.getenv("AUTH_TOKEN_CACHE_SECONDS", "60"))
+AUTH_USER_CACHE_SECONDS = int(os.getenv("AUTH_USER_CACHE_SECONDS", "30"))
+# 비밀번호 해시 (account/passwords.py): bcrypt 비용, 전용 스레드 수 (0이면 CPU 수)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+
 # S3 Configuration
 S3_BUCKET = os.getenv("S3_BUCKET")
 S3_REGION = os.getenv("AWS_REGION", "ap-northeast-2")
 MEAL_PIC_OUT_DIR = os.getenv("MEAL_PIC_OUT_DIR", "meal_pics")
+S3_UPLOAD_RETRIES = int(os.getenv("S3_UPLOAD_RETRIES", "2"))
 
 #AI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL")
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
\ No newline at end of file
+YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+
+# OpenAI 커넥션 풀 (모든 모듈이 utils/openai_client.py의 공용 클라이언트를 사용)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+# 재시도는 utils/resilience.py가 담당하므로 SDK 자체 재시도는 기본적으로 끕니다(중복 재시도 방지).
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "0"))
+
+# 비전 분석 전 이미지 전처리 (utils/image_preprocess.py)
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() in ("1", "true", "yes")
+IMAGE_MAX_LONG_SIDE = int(os.getenv("IMAGE_MAX_LONG_SIDE", "2048"))
+IMAGE_MAX_SHORT_SIDE = int(os.getenv("IMAGE_MAX_SHORT_SIDE", "768"))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# 먹은 음식 이미지 분석 결과 캐시 (utils/image_cache.py)
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+IMAGE_CACHE_HAMMING_THRESHOLD = int(os.getenv("IMAGE_CACHE_HAMMING_THRESHOLD", "6"))
+
+# 여러 장 이미지 일괄 분석 (POST /users/eaten-food-images)
+BATCH_IMAGE_MAX_FILES = int(os.getenv("BATCH_IMAGE_MAX_FILES", "10"))
+BATCH_ANALYSIS_CONCURRENCY = int(os.getenv("BATCH_ANALYSIS_CONCURRENCY", "4"))
+BATCH_MULTI_IMAGE_MAX = int(os.getenv("BATCH_MULTI_IMAGE_MAX", "3"))
+
+# 비전 추정치 로컬 검증 (utils/nutrition_reference.py)
+NUTRITION_CHECK_ENABLED = os.getenv("NUTRITION_CHECK_ENABLED", "true").lower() in ("1", "true", "yes")
+NUTRITION_KCAL_TOLERANCE = float(os.getenv("NUTRITION_KCAL_TOLERANCE", "0.15"))
+NUTRITION_RANGE_TOLERANCE = float(os.getenv("NUTRITION_RANGE_TOLERANCE", "0.6"))
+NUTRITION_CONTAIN_RATIO = float(os.getenv("NUTRITION_CONTAIN_RATIO", "0.4"))
+NUTRITION_FUZZY_THRESHOLD = float(os.getenv("NUTRITION_FUZZY_THRESHOLD", "0.6"))
+
+# 식단 항목 탄단지: 기준표 우선 사용 / LLM에게 탄단지를 요청할지 여부
+# PLAN_LLM_MACROS=false면 스키마에서 macros를 빼고, 기준표에 없는 항목은 분류별 대략값을 씁니다.
+PLAN_DB_MACROS_ENABLED = os.getenv("PLAN_DB_MACROS_ENABLED", "true").lower() in ("1", "true", "yes")
+PLAN_LLM_MACROS = os.getenv("PLAN_LLM_MACROS", "true").lower() in ("1", "true", "yes")
+
+# 세그먼트별 사전 생성 식단 풀 (ai/recommendation_pool.py, 야간 배치로 채움)
+RECOMMENDATION_POOL_ENABLED = os.getenv("RECOMMENDATION_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+RECOMMENDATION_POOL_PER_SEGMENT = int(os.getenv("RECOMMENDATION_POOL_PER_SEGMENT", "3"))
+RECOMMENDATION_POOL_MAX_SEGMENTS = int(os.getenv("RECOMMENDATION_POOL_MAX_SEGMENTS", "50"))
+RECOMMENDATION_POOL_MAX_AGE_HOURS = float(os.getenv("RECOMMENDATION_POOL_MAX_AGE_HOURS", "36"))
+
+# Idempotency-Key 헤더 (utils/idempotency.py)
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "180"))
+IDEMPOTENCY_POLL_SECONDS = float(os.getenv("IDEMPOTENCY_POLL_SECONDS", "1"))
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "600"))
+
+# 식단 생성 단계별 저장 (PipelineRuns) - 이 시간 안의 미완료 실행은 재요청 시 이어서 처리
+PIPELINE_RESUME_HOURS = float(os.getenv("PIPELINE_RESUME_HOURS", "24"))
+# running 상태인데 이 시간 동안 갱신이 없으면 처리하던 요청이 죽은 것으로 보고 다른 요청이 이어받습니다.
+PIPELINE_LOCK_TIMEOUT_SECONDS = float(os.getenv("PIPELINE_LOCK_TIMEOUT_SECONDS", "600"))
+
+# 전체 활성 사용자 아침 식단 일괄 생성 (ai/batch_generate.py)
+BATCH_GENERATION_WORKERS = int(os.getenv("BATCH_GENERATION_WORKERS", "4"))
+BATCH_GENERATION_CHUNK_SIZE = int(os.getenv("BATCH_GENERATION_CHUNK_SIZE", "50"))
+BATCH_ACTIVE_DAYS = int(os.getenv("BATCH_ACTIVE_DAYS", "14"))
+
+# 외부 호출 재시도/서킷 브레이커 (utils/resilience.py)
+RESILIENCE_RETRIES = int(os.getenv("RESILIENCE_RETRIES", "2"))
+RESILIENCE_BASE_DELAY = float(os.getenv("RESILIENCE_BASE_DELAY", "0.5"))
+RESILIENCE_MAX_DELAY = float(os.getenv("RESILIENCE_MAX_DELAY", "8"))
+RESILIENCE_DEADLINE_SECONDS = float(os.getenv("RESILIENCE_DEADLINE_SECONDS", "120"))
+RESILIENCE_FAILURE_THRESHOLD = int(os.getenv("RESILIENCE_FAILURE_THRESHOLD", "5"))
+RESILIENCE_RECOVERY_SECONDS = float(os.getenv("RESILIENCE_RECOVERY_SECONDS", "30"))
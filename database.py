@@ -1,8 +1,19 @@
+import itertools
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import sys
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
+from fastapi import Request
+
+import config
+from utils.db_pool import pool_options
 
 load_dotenv()
 
@@ -10,16 +21,171 @@ load_dotenv()
 database_url = os.getenv("DATABASE_URL")
 
 # database_url = os.getenv("DATABASE_URL", "sqlite:///./miniproject.db")
-engine = create_engine(database_url)
+# 풀 크기/오버플로/타임아웃/pre-ping/재활용은 config.DB_POOL_* (utils/db_pool.py)
+engine = create_engine(database_url, **pool_options(database_url))
 
 # 세션 생성
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["request_state"] = request.state
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# =====================
+# 읽기 복제본 (DATABASE_REPLICA_URLS)
+# =====================
+# 읽기 전용 핸들러는 get_read_db로 복제본을 라운드로빈으로 씁니다. 복제본이 없으면 primary.
+# 요청 중에 primary에 쓰기가 있었으면(INSERT/UPDATE/DELETE) 응답에 쿠키를 붙여
+# READ_YOUR_WRITES_SECONDS 동안 그 클라이언트의 읽기도 primary로 보냅니다 (복제 지연 때문에 방금 쓴 값이 안 보이는 문제 방지).
+# 쿠키라서 워커 프로세스가 달라도 유지됩니다.
+
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+
+replica_engines = [create_engine(url, **pool_options(url)) for url in config.DATABASE_REPLICA_URLS]
+_replica_sessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+_replica_cycle = itertools.cycle(_replica_sessions)
+_replica_lock = threading.Lock()
+
+
+def _mark_write(session: Session) -> None:
+    session.info["wrote"] = True
+    state = session.info.get("request_state")
+    if state is not None:
+        state.db_wrote = True
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    _mark_write(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write(orm_execute_state.session)
+
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    until = request.cookies.get(PRIMARY_STICKY_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request):
+    """읽기 전용 핸들러용 세션: 복제본 라운드로빈 (최근에 쓴 클라이언트는 primary)."""
+    if not _replica_sessions or reads_pinned_to_primary(request):
+        yield from get_db(request)
+        return
+    with _replica_lock:
+        make_session = next(_replica_cycle)
+    db = make_session()
     try:
         yield db
     finally:
         db.close()
+
+
+def mark_read_your_writes(request: Request, response) -> None:
+    """요청에서 primary에 썼으면 sticky 쿠키를 붙입니다 (main.py 미들웨어에서 호출)."""
+    if replica_engines and getattr(request.state, "db_wrote", False):
+        response.set_cookie(
+            key=PRIMARY_STICKY_COOKIE,
+            value=str(int(time.time() + config.READ_YOUR_WRITES_SECONDS)),
+            max_age=config.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+        )
+
+
+# =====================
+# 비동기 엔진 / 세션 (async def 핸들러용)
+# =====================
+# 같은 DATABASE_URL을 비동기 드라이버로 바꿔 씁니다: PostgreSQL → asyncpg, SQLite → aiosqlite
+# 드라이버가 없으면 AsyncSessionLocal은 None이고 get_async_db는 동기 세션을 대신 넘깁니다.
+# (run_db / AsyncCrud가 두 세션 모두 받으므로 핸들러는 그대로 동작하고, DB 호출만 이벤트 루프에서 동기로 실행됩니다.)
+
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(url: str) -> Optional[str]:
+    """동기 DB URL → 비동기 드라이버 URL. 지원하지 않는 DB면 None."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return None
+    if driver == "postgresql+asyncpg" and "sslmode" in parsed.query:
+        # asyncpg는 sslmode 대신 ssl 파라미터를 씁니다.
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_database_url = to_async_url(database_url)
+    async_engine = (
+        create_async_engine(async_database_url, **pool_options(async_database_url, is_async=True))
+        if async_database_url else None
+    )
+except ImportError as e:
+    print(f"경고: 비동기 DB 드라이버를 불러올 수 없습니다 ({e}). 비동기 DB 세션이 비활성화됩니다.")
+    async_engine = None
+
+# expire_on_commit=False: 커밋 뒤 속성에 접근해도 다시 읽지 않습니다 (비동기 세션은 지연 로딩 불가).
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False) if async_engine is not None else None
+)
+
+
+async def get_async_db(request: Request):
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        db.info["request_state"] = request.state
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        db.sync_session.info["request_state"] = request.state
+        yield db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    fn(session, *args, **kwargs)를 실행합니다. db가 AsyncSession이면 run_sync로,
+    동기 Session이면 그대로 호출합니다 (두 세션 모두 받는 공용 코드용).
+    """
+    if hasattr(db, "run_sync"):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return fn(db, *args, **kwargs)
+
+
+class AsyncCrud:
+    """
+    동기 CRUD 모듈의 함수를 AsyncSession으로 부르게 해 줍니다. (인자 이름이 db인 함수 대상, 동기 Session도 받음)
+        await account_crud.aio.get_user_profile(db=async_db, user_no=1)
+    반환된 ORM 객체는 이미 읽은 속성만 쓰세요 (관계 지연 로딩은 비동기 세션에서 동작하지 않음).
+    """
+
+    def __init__(self, module_name: str):
+        self._module_name = module_name
+
+    def __getattr__(self, name):
+        fn = getattr(sys.modules[self._module_name], name)
+
+        async def call(*args, db, **kwargs):
+            return await run_db(db, lambda session: fn(*args, db=session, **kwargs))
+
+        call.__name__ = name
+        return call
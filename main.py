@@ -1,23 +1,43 @@
 #taskkill /F /IM python.exe
 #tasklist | findstr "python"
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 import models
-from database import engine
+from database import engine, mark_read_your_writes
 
 
-from account import account_router
+from account import account_router, passwords
 from ai import ai_router
 from api import app as api_app
+from utils.openai_client import close_openai_clients
 
 models.Base.metadata.create_all(bind=engine)
+# 기존 테이블에 새로 선언된 인덱스는 배포 때 한 번: python -m models --ensure-indexes
 app = FastAPI()
 
 
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # 이 요청에서 primary에 썼으면 잠시 동안 이 클라이언트의 읽기를 primary로 (database.get_read_db)
+    response = await call_next(request)
+    mark_read_your_writes(request, response)
+    return response
+
+
 app.include_router(account_router.app, tags = ["Account"])
 app.include_router(ai_router.app, tags = ["AI"])
 app.include_router(api_app, tags = ["API"])
 
 
+@app.on_event("shutdown")
+async def shutdown_openai_clients():
+    await close_openai_clients()
+
+
+@app.on_event("shutdown")
+def shutdown_password_pool():
+    passwords.shutdown()
+
+
 @app.get("/")
 def read_root():
     return {"hi"}
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, DECIMAL, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, DECIMAL, ForeignKey, UniqueConstraint, Index, inspect
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import CreateIndex
 from datetime import datetime
+import argparse
 
 from sqlalchemy.orm import relationship
 
 from database import Base
+from utils.timeutil import db_now
 
 #DROP TABLE "Allergies", "DailyRecommendations", "Ingredients", "MealKits", "Recipes", "UserAllergies", "UserEatLevels", "UserEatenFoods", "Users" CASCADE;
 class UserAllergy(Base): #유저와 알레르기의 중간 테이블
@@ -32,7 +36,7 @@ class User(Base):
     activity_level = Column(String(50)) #운동 정도
     diet_goal = Column(String(50))
     preferred_food = Column(String(50))
-    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    created_at = Column(DateTime, nullable=False, default=db_now)
 
     allergies = relationship("Allergy", secondary=UserAllergy.__table__, back_populates="users")
 
@@ -51,6 +55,12 @@ class Allergy(Base):
 
 class UserEatenFood(Base): #유저가 먹은 음식 기록
     __tablename__ = "UserEatenFoods"
+    __table_args__ = (
+        # 유저별 날짜 범위 조회 (get_user_eaten_foods)
+        Index("ix_UserEatenFoods_user_no_created_at", "user_no", "created_at"),
+        # 유저별 기록 목록 키셋 페이지네이션 (user_no 필터 + no desc 정렬)
+        Index("ix_UserEatenFoods_user_no_no", "user_no", "no"),
+    )
 
     no = Column(Integer, primary_key=True, autoincrement=True)
 
@@ -61,12 +71,28 @@ class UserEatenFood(Base): #유저가 먹은 음식 기록
     carbs_g = Column(DECIMAL(10, 2))
     protein_g = Column(DECIMAL(10, 2))
     fat_g = Column(DECIMAL(10, 2))
-    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    created_at = Column(DateTime, nullable=False, default=db_now) #DB_TIMEZONE 기준 (utils/timeutil.py)
 
     user = relationship("User", back_populates="eaten_foods")
 
+class UserDailyNutrition(Base): #유저별 하루 섭취 합계 (UserEatenFoods 저장 시 같은 트랜잭션에서 갱신)
+    __tablename__ = "UserDailyNutrition"
+
+    user_no = Column(Integer, ForeignKey("Users.user_no"), primary_key=True)
+    day = Column(Date, primary_key=True) #NUTRITION_ROLLUP_TIMEZONE 기준 날짜
+    calories = Column(DECIMAL(10, 2), nullable=False, default=0)
+    carbs_g = Column(DECIMAL(10, 2), nullable=False, default=0)
+    protein_g = Column(DECIMAL(10, 2), nullable=False, default=0)
+    fat_g = Column(DECIMAL(10, 2), nullable=False, default=0)
+    meal_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
 class DailyRecommendation(Base):
     __tablename__ = "DailyRecommendations"
+    __table_args__ = (
+        # 유저별 최신 추천 조회 (user_no 필터 + recommendation_id desc 정렬)
+        Index("ix_DailyRecommendations_user_no_recommendation_id", "user_no", "recommendation_id"),
+    )
 
     recommendation_id = Column(Integer, primary_key=True, autoincrement=True)
     user_no = Column(Integer, ForeignKey("Users.user_no"), nullable=False)
@@ -100,7 +126,7 @@ class MealKit(Base):
     protein_g = Column(DECIMAL(10, 2))
     fat_g = Column(DECIMAL(10, 2))
 
-    recommendation_id = Column(Integer, ForeignKey("DailyRecommendations.recommendation_id"))
+    recommendation_id = Column(Integer, ForeignKey("DailyRecommendations.recommendation_id"), index=True)
     recommendation = relationship("DailyRecommendation", back_populates="meal_kits")
 
 
@@ -125,7 +151,7 @@ class Ingredient(Base): #재료
     image_url = Column(String(255), default="None")
     purchase_link = Column(String(255), default="None")
 
-    recipe_id = Column(Integer, ForeignKey("Recipes.recipe_id"), nullable=False)
+    recipe_id = Column(Integer, ForeignKey("Recipes.recipe_id"), nullable=False, index=True)
     recipes = relationship("Recipe", back_populates="ingredients")
 
 class UserEatLevel(Base): #유저 아점저 먹는 정도
@@ -138,3 +164,131 @@ class UserEatLevel(Base): #유저 아점저 먹는 정도
     dinner = Column(String(50))
 
     user = relationship("User", back_populates="eat_level")
+
+
+class RecommendationPool(Base): #세그먼트별 미리 생성해 둔 하루 식단 (야간 배치)
+    __tablename__ = "RecommendationPools"
+
+    pool_id = Column(Integer, primary_key=True, autoincrement=True)
+    segment_key = Column(String(100), nullable=False, index=True)
+    meals_json = Column(Text, nullable=False) #아점저 분석 결과(이미지 URL/레시피 포함) JSON 배열
+    served_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.now, index=True)
+
+
+class BatchCheckpoint(Base): #배치 작업 진행 위치 (중단 후 이어서 실행)
+    __tablename__ = "BatchCheckpoints"
+
+    job_key = Column(String(100), primary_key=True) #예: daily_plan:2025-01-31
+    last_user_no = Column(Integer, nullable=False, default=0) #여기까지(포함) 처리 완료
+    processed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0) #아직 실패 상태인 사용자 수 (BatchFailedUsers 행 수)
+    started_at = Column(DateTime, nullable=False, default=datetime.now)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+    finished_at = Column(DateTime)
+
+
+class BatchFailedUser(Base): #배치 작업에서 생성에 실패한 사용자 (다음 실행 때 다시 시도)
+    __tablename__ = "BatchFailedUsers"
+
+    job_key = Column(String(100), ForeignKey("BatchCheckpoints.job_key"), primary_key=True)
+    user_no = Column(Integer, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+class PipelineRun(Base): #식단 생성 파이프라인 단계별 결과 (실패 후 재시도 시 완료된 단계 재사용)
+    __tablename__ = "PipelineRuns"
+
+    run_id = Column(String(32), primary_key=True)
+    user_no = Column(Integer, ForeignKey("Users.user_no"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="running") #running / failed / completed
+    stage = Column(String(20)) #마지막으로 완료한 단계
+    plan_json = Column(Text) #식단 (모델 출력 후처리 결과)
+    ingredients_json = Column(Text) #음식명 → 재료 목록
+    images_json = Column(Text) #끼니별 로컬 이미지 경로 / S3 URL
+    recipes_json = Column(Text) #analyze_foods 결과
+    result_json = Column(Text) #저장된 추천 요약 (완료 시)
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+class IdempotencyKey(Base): #Idempotency-Key 헤더로 들어온 POST 요청의 처리 상태/응답
+    __tablename__ = "IdempotencyKeys"
+    __table_args__ = (UniqueConstraint("user_no", "endpoint", "idem_key"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_no = Column(Integer, ForeignKey("Users.user_no"), nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    idem_key = Column(String(100), nullable=False)
+    fingerprint = Column(String(64)) #같은 키로 다른 요청이 오는 것을 막기 위한 요청 해시
+    status = Column(String(20), nullable=False, default="processing") #processing / completed
+    response_json = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+
+def _create_index(bind, index: Index) -> None:
+    """
+    PostgreSQL은 CREATE INDEX CONCURRENTLY IF NOT EXISTS로 만듭니다 (테이블 쓰기를 막지 않음, 트랜잭션 밖에서 실행).
+    CONCURRENTLY가 중간에 실패하면 INVALID 인덱스가 남으므로 DROP INDEX 후 다시 실행하세요.
+    """
+    if bind.dialect.name == "postgresql":
+        options = index.dialect_options["postgresql"]
+        options["concurrently"] = True
+        try:
+            with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        finally:
+            options["concurrently"] = False
+        return
+    with bind.begin() as conn:
+        conn.execute(CreateIndex(index, if_not_exists=bind.dialect.name == "sqlite"))
+
+
+def ensure_indexes(bind) -> list:
+    """
+    이미 있는 테이블에 모델에 선언된 인덱스 중 빠진 것을 만듭니다. (create_all은 기존 테이블의 인덱스를 추가하지 않음)
+    만든 인덱스 이름 목록을 반환합니다.
+    큰 테이블에서는 오래 걸리므로 앱 시작 시가 아니라 배포 때 한 번 실행합니다: python -m models --ensure-indexes
+    동시에 여러 번 실행돼도 이미 만들어진 인덱스는 건너뜁니다.
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                _create_index(bind, index)
+            except DBAPIError:
+                # 다른 프로세스가 먼저 만든 경우 (IF NOT EXISTS가 없는 DB)
+                if index.name not in {ix["name"] for ix in inspect(bind).get_indexes(table.name)}:
+                    raise
+                continue
+            created.append(index.name)
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database schema maintenance")
+    parser.add_argument("--ensure-indexes", action="store_true", help="create indexes declared in models but missing in the DB")
+    args = parser.parse_args()
+    if not args.ensure_indexes:
+        parser.print_help()
+        return
+
+    from database import engine
+
+    Base.metadata.create_all(bind=engine)
+    created = ensure_indexes(engine)
+    print(f"인덱스 생성: {', '.join(created) if created else '없음 (모두 있음)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+DB 커넥션 풀 설정 + 체크아웃 대기 시간 측정
+
+- pool_options(url): config의 DB_POOL_* 값을 create_engine 인자로 만듭니다.
+  SQLite는 파일 잠금 때문에 커넥션을 늘려도 이득이 없어 크기/오버플로/타임아웃은 기본값을 둡니다.
+- TimedQueuePool / TimedAsyncAdaptedQueuePool: 커넥션을 빌릴 때(checkout) 기다린 시간을 기록합니다.
+  풀이 꽉 차서 기다리는 시간이 늘면 DB_POOL_SIZE/DB_MAX_OVERFLOW를 늘릴 때라는 신호입니다.
+- pool_metrics(engine): 풀 크기, 사용 중/대기 중 커넥션 수, 체크아웃 대기 시간 통계 (/api/metrics/db-pool)
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import config
+
+# 체크아웃 대기 시간 히스토그램 경계 (ms, 마지막 칸은 그 이상)
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record(self, waited_s: float, timed_out: bool = False):
+        ms = waited_s * 1000
+        index = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if ms < bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_s += waited_s
+            self.wait_max_s = max(self.wait_max_s, waited_s)
+            self.buckets[index] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count = self.checkouts + self.timeouts
+            labels = [f"<{b}ms" for b in WAIT_BUCKETS_MS] + [f">={WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_s / count * 1000, 3) if count else 0.0,
+                "wait_max_ms": round(self.wait_max_s * 1000, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, is_async: bool = False) -> dict:
+    """create_engine / create_async_engine에 넘길 풀 관련 인자."""
+    options = {
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def pool_metrics(engine) -> dict:
+    pool = engine.pool
+    metrics = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            timeout_s=pool.timeout(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        metrics.update(stats.snapshot())
+    return metrics
@@ -0,0 +1,176 @@
+"""
+Idempotency-Key 헤더 처리
+
+모바일 클라이언트가 타임아웃 후 같은 POST를 다시 보내도 LLM/비전 분석을 또 돌리거나
+기록을 중복 저장하지 않도록, (사용자, 엔드포인트, 키)마다 처리 상태와 응답을 IdempotencyKeys 테이블에 남깁니다.
+
+- 처음 온 요청: 행을 processing으로 만들고(유니크 제약이 잠금 역할) 실제 처리 후 응답을 저장합니다.
+- 처리 중인 중복: 원래 요청이 끝날 때까지 기다렸다가 같은 응답을 돌려줍니다.
+  같은 프로세스면 asyncio.Event로 바로 깨어나고, 다른 워커 프로세스면 IDEMPOTENCY_POLL_SECONDS 간격으로 확인합니다.
+  IDEMPOTENCY_WAIT_SECONDS 안에 끝나지 않으면 409.
+- 완료된 중복: 저장된 응답을 그대로 반환 (Idempotent-Replayed: true 헤더).
+- 같은 키로 내용이 다른 요청(fingerprint 불일치): 422.
+- 처리 중 예외가 나면 행을 지워 같은 키로 다시 시도할 수 있게 합니다 (오류 응답은 저장하지 않음).
+  클라이언트 연결 끊김 등으로 취소(CancelledError)되면 지우지 않습니다. 취소돼도 스레드로 넘긴 작업은
+  계속 돌 수 있으므로, 그 행은 IDEMPOTENCY_LOCK_TIMEOUT_SECONDS가 지나야 새 요청이 가져갑니다.
+- db는 동기 Session, AsyncSession 모두 받습니다 (database.run_db).
+- IDEMPOTENCY_TTL_HOURS가 지난 키, IDEMPOTENCY_LOCK_TIMEOUT_SECONDS 동안 갱신 없는 processing 행
+  (처리하던 프로세스가 죽은 경우)은 새 요청이 가져갑니다.
+
+사용 예:
+    return await run_idempotent(
+        db, key=idempotency_key, user_no=user_no, endpoint="eaten-food-image",
+        fingerprint=sha256_hex(image_bytes), handler=lambda: _do_work(...), response=response,
+    )
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import config
+import models
+from database import run_db
+
+MAX_KEY_LENGTH = 100
+
+# 이 프로세스에서 처리 중인 키 → 완료 시 set되는 이벤트
+_in_flight: Dict[Tuple[int, str, str], asyncio.Event] = {}
+
+
+def sha256_hex(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _query(db: Session, user_no: int, endpoint: str, key: str):
+    return db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_no == user_no,
+        models.IdempotencyKey.endpoint == endpoint,
+        models.IdempotencyKey.idem_key == key,
+    )
+
+
+def _claim(db: Session, user_no: int, endpoint: str, key: str, fingerprint: Optional[str]):
+    """(행, 내가 처리할지 여부). 다른 요청과 경합해 졌으면 (None, False) → 다시 조회."""
+    db.rollback()  # 이전 트랜잭션 스냅샷을 버리고 최신 상태를 봅니다.
+    row = _query(db, user_no, endpoint, key).first()
+    if row is not None:
+        now = datetime.now()
+        expired = row.created_at < now - timedelta(hours=config.IDEMPOTENCY_TTL_HOURS)
+        stale = (
+            row.status == "processing"
+            and row.updated_at < now - timedelta(seconds=config.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)
+        )
+        if not (expired or stale):
+            return row, False
+        # 조건부 삭제: 여러 요청이 동시에 가져가려 해도 하나만 성공합니다.
+        deleted = (
+            db.query(models.IdempotencyKey)
+            .filter(models.IdempotencyKey.id == row.id, models.IdempotencyKey.updated_at == row.updated_at)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        if not deleted:
+            return None, False
+
+    row = models.IdempotencyKey(
+        user_no=user_no, endpoint=endpoint, idem_key=key, fingerprint=fingerprint, status="processing",
+    )
+    db.add(row)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None, False
+    return row, True
+
+
+def _complete(db: Session, row_id: int, result) -> None:
+    db.query(models.IdempotencyKey).filter(models.IdempotencyKey.id == row_id).update(
+        {
+            models.IdempotencyKey.status: "completed",
+            models.IdempotencyKey.response_json: json.dumps(jsonable_encoder(result), ensure_ascii=False),
+            models.IdempotencyKey.updated_at: datetime.now(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def _release(db: Session, row_id: int) -> None:
+    db.rollback()
+    db.query(models.IdempotencyKey).filter(models.IdempotencyKey.id == row_id).delete(synchronize_session=False)
+    db.commit()
+
+
+async def run_idempotent(
+    db,
+    *,
+    key: Optional[str],
+    user_no: int,
+    endpoint: str,
+    fingerprint: Optional[str],
+    handler: Callable[[], Awaitable],
+    response: Optional[Response] = None,
+):
+    """key가 없으면 handler()를 그대로 실행합니다. 있으면 위 규칙대로 한 번만 실행하고 응답을 재사용합니다."""
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Idempotency-Key는 {MAX_KEY_LENGTH}자 이하여야 합니다.")
+
+    ident = (user_no, endpoint, key)
+    deadline = time.monotonic() + config.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        row, owned = await run_db(db, _claim, user_no, endpoint, key, fingerprint)
+        if owned:
+            break
+        if row is None:
+            continue
+        if row.fingerprint and fingerprint and row.fingerprint != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="이 Idempotency-Key는 다른 요청에 이미 사용되었습니다.")
+        if row.status == "completed":
+            if response is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+            return json.loads(row.response_json)
+
+        # 처리 중: 원래 요청이 끝나길 기다립니다.
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="같은 Idempotency-Key의 요청이 아직 처리 중입니다. 잠시 후 다시 시도하세요.")
+        event = _in_flight.get(ident)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout=config.IDEMPOTENCY_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(config.IDEMPOTENCY_POLL_SECONDS)
+
+    row_id = row.id
+    event = asyncio.Event()
+    _in_flight[ident] = event
+    try:
+        try:
+            result = await handler()
+        except Exception:
+            await run_db(db, _release, row_id)
+            raise
+        await run_db(db, _complete, row_id, result)
+        return result
+    finally:
+        _in_flight.pop(ident, None)
+        event.set()
@@ -0,0 +1,193 @@
+"""
+먹은 음식 이미지 분석 결과 캐시
+
+같은 사진을 두 번 올리거나 거의 같은 구도로 다시 찍은 경우 비전 API를 다시 호출하지 않고
+저장된 영양 분석 결과를 바로 돌려줍니다.
+
+- 1차 키: 원본 바이트의 SHA-256 (완전히 같은 파일)
+- 2차 키: 64bit dHash (축소한 흑백 이미지의 인접 픽셀 밝기 차이)
+  → BK-tree 인덱스로 해밍 거리 IMAGE_CACHE_HAMMING_THRESHOLD 이내 항목을 찾습니다.
+  비슷한 사진은 다른 사람의 식사일 수 있으므로, 근사 일치는 같은 사용자가 올린 항목에서만 찾습니다.
+  (SHA-256 완전 일치는 같은 파일이므로 사용자와 관계없이 재사용합니다.)
+- 프로세스 메모리에만 보관하며 IMAGE_CACHE_MAX_ENTRIES 개를 넘으면 LRU로 제거합니다.
+"""
+import copy
+import hashlib
+import io
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Optional
+
+import config
+
+# 선택적 임포트 - Pillow가 없으면 SHA-256 완전 일치만 사용
+try:
+    from PIL import Image as PILImage, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+ImageFingerprint = namedtuple("ImageFingerprint", ["sha256", "dhash"])
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def dhash(image_bytes: bytes, hash_size: int = 8) -> Optional[int]:
+    """difference hash. 디코딩 실패 시 None."""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        img = PILImage.open(io.BytesIO(image_bytes))
+        img.draft("L", (hash_size * 16, hash_size * 16))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("L").resize((hash_size + 1, hash_size), PILImage.LANCZOS)
+    except Exception:
+        return None
+
+    pixels = list(img.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def fingerprint(image_bytes: bytes) -> ImageFingerprint:
+    return ImageFingerprint(hashlib.sha256(image_bytes).hexdigest(), dhash(image_bytes))
+
+
+class _BKTree:
+    """해밍 거리용 BK-tree. 노드마다 같은 해시를 가진 sha256 키 집합을 보관합니다."""
+
+    def __init__(self):
+        self.root = None  # [hash, keys:set, children:dict[distance -> node]]
+        self.stale = 0
+
+    def add(self, value: int, key: str):
+        if self.root is None:
+            self.root = [value, {key}, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].add(key)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, {key}, {}]
+                return
+            node = child
+
+    def discard(self, value: int, key: str):
+        node = self.root
+        while node is not None:
+            d = hamming(value, node[0])
+            if d == 0:
+                if key in node[1]:
+                    node[1].discard(key)
+                    if not node[1]:
+                        self.stale += 1
+                return
+            node = node[2].get(d)
+
+    def search(self, value: int, threshold: int):
+        """(distance, key) 목록을 거리순으로 반환."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= threshold:
+                found.extend((d, k) for k in node[1])
+            for dist, child in node[2].items():
+                if d - threshold <= dist <= d + threshold:
+                    stack.append(child)
+        found.sort()
+        return found
+
+
+class ImageAnalysisCache:
+    def __init__(self, max_entries: int = 5000, hamming_threshold: int = 6):
+        self.max_entries = max_entries
+        self.hamming_threshold = hamming_threshold
+        # sha256 -> {"dhash": int|None, "users": set[user_no], "results": {detail: dict}}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tree = _BKTree()
+        self._lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_near = 0
+        self.misses = 0
+
+    def get(self, fp: ImageFingerprint, detail: int = 1, user_no: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """완전 일치는 누구의 항목이든, 근사 일치는 user_no가 올린 항목만 (user_no가 없으면 근사 일치 안 함)."""
+        with self._lock:
+            entry = self._entries.get(fp.sha256)
+            if entry and detail in entry["results"]:
+                self._entries.move_to_end(fp.sha256)
+                if user_no is not None:
+                    entry["users"].add(user_no)
+                self.hits_exact += 1
+                return copy.deepcopy(entry["results"][detail])
+
+            if user_no is not None and fp.dhash is not None and self.hamming_threshold >= 0:
+                for _, key in self._tree.search(fp.dhash, self.hamming_threshold):
+                    near = self._entries.get(key)
+                    if near and user_no in near["users"] and detail in near["results"]:
+                        self._entries.move_to_end(key)
+                        self.hits_near += 1
+                        return copy.deepcopy(near["results"][detail])
+
+            self.misses += 1
+            return None
+
+    def put(self, fp: ImageFingerprint, detail: int, result: Dict[str, Any], user_no: Optional[int] = None):
+        with self._lock:
+            entry = self._entries.get(fp.sha256)
+            if entry is None:
+                entry = {"dhash": fp.dhash, "users": set(), "results": {}}
+                self._entries[fp.sha256] = entry
+                if fp.dhash is not None:
+                    self._tree.add(fp.dhash, fp.sha256)
+            if user_no is not None:
+                entry["users"].add(user_no)
+            entry["results"][detail] = copy.deepcopy(result)
+            self._entries.move_to_end(fp.sha256)
+
+            while len(self._entries) > self.max_entries:
+                old_key, old = self._entries.popitem(last=False)
+                if old["dhash"] is not None:
+                    self._tree.discard(old["dhash"], old_key)
+
+            # 제거로 비어버린 노드가 많아지면 트리를 다시 만듭니다.
+            if self._tree.stale > max(64, self.max_entries):
+                self._rebuild()
+
+    def _rebuild(self):
+        tree = _BKTree()
+        for key, entry in self._entries.items():
+            if entry["dhash"] is not None:
+                tree.add(entry["dhash"], key)
+        self._tree = tree
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tree = _BKTree()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits_exact": self.hits_exact,
+            "hits_near": self.hits_near,
+            "misses": self.misses,
+        }
+
+
+image_analysis_cache = ImageAnalysisCache(
+    max_entries=config.IMAGE_CACHE_MAX_ENTRIES,
+    hamming_threshold=config.IMAGE_CACHE_HAMMING_THRESHOLD,
+)
@@ -0,0 +1,126 @@
+"""
+비전 분석 전 이미지 전처리
+
+- EXIF 회전 정보를 픽셀에 반영합니다.
+- 비전 모델이 실제로 사용하는 해상도까지 축소합니다.
+  (OpenAI high detail 기준: 긴 변 2048px 이내, 짧은 변 768px 이내로 맞춘 뒤 타일 분석)
+- JPEG/WebP로 재압축하고 EXIF 등 메타데이터는 저장하지 않습니다.
+
+설정(config.py):
+  IMAGE_PREPROCESS_ENABLED, IMAGE_MAX_LONG_SIDE, IMAGE_MAX_SHORT_SIDE,
+  IMAGE_OUTPUT_FORMAT(jpeg|webp), IMAGE_QUALITY
+"""
+import io
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+# 선택적 임포트 - Pillow가 없으면 원본 그대로 전송
+try:
+    from PIL import Image as PILImage, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("경고: Pillow가 설치되지 않았습니다. 이미지 전처리 없이 원본을 전송합니다.")
+
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+def _guess_mime(filename: str) -> str:
+    lower = (filename or "").lower()
+    if lower.endswith(".png"):
+        return "image/png"
+    if lower.endswith(".webp"):
+        return "image/webp"
+    if lower.endswith(".jpg") or lower.endswith(".jpeg"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+
+def target_size(width: int, height: int, max_long_side: int, max_short_side: int) -> Tuple[int, int]:
+    """긴 변/짧은 변 제한을 모두 만족하도록 비율을 유지한 크기. 확대는 하지 않습니다."""
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(1.0, max_long_side / long_side, max_short_side / short_side)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def preprocess_image_bytes(
+    image_bytes: bytes,
+    filename: str = "upload.jpg",
+    *,
+    enabled: Optional[bool] = None,
+    max_long_side: Optional[int] = None,
+    max_short_side: Optional[int] = None,
+    output_format: Optional[str] = None,
+    quality: Optional[int] = None,
+) -> Tuple[bytes, str, Dict[str, Any]]:
+    """
+    이미지 바이트를 비전 모델 전송용으로 줄여서 반환합니다.
+
+    반환: (출력 바이트, MIME, 통계 dict)
+    디코딩에 실패하거나 비활성화된 경우 원본 바이트를 그대로 돌려줍니다.
+    """
+    enabled = config.IMAGE_PREPROCESS_ENABLED if enabled is None else enabled
+    max_long_side = max_long_side or config.IMAGE_MAX_LONG_SIDE
+    max_short_side = max_short_side or config.IMAGE_MAX_SHORT_SIDE
+    fmt_key = (output_format or config.IMAGE_OUTPUT_FORMAT).lower()
+    quality = quality or config.IMAGE_QUALITY
+
+    stats: Dict[str, Any] = {
+        "original_bytes": len(image_bytes),
+        "output_bytes": len(image_bytes),
+        "original_size": None,
+        "output_size": None,
+        "elapsed_ms": 0.0,
+        "applied": False,
+    }
+    original_mime = _guess_mime(filename)
+    if not enabled or not PIL_AVAILABLE or fmt_key not in _FORMATS:
+        return image_bytes, original_mime, stats
+
+    pil_format, mime = _FORMATS[fmt_key]
+    started = time.perf_counter()
+    try:
+        img = PILImage.open(io.BytesIO(image_bytes))
+        stats["original_size"] = img.size
+
+        # JPEG은 디코딩 단계에서 1/2, 1/4, 1/8로 바로 줄여 읽을 수 있어 큰 사진에서 훨씬 빠릅니다.
+        # (목표 크기 이상으로만 줄이므로 이후 resize 품질에는 영향이 없습니다.)
+        w, h = target_size(*img.size, max_long_side, max_short_side)
+        img.draft("RGB", (w, h))
+
+        img = ImageOps.exif_transpose(img)
+        w, h = target_size(*img.size, max_long_side, max_short_side)
+        if (w, h) != img.size:
+            img = img.resize((w, h), PILImage.LANCZOS)
+
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            # 투명 배경은 흰색으로 채웁니다.
+            rgba = img.convert("RGBA")
+            background = PILImage.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+        elif pil_format == "WEBP" and img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.mode or "transparency" in img.info else "RGB")
+
+        buf = io.BytesIO()
+        # exif/icc 인자를 넘기지 않으므로 메타데이터는 저장되지 않습니다.
+        img.save(buf, format=pil_format, quality=quality, optimize=True)
+        out = buf.getvalue()
+    except Exception as e:
+        print(f"이미지 전처리 실패, 원본을 사용합니다: {e}")
+        stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return image_bytes, original_mime, stats
+
+    stats.update(
+        output_bytes=len(out),
+        output_size=img.size,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+        applied=True,
+    )
+    return out, mime, stats
@@ -0,0 +1,345 @@
+"""
+LLM 응답용 관대한(tolerant) JSON 파서
+
+모델 응답을 정규식으로 여러 번 고쳐 쓰고 json.loads를 반복 시도하는 대신,
+문자열을 앞에서부터 한 번만 훑으면서 아래 흔한 오류를 그 자리에서 받아들입니다.
+
+- 코드펜스(```json ... ```)와 앞뒤 설명 문장
+- 스마트 쿼트(“ ” ‘ ’)와 작은따옴표 문자열, 따옴표 없는 키
+- 꼬리 콤마, 빠진 콤마, // 및 /* */ 주석
+- 파이썬 리터럴(True / False / None)
+- 잘림(truncation): 입력이 끝나면 열린 컨테이너를 닫고 truncated=True로 표시
+  (끝에서 잘렸을 수 있는 마지막 문자열/숫자/키는 버립니다)
+
+정상 JSON은 C 구현(json raw_decode)으로 바로 처리합니다. 실패하면 관대한 스캐너가 앞에서부터 진행하되,
+안쪽 컨테이너 중 정상인 것은 다시 raw_decode로 통째로 건너뛰므로 문제가 있는 구간만 파이썬으로 읽습니다.
+raw_decode가 실패한 가장 먼 위치(failed_at) 앞에서 시작하는 컨테이너는 다시 시도하지 않습니다
+(같은 오류까지 매번 다시 읽으면 중첩이 깊을 때 입력 길이의 제곱만큼 걸립니다).
+실패 시 error / pos(문자 오프셋)로 정확히 어디서 멈췄는지 알려줍니다.
+
+사용 예:
+    from utils.llm_json import parse_model_json, loads_model_json
+    result = parse_model_json(text)
+    if result.truncated: ...
+    data = loads_model_json(text)   # 실패/잘림이면 ModelJSONError (json.JSONDecodeError 하위 클래스)
+"""
+import json
+import re
+from collections import namedtuple
+from json.decoder import scanstring
+from typing import Any
+
+ParseResult = namedtuple("ParseResult", ["value", "ok", "truncated", "error", "pos", "repairs"])
+
+
+class ModelJSONError(json.JSONDecodeError):
+    """파싱 실패. lineno / colno / pos 와 함께 잘림 여부(truncated)를 담습니다."""
+
+    def __init__(self, msg: str, doc: str, pos: int, truncated: bool = False):
+        super().__init__(msg, doc, pos)
+        self.truncated = truncated
+
+
+_DECODER = json.JSONDecoder()
+_START = re.compile(r"[\{\[]")
+_SKIP = re.compile(r"\s*(?:(?://[^\n]*|/\*.*?\*/)\s*)*", re.S)
+_NUMBER = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+_WORD = re.compile(r"[A-Za-z_$][\w$\-]*")
+
+_LITERALS = {"true": True, "false": False, "null": None}
+_PY_LITERALS = {"True": True, "False": False, "None": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "'": "'", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_STRUCTURAL = ",:}]"
+# 여는 따옴표 -> 닫는 따옴표 후보
+_QUOTES = {
+    '"': '"',
+    "'": "'’",
+    "“": "”\"",
+    "”": "”\"",
+    "‘": "’'",
+    "’": "’'",
+}
+
+# 문자열 안에서 다음으로 볼 필요가 있는 문자(닫는 따옴표 후보 또는 역슬래시)
+_STOPS = {q: re.compile("[%s\\\\]" % re.escape(closers)) for q, closers in _QUOTES.items()}
+_WS_START = frozenset(" \t\r\n/\ufeff")
+_JSON_FIRST = frozenset('"{[]}-0123456789tfn')
+
+_VALUE, _KEY, _COLON, _AFTER = range(4)
+
+
+class _Truncated(Exception):
+    pass
+
+
+class _Fail(Exception):
+    def __init__(self, msg: str, pos: int):
+        super().__init__(msg)
+        self.msg = msg
+        self.pos = pos
+
+
+def _locate(text: str):
+    """JSON이 시작하는 위치와 끝 한계(닫는 코드펜스)를 찾습니다."""
+    m = _START.search(text)
+    if not m:
+        return None, len(text)
+    start = m.start()
+    fence = text.find("```", 0, start)
+    if fence == -1:
+        return start, len(text)
+    close = text.find("```", start)
+    return start, (close if close != -1 else len(text))
+
+
+class _Scanner:
+    def __init__(self, text: str, start: int, limit: int, failed_at: int = 0):
+        self.text = text
+        self.start = start
+        self.limit = limit
+        self.failed_at = failed_at
+        self.repairs = set()
+
+    # ---- tokens ----
+
+    def _skip(self, i: int) -> int:
+        if i >= self.limit or self.text[i] not in _WS_START:
+            return i
+        i = _SKIP.match(self.text, i).end()
+        if self.text.startswith("/*", i):  # 닫히지 않은 주석 = 잘림
+            raise _Truncated()
+        return i
+
+    def _string(self, i: int):
+        text, limit = self.text, self.limit
+        quote = text[i]
+        if quote == '"':
+            try:
+                value, end = scanstring(text, i + 1, False)
+                if end <= limit:
+                    return value, end
+                raise _Truncated()
+            except json.JSONDecodeError as e:
+                if e.msg.startswith("Unterminated"):
+                    raise _Truncated()
+                # 잘못된 이스케이프 등은 아래 수동 스캔으로 처리
+        else:
+            self.repairs.add("quotes")
+
+        stop = _STOPS[quote]
+        heuristic = quote != '"'
+        buf = []
+        j = i + 1
+        while True:
+            m = stop.search(text, j, limit)
+            if not m:
+                raise _Truncated()
+            k = m.start()
+            buf.append(text[j:k])
+            ch = text[k]
+            if ch == "\\":
+                if k + 1 >= limit:
+                    raise _Truncated()
+                nxt = text[k + 1]
+                if nxt == "u":
+                    code = text[k + 2 : k + 6]
+                    if k + 6 > limit:
+                        raise _Truncated()
+                    try:
+                        buf.append(chr(int(code, 16)))
+                        j = k + 6
+                        continue
+                    except ValueError:
+                        pass
+                buf.append(_ESCAPES.get(nxt, "\\" + nxt))
+                j = k + 2
+                continue
+            j = k + 1
+            # 작은따옴표/스마트쿼트는 뒤에 구조 문자가 올 때만 닫는 따옴표로 봅니다 (don't 같은 경우).
+            if not heuristic or j >= limit or text[j] in _STRUCTURAL:
+                return "".join(buf), j
+            after = _SKIP.match(text, j).end()
+            if after >= limit or text[after] in _STRUCTURAL:
+                return "".join(buf), j
+            buf.append(ch)
+
+    def _scalar(self, i: int):
+        """숫자 또는 리터럴. 입력 끝에 닿은 토큰은 잘렸을 수 있으므로 _Truncated."""
+        text = self.text
+        m = _NUMBER.match(text, i)
+        if m:
+            if m.end() >= self.limit:
+                raise _Truncated()
+            raw = m.group()
+            if any(c in raw for c in ".eE"):
+                return float(raw), m.end()
+            return int(raw), m.end()
+        m = _WORD.match(text, i)
+        if m:
+            if m.end() >= self.limit:
+                raise _Truncated()
+            word = m.group()
+            if word in _LITERALS:
+                return _LITERALS[word], m.end()
+            if word in _PY_LITERALS:
+                self.repairs.add("python_literal")
+                return _PY_LITERALS[word], m.end()
+            raise _Fail(f"unexpected identifier {word!r}", i)
+        if text[i] in "-+." and i + 1 >= self.limit:
+            raise _Truncated()
+        raise _Fail(f"unexpected character {text[i]!r}", i)
+
+    # ---- structure ----
+
+    def run(self):
+        text, limit = self.text, self.limit
+        stack = []  # [container, is_object, pending_key]
+        root = None
+        state = _VALUE
+        after_comma = False
+        i = self.start
+        try:
+            while True:
+                if i < limit and text[i] in _WS_START:
+                    i = self._skip(i)
+                if i >= limit:
+                    raise _Truncated()
+                c = text[i]
+
+                if state == _AFTER:
+                    frame = stack[-1]
+                    if c == ",":
+                        i += 1
+                        after_comma = True
+                        state = _KEY if frame[1] else _VALUE
+                        continue
+                    if c == ("}" if frame[1] else "]"):
+                        i += 1
+                        stack.pop()
+                        if not stack:
+                            return root, i
+                        continue
+                    if c in "}]":
+                        raise _Fail(f"mismatched {c!r}", i)
+                    # 콤마 없이 다음 값이 바로 나오는 경우
+                    self.repairs.add("missing_comma")
+                    after_comma = False
+                    state = _KEY if frame[1] else _VALUE
+                    continue
+
+                if state == _COLON:
+                    if c not in ":=":
+                        raise _Fail("expected ':'", i)
+                    i += 1
+                    state = _VALUE
+                    continue
+
+                if state == _KEY:
+                    if c == "}":
+                        if after_comma:
+                            self.repairs.add("trailing_comma")
+                        state = _AFTER
+                        continue
+                    if c in _QUOTES:
+                        key, end = self._string(i)
+                    else:
+                        m = _WORD.match(text, i) or _NUMBER.match(text, i)
+                        if not m:
+                            raise _Fail(f"expected object key, got {c!r}", i)
+                        if m.end() >= limit:
+                            raise _Truncated()
+                        self.repairs.add("bare_key")
+                        key, end = m.group(), m.end()
+                    stack[-1][2] = key
+                    i = end
+                    state = _COLON
+                    continue
+
+                # state == _VALUE
+                if c == "]" and stack and not stack[-1][1]:
+                    if after_comma:
+                        self.repairs.add("trailing_comma")
+                    state = _AFTER
+                    continue
+                opened = False
+                if c in "{[":
+                    # 안쪽 컨테이너가 정상 JSON이면 C 디코더로 통째로 읽고 넘어갑니다.
+                    # (첫 토큰부터 JSON이 아니면 — 작은따옴표/스마트쿼트 키 등 — 시도하지 않습니다.)
+                    # 바깥 컨테이너의 raw_decode가 이미 실패한 구간 안이면 같은 오류를 다시 만나므로 건너뜁니다.
+                    end = limit + 1
+                    first = self._skip(i + 1)
+                    if stack and i >= self.failed_at and first < limit and text[first] in _JSON_FIRST:
+                        try:
+                            value, end = _DECODER.raw_decode(text, i)
+                        except json.JSONDecodeError as e:
+                            self.failed_at = max(self.failed_at, e.pos)
+                            end = limit + 1
+                    if end > limit:
+                        value = {} if c == "{" else []
+                        end = i + 1
+                        opened = True
+                elif c in _QUOTES:
+                    value, end = self._string(i)
+                else:
+                    value, end = self._scalar(i)
+
+                if not stack:
+                    root = value
+                elif stack[-1][1]:
+                    stack[-1][0][stack[-1][2]] = value
+                else:
+                    stack[-1][0].append(value)
+                i = end
+                after_comma = False
+                if opened:
+                    stack.append([value, c == "{", None])
+                    state = _KEY if c == "{" else _VALUE
+                else:
+                    state = _AFTER
+        except _Truncated:
+            raise _Truncated(root)
+
+
+def parse_model_json(text: str, *, allow_truncated: bool = True) -> ParseResult:
+    """
+    모델 응답에서 첫 JSON 객체/배열을 파싱합니다.
+
+    반환: ParseResult(value, ok, truncated, error, pos, repairs)
+    - truncated: 입력이 JSON 도중에 끝남. allow_truncated면 value에 닫아준 부분 결과가 들어갑니다.
+    - error / pos: 실패 사유와 문자 오프셋 (성공 시 None)
+    - repairs: 적용한 관용 처리 이름들 (예: "trailing_comma", "python_literal")
+    """
+    if not text:
+        return ParseResult(None, False, True, "empty input", 0, ())
+    start, limit = _locate(text)
+    if start is None:
+        return ParseResult(None, False, False, "no JSON object or array found", 0, ())
+
+    failed_at = 0
+    try:
+        value, end = _DECODER.raw_decode(text, start)
+        if end <= limit:
+            repairs = ("fence",) if limit < len(text) else ()
+            return ParseResult(value, True, False, None, None, repairs)
+    except json.JSONDecodeError as e:
+        failed_at = e.pos
+
+    scanner = _Scanner(text, start, limit, failed_at)
+    if limit < len(text):
+        scanner.repairs.add("fence")
+    try:
+        value, _ = scanner.run()
+    except _Fail as e:
+        return ParseResult(None, False, False, e.msg, e.pos, tuple(sorted(scanner.repairs)))
+    except _Truncated as e:
+        partial = e.args[0] if e.args and allow_truncated else None
+        return ParseResult(partial, False, True, "unexpected end of input", limit, tuple(sorted(scanner.repairs)))
+    return ParseResult(value, True, False, None, None, tuple(sorted(scanner.repairs)))
+
+
+def loads_model_json(text: str) -> Any:
+    """parse_model_json의 엄격한 버전. 실패하거나 잘렸으면 ModelJSONError."""
+    result = parse_model_json(text, allow_truncated=False)
+    if not result.ok:
+        raise ModelJSONError(result.error, text or "", result.pos or 0, truncated=result.truncated)
+    return result.value
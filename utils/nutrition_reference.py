@@ -0,0 +1,301 @@
+"""
+한국 음식 영양 기준표 + 비전 추정치 검증/보정
+
+비전 모델이 돌려준 항목별 kcal / 탄단지를 추가 LLM 호출 없이 로컬에서 점검합니다.
+- 매크로 산술: kcal ≈ 4*탄수화물 + 4*단백질 + 9*지방 (NUTRITION_KCAL_TOLERANCE 이내인지)
+- 기준 범위: 기준표 1인분(또는 portion_g) 환산 kcal의 ±NUTRITION_RANGE_TOLERANCE 이내인지
+
+기준표는 영어 스네이크케이스 key(모델 응답의 items key)와 name_ko 양쪽으로 찾습니다.
+수치는 일반적인 1인분 기준 대표값입니다(식약처 식품영양성분 DB 등 공개 자료를 반올림).
+
+식단 추천(postprocess_to_full)은 같은 표를 match_name()으로 조회해 항목 탄단지를 결정적으로 채웁니다.
+이름 인덱스: 정규화 이름 완전 일치 → 가장 긴 포함 이름 → 문자 bigram Dice 유사도 순.
+
+사용 예:
+    from utils.nutrition_reference import check_payload, estimate_macros
+    validated = check_payload(validate_payload(parsed))
+    macros, source = estimate_macros("현미밥 한 공기")   # ({...}, "db")
+"""
+import re
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional
+
+import config
+
+FoodRef = namedtuple("FoodRef", ["key", "name_ko", "serving_g", "kcal", "carb_g", "protein_g", "fat_g", "aliases"])
+
+# key, name_ko, 1인분(g), kcal, 탄수화물, 단백질, 지방, 별칭
+_TABLE = [
+    # 밥 / 면 / 분식
+    ("white_rice", "쌀밥", 210, 313, 68.0, 5.5, 0.6, ("공기밥", "흰쌀밥", "밥", "rice", "steamed_rice")),
+    ("brown_rice", "현미밥", 210, 300, 64.0, 6.5, 1.9, ()),
+    ("multigrain_rice", "잡곡밥", 210, 305, 66.0, 6.8, 1.2, ("mixed_grain_rice",)),
+    ("bibimbap", "비빔밥", 450, 595, 95.0, 20.0, 15.0, ()),
+    ("kimchi_bokkeumbap", "김치볶음밥", 350, 556, 80.0, 14.0, 20.0, ("kimchi_fried_rice",)),
+    ("gimbap", "김밥", 230, 447, 75.0, 12.0, 11.0, ("kimbap",)),
+    ("tteokbokki", "떡볶이", 300, 476, 100.0, 10.0, 4.0, ("topokki",)),
+    ("ramyeon", "라면", 550, 496, 78.0, 10.0, 16.0, ("ramen", "ramyun")),
+    ("naengmyeon", "물냉면", 600, 476, 95.0, 15.0, 4.0, ("냉면", "cold_noodles")),
+    ("kalguksu", "칼국수", 700, 552, 100.0, 20.0, 8.0, ()),
+    ("jjajangmyeon", "짜장면", 650, 794, 120.0, 20.0, 26.0, ("jajangmyeon", "자장면")),
+    ("jjamppong", "짬뽕", 900, 691, 100.0, 30.0, 19.0, ("jjambbong",)),
+    ("japchae", "잡채", 150, 284, 38.0, 6.0, 12.0, ()),
+    ("mandu", "만두", 150, 357, 38.0, 13.0, 17.0, ("군만두", "dumplings")),
+    ("sundae", "순대", 200, 379, 45.0, 16.0, 15.0, ()),
+    ("eomuk", "어묵", 100, 140, 15.0, 10.0, 4.5, ("오뎅", "fish_cake")),
+    ("toast", "토스트", 150, 374, 40.0, 13.0, 18.0, ()),
+    # 국 / 찌개 / 탕
+    ("doenjang_jjigae", "된장찌개", 400, 129, 10.0, 10.0, 5.5, ("soybean_paste_stew",)),
+    ("kimchi_jjigae", "김치찌개", 400, 222, 10.0, 14.0, 14.0, ("kimchi_stew",)),
+    ("sundubu_jjigae", "순두부찌개", 400, 200, 8.0, 15.0, 12.0, ("soft_tofu_stew",)),
+    ("budae_jjigae", "부대찌개", 500, 595, 40.0, 30.0, 35.0, ()),
+    ("miyeokguk", "미역국", 400, 89, 4.0, 7.0, 5.0, ("seaweed_soup",)),
+    ("kongnamulguk", "콩나물국", 400, 50, 5.0, 4.0, 1.5, ("bean_sprout_soup",)),
+    ("galbitang", "갈비탕", 600, 376, 10.0, 30.0, 24.0, ()),
+    ("seolleongtang", "설렁탕", 600, 295, 10.0, 30.0, 15.0, ()),
+    ("samgyetang", "삼계탕", 900, 905, 40.0, 85.0, 45.0, ()),
+    ("gamjatang", "감자탕", 600, 642, 30.0, 45.0, 38.0, ()),
+    # 고기 / 생선 / 메인 반찬
+    ("bulgogi", "불고기", 200, 372, 18.0, 30.0, 20.0, ("소불고기",)),
+    ("jeyuk_bokkeum", "제육볶음", 200, 442, 15.0, 28.0, 30.0, ("spicy_pork", "jeyuk")),
+    ("galbijjim", "갈비찜", 250, 496, 20.0, 32.0, 32.0, ()),
+    ("dwaeji_galbi", "돼지갈비", 250, 594, 25.0, 38.0, 38.0, ("pork_galbi",)),
+    ("samgyeopsal", "삼겹살", 150, 514, 0.0, 25.0, 46.0, ("pork_belly",)),
+    ("bossam", "보쌈", 200, 557, 2.0, 36.0, 45.0, ()),
+    ("jokbal", "족발", 200, 481, 2.0, 44.0, 33.0, ()),
+    ("dakgalbi", "닭갈비", 300, 443, 30.0, 38.0, 19.0, ()),
+    ("dakbokkeumtang", "닭볶음탕", 400, 514, 25.0, 45.0, 26.0, ("닭도리탕",)),
+    ("fried_chicken", "후라이드치킨", 250, 696, 25.0, 50.0, 44.0, ("치킨", "프라이드치킨")),
+    ("yangnyeom_chicken", "양념치킨", 250, 756, 45.0, 45.0, 44.0, ()),
+    ("tangsuyuk", "탕수육", 200, 516, 55.0, 20.0, 24.0, ("sweet_and_sour_pork",)),
+    ("donkatsu", "돈가스", 250, 642, 45.0, 30.0, 38.0, ("tonkatsu", "돈까스")),
+    ("ojingeo_bokkeum", "오징어볶음", 200, 235, 15.0, 28.0, 7.0, ("stir_fried_squid",)),
+    ("godeungeo_gui", "고등어구이", 150, 372, 0.0, 30.0, 28.0, ("grilled_mackerel",)),
+    ("chicken_breast", "닭가슴살", 100, 106, 0.0, 23.0, 1.5, ()),
+    ("chicken_breast_salad", "닭가슴살 샐러드", 250, 249, 12.0, 30.0, 9.0, ()),
+    ("pajeon", "파전", 200, 419, 50.0, 12.0, 19.0, ("haemul_pajeon", "해물파전")),
+    # 계란 / 두부 / 밑반찬
+    ("gyeran_mari", "계란말이", 100, 169, 3.0, 11.0, 12.5, ("rolled_omelette", "gyeranmari")),
+    ("fried_egg", "계란프라이", 50, 100, 0.5, 6.5, 8.0, ("계란후라이",)),
+    ("tofu", "두부", 100, 89, 2.0, 9.0, 5.0, ()),
+    ("dubu_jorim", "두부조림", 150, 183, 8.0, 13.0, 11.0, ("braised_tofu",)),
+    ("jangjorim", "장조림", 60, 108, 4.0, 15.0, 3.5, ()),
+    ("gamja_jorim", "감자조림", 80, 92, 17.0, 1.5, 2.0, ("braised_potatoes",)),
+    ("myeolchi_bokkeum", "멸치볶음", 30, 91, 9.0, 7.0, 3.0, ()),
+    ("kongnamul_muchim", "콩나물무침", 70, 38, 3.0, 3.0, 1.5, ("bean_sprout_salad",)),
+    ("sigeumchi_namul", "시금치나물", 70, 40, 3.0, 2.5, 2.0, ("spinach_namul",)),
+    ("kimchi", "배추김치", 50, 12, 1.9, 1.0, 0.3, ("김치", "baechu_kimchi")),
+    ("kkakdugi", "깍두기", 50, 17, 3.3, 0.8, 0.2, ("radish_kimchi",)),
+    ("danmuji", "단무지", 30, 9, 2.1, 0.2, 0.0, ("yellow_pickled_radish",)),
+    ("raw_onion", "양파", 50, 18, 4.0, 0.5, 0.0, ("onion",)),
+    # 샐러드 / 간식 / 음료
+    ("green_salad", "샐러드", 150, 41, 7.0, 2.0, 0.5, ("salad",)),
+    ("sweet_potato", "고구마", 150, 194, 46.0, 2.0, 0.2, ()),
+    ("banana", "바나나", 120, 112, 27.0, 1.3, 0.4, ()),
+    ("apple", "사과", 200, 105, 27.0, 0.5, 0.3, ()),
+    ("milk", "우유", 200, 127, 9.5, 6.5, 7.0, ()),
+]
+
+FOODS: List[FoodRef] = [FoodRef(*row) for row in _TABLE]
+
+
+def normalize_key(value: str) -> str:
+    """영문 key 정규화: 소문자, 공백/하이픈 → 밑줄."""
+    return re.sub(r"[\s\-]+", "_", (value or "").strip().lower())
+
+
+def normalize_name(value: str) -> str:
+    """한글 이름 정규화: 공백과 괄호 설명 제거."""
+    value = re.sub(r"\(.*?\)", "", value or "")
+    return re.sub(r"\s+", "", value).lower()
+
+
+_BY_KEY: Dict[str, FoodRef] = {}
+_BY_NAME: Dict[str, FoodRef] = {}
+for _ref in FOODS:
+    _BY_KEY[_ref.key] = _ref
+    _BY_NAME[normalize_name(_ref.name_ko)] = _ref
+    for _alias in _ref.aliases:
+        if re.search(r"[가-힣]", _alias):
+            _BY_NAME.setdefault(normalize_name(_alias), _ref)
+        else:
+            _BY_KEY.setdefault(normalize_key(_alias), _ref)
+
+
+def _bigrams(value: str) -> set:
+    return {value[i : i + 2] for i in range(len(value) - 1)} if len(value) > 1 else {value}
+
+
+# 포함 검색은 긴 이름부터 (예: "현미밥 한 공기" → 현미밥, 밥 중 현미밥)
+_NAMES_BY_LENGTH = sorted((n for n in _BY_NAME if len(n) >= 2), key=len, reverse=True)
+_BIGRAM_INDEX: Dict[str, set] = defaultdict(set)
+for _name in _BY_NAME:
+    for _bg in _bigrams(_name):
+        _BIGRAM_INDEX[_bg].add(_name)
+
+
+@lru_cache(maxsize=4096)
+def match_name(name: str) -> Optional[FoodRef]:
+    """추천 식단 항목 이름(자유 형식 한국어)으로 기준 항목을 찾습니다. 없으면 None."""
+    query = normalize_name(name)
+    if not query:
+        return None
+    ref = _BY_NAME.get(query) or _BY_KEY.get(normalize_key(name))
+    if ref:
+        return ref
+
+    for known in _NAMES_BY_LENGTH:
+        if known in query and len(known) / len(query) >= config.NUTRITION_CONTAIN_RATIO:
+            return _BY_NAME[known]
+
+    grams = _bigrams(query)
+    counts: Dict[str, int] = defaultdict(int)
+    for bg in grams:
+        for known in _BIGRAM_INDEX.get(bg, ()):
+            counts[known] += 1
+    best, best_score = None, 0.0
+    for known, hit in counts.items():
+        score = 2 * hit / (len(grams) + len(_bigrams(known)))
+        if score > best_score:
+            best, best_score = known, score
+    if best is not None and best_score >= config.NUTRITION_FUZZY_THRESHOLD:
+        return _BY_NAME[best]
+    return None
+
+
+# 기준표에 없는 항목용 대략값 (1인분, 키워드 순서대로 먼저 맞는 것)
+_CATEGORY_MACROS = [
+    ("soup", ("찌개", "전골", "탕", "국"), {"protein_g": 10.0, "carb_g": 8.0, "fat_g": 6.0}),
+    ("noodle", ("국수", "면", "파스타", "우동"), {"protein_g": 15.0, "carb_g": 80.0, "fat_g": 10.0}),
+    ("rice", ("밥", "죽", "리조또"), {"protein_g": 7.0, "carb_g": 65.0, "fat_g": 2.0}),
+    ("fish", ("생선", "연어", "고등어", "참치", "삼치", "갈치", "새우", "오징어"), {"protein_g": 22.0, "carb_g": 2.0, "fat_g": 10.0}),
+    ("meat", ("고기", "닭", "돼지", "소고기", "불고기", "갈비", "스테이크", "구이", "볶음", "찜"), {"protein_g": 25.0, "carb_g": 10.0, "fat_g": 15.0}),
+    ("egg_tofu", ("계란", "달걀", "두부"), {"protein_g": 10.0, "carb_g": 3.0, "fat_g": 7.0}),
+    ("vegetable", ("나물", "무침", "김치", "샐러드", "채소", "조림", "장아찌"), {"protein_g": 2.0, "carb_g": 6.0, "fat_g": 2.0}),
+    ("fruit", ("과일", "사과", "바나나", "귤", "딸기", "포도", "키위", "베리"), {"protein_g": 1.0, "carb_g": 20.0, "fat_g": 0.3}),
+    ("drink", ("우유", "두유", "요거트", "요구르트", "주스", "라떼", "스무디", "차"), {"protein_g": 4.0, "carb_g": 12.0, "fat_g": 3.0}),
+]
+_DEFAULT_MACROS = {"protein_g": 8.0, "carb_g": 15.0, "fat_g": 6.0}
+
+
+@lru_cache(maxsize=4096)
+def estimate_macros(name: str):
+    """
+    식단 항목 이름으로 1인분 탄단지를 정합니다.
+    반환: (macros, source)  source = "db"(기준표) | "category"(분류별 대략값)
+    macros는 캐시된 읽기 전용 매핑이므로 수정하려면 dict(macros)로 복사하세요.
+    """
+    ref = match_name(name or "")
+    if ref is not None:
+        return MappingProxyType({"protein_g": ref.protein_g, "carb_g": ref.carb_g, "fat_g": ref.fat_g}), "db"
+    query = normalize_name(name)
+    for _, keywords, macros in _CATEGORY_MACROS:
+        if any(k in query for k in keywords):
+            return MappingProxyType(macros), "category"
+    return MappingProxyType(_DEFAULT_MACROS), "category"
+
+
+def lookup(key: str = None, name_ko: str = None) -> Optional[FoodRef]:
+    """영문 key 또는 name_ko로 기준 항목을 찾습니다. 없으면 None."""
+    if name_ko:
+        ref = _BY_NAME.get(normalize_name(name_ko))
+        if ref:
+            return ref
+    if key:
+        return _BY_KEY.get(normalize_key(key))
+    return None
+
+
+def macro_kcal(carb_g: float, protein_g: float, fat_g: float) -> float:
+    return 4 * carb_g + 4 * protein_g + 9 * fat_g
+
+
+def _scaled(ref: FoodRef, grams: float) -> Dict[str, float]:
+    factor = grams / ref.serving_g
+    return {
+        "kcal": round(ref.kcal * factor, 1),
+        "carb_g": round(ref.carb_g * factor, 1),
+        "protein_g": round(ref.protein_g * factor, 1),
+        "fat_g": round(ref.fat_g * factor, 1),
+    }
+
+
+def check_item(key: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    항목 하나를 점검해 보정한 사본을 반환합니다.
+
+    추가 필드:
+    - macro_confidence: high(기준표와 일치) / medium(산술만 일치 또는 산술로 보정) / low(기준값으로 대체 또는 검증 불가)
+    - corrections: 보정 사유 목록 (보정한 경우에만)
+    """
+    tolerance = config.NUTRITION_KCAL_TOLERANCE
+    range_tolerance = config.NUTRITION_RANGE_TOLERANCE
+
+    out = dict(item)
+    kcal = float(out.get("kcal", 0) or 0)
+    carb, prot, fat = (float(out.get(k, 0) or 0) for k in ("carb_g", "protein_g", "fat_g"))
+    computed = macro_kcal(carb, prot, fat)
+    has_macros = computed > 0
+    consistent = has_macros and kcal > 0 and abs(kcal - computed) <= tolerance * max(kcal, computed)
+
+    ref = lookup(key, out.get("name_ko"))
+    corrections = []
+
+    if ref is not None:
+        portion = out.get("portion_g")
+        # 모델이 준 분량이 기준 1인분과 너무 동떨어지면 믿지 않습니다.
+        grams = portion if portion and 0.3 <= portion / ref.serving_g <= 3 else ref.serving_g
+        expected = _scaled(ref, grams)
+        lo, hi = expected["kcal"] * (1 - range_tolerance), expected["kcal"] * (1 + range_tolerance)
+        candidate = kcal if consistent or not has_macros else computed
+
+        if not (lo <= candidate <= hi):
+            out.update(expected)
+            corrections.append("out_of_reference_range")
+            confidence = "low"
+        elif not consistent:
+            if has_macros:
+                out["kcal"] = round(computed, 1)
+                corrections.append("kcal_from_macros")
+            else:
+                # kcal만 있고 탄단지가 비어 있으면 기준표 비율로 나눕니다.
+                factor = kcal / expected["kcal"] if expected["kcal"] else 0
+                for k in ("carb_g", "protein_g", "fat_g"):
+                    out[k] = round(expected[k] * factor, 1)
+                corrections.append("macros_from_reference_ratio")
+            confidence = "medium"
+        else:
+            confidence = "high"
+    elif consistent:
+        confidence = "medium"
+    elif has_macros:
+        out["kcal"] = round(computed, 1)
+        corrections.append("kcal_from_macros")
+        confidence = "medium"
+    else:
+        confidence = "low"
+
+    out["macro_confidence"] = confidence
+    if corrections:
+        out["corrections"] = corrections
+    return out
+
+
+def check_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    validate_payload 결과 전체를 점검합니다.
+    보정된 항목이 있으면 total의 kcal/탄단지를 항목 합계로 다시 계산합니다.
+    """
+    items = payload.get("items", {})
+    checked = {k: check_item(k, v) for k, v in items.items()}
+    result = dict(payload)
+    result["items"] = checked
+
+    if any("corrections" in v for v in checked.values()):
+        total = dict(payload.get("total", {}))
+        for k in ("kcal", "carb_g", "protein_g", "fat_g"):
+            total[k] = round(sum(v.get(k, 0) for v in checked.values()), 1)
+        result["total"] = total
+    return result
@@ -0,0 +1,105 @@
+"""
+OpenAI 클라이언트 공용 레지스트리
+
+- 프로세스 전체에서 sync / async 클라이언트를 각각 하나만 만들어 재사용합니다.
+  (요청마다 OpenAI(...)를 새로 만들면 매번 TLS 핸드셰이크가 발생합니다.)
+- 커넥션 풀 크기, keep-alive, 타임아웃은 config.py 설정을 따릅니다.
+- sync 클라이언트는 httpx.Client, async 클라이언트는 httpx.AsyncClient 풀을 사용합니다.
+  (httpx 특성상 두 풀은 공유할 수 없으므로 각각 한 개씩 유지합니다.)
+
+사용 예:
+    from utils.openai_client import get_openai_client
+    client = get_openai_client()
+    if client:
+        client.chat.completions.create(...)
+"""
+import threading
+
+import config
+
+# 선택적 임포트 - 라이브러리가 없어도 애플리케이션이 실행되도록 함
+try:
+    import httpx
+    from openai import OpenAI, AsyncOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+_lock = threading.Lock()
+_sync_client = None
+_async_client = None
+
+
+def _http_limits():
+    return httpx.Limits(
+        max_connections=config.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _http_timeout():
+    return httpx.Timeout(
+        config.OPENAI_TIMEOUT,
+        connect=config.OPENAI_CONNECT_TIMEOUT,
+    )
+
+
+def get_openai_client():
+    """공유 sync OpenAI 클라이언트. 라이브러리/키가 없으면 None."""
+    global _sync_client
+    if _sync_client is not None:
+        return _sync_client
+    if not OPENAI_AVAILABLE or not config.OPENAI_API_KEY:
+        return None
+
+    with _lock:
+        if _sync_client is None:
+            try:
+                http_client = httpx.Client(limits=_http_limits(), timeout=_http_timeout())
+                _sync_client = OpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    http_client=http_client,
+                    timeout=_http_timeout(),
+                    max_retries=config.OPENAI_MAX_RETRIES,
+                )
+            except Exception as e:
+                print(f"OpenAI 클라이언트 초기화 실패: {e}")
+                _sync_client = None
+    return _sync_client
+
+
+def get_async_openai_client():
+    """공유 async OpenAI 클라이언트. 라이브러리/키가 없으면 None."""
+    global _async_client
+    if _async_client is not None:
+        return _async_client
+    if not OPENAI_AVAILABLE or not config.OPENAI_API_KEY:
+        return None
+
+    with _lock:
+        if _async_client is None:
+            try:
+                http_client = httpx.AsyncClient(limits=_http_limits(), timeout=_http_timeout())
+                _async_client = AsyncOpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    http_client=http_client,
+                    timeout=_http_timeout(),
+                    max_retries=config.OPENAI_MAX_RETRIES,
+                )
+            except Exception as e:
+                print(f"OpenAI async 클라이언트 초기화 실패: {e}")
+                _async_client = None
+    return _async_client
+
+
+async def close_openai_clients():
+    """애플리케이션 종료 시 커넥션 풀을 정리합니다."""
+    global _sync_client, _async_client
+    with _lock:
+        sync_client, _sync_client = _sync_client, None
+        async_client, _async_client = _async_client, None
+    if sync_client is not None:
+        sync_client.close()
+    if async_client is not None:
+        await async_client.close()
@@ -0,0 +1,58 @@
+"""
+키셋(커서) 페이지네이션
+
+OFFSET은 앞 페이지 행을 모두 읽고 버리므로 깊은 페이지일수록 느려집니다.
+대신 정렬 키(자동 증가 PK) 기준으로 "마지막으로 본 값보다 작은 것"을 LIMIT 만큼 읽습니다.
+(user_no, PK) 인덱스를 그대로 타므로 몇 번째 페이지든 비용이 같고, 중간에 새 행이 들어와도 중복/누락이 없습니다.
+
+커서는 클라이언트가 그대로 돌려보내는 불투명 문자열입니다 (마지막 키를 담은 base64url JSON).
+
+사용 예:
+    after = decode_cursor(cursor)                       # 첫 페이지면 None
+    q = q.filter(Model.no < after) if after else q
+    rows = q.order_by(Model.no.desc()).limit(limit + 1).all()
+    return page(rows, limit, key=lambda r: r.no)
+"""
+import base64
+import json
+from typing import Callable, Optional
+
+import config
+
+CURSOR_VERSION = 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return config.HISTORY_PAGE_SIZE
+    return min(limit, config.HISTORY_PAGE_MAX)
+
+
+def encode_cursor(last_key: int) -> str:
+    raw = json.dumps({"v": CURSOR_VERSION, "k": last_key}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """커서 → 마지막으로 본 키. 비어 있으면 None(첫 페이지), 형식이 틀리면 InvalidCursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if data.get("v") != CURSOR_VERSION or not isinstance(data.get("k"), int):
+            raise ValueError
+    except (ValueError, AttributeError) as e:
+        raise InvalidCursor("잘못된 커서입니다.") from e
+    return data["k"]
+
+
+def page(rows: list, limit: int, key: Callable) -> dict:
+    """limit + 1 개를 읽은 rows → {"items": 최대 limit 개, "next_cursor": 다음 페이지 커서 또는 None}"""
+    items = rows[:limit]
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,240 @@
+"""
+외부 호출 공용 재시도 / 백오프 / 서킷 브레이커
+
+모든 외부 의존성(OpenAI chat·vision, OpenAI images, YouTube, S3) 호출은 이 모듈을 거칩니다.
+- 재시도: 지터를 섞은 지수 백오프 (full jitter)
+- 데드라인: 전체 소요 시간이 deadline을 넘길 것 같으면 더 기다리지 않고 바로 실패
+- 서킷 브레이커: 의존성별로 연속 실패가 RESILIENCE_FAILURE_THRESHOLD 회 쌓이면 열리고,
+  RESILIENCE_RECOVERY_SECONDS 동안은 호출 없이 즉시 CircuitOpenError를 던집니다.
+  이후 한 번 시험 호출(half-open)에 성공하면 다시 닫힙니다.
+
+일시적 오류(타임아웃, 연결 오류, 429, 5xx)만 재시도/실패 집계 대상입니다.
+잘못된 요청(4xx) 같은 오류는 재시도하지 않고 그대로 전달합니다.
+
+사용 예:
+    from utils.resilience import call_with_retry
+    resp = call_with_retry(client.chat.completions.create, breaker="openai_chat", **kwargs)
+"""
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+import config
+
+OPENAI_CHAT = "openai_chat"
+OPENAI_IMAGES = "openai_images"
+YOUTUBE = "youtube"
+S3 = "s3"
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷이 열려 있어 호출하지 않고 바로 실패한 경우."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} 서비스가 일시적으로 불안정합니다. {retry_after:.0f}초 후 다시 시도하세요.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """재시도 중 데드라인을 넘긴 경우."""
+
+
+# =====================
+# Transient error 판별
+# =====================
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    for attr in ("status_code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)  # requests HTTPError
+    if isinstance(getattr(response, "status_code", None), int):
+        return response.status_code
+    resp = getattr(exc, "resp", None)  # googleapiclient HttpError
+    value = getattr(resp, "status", None)
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """재시도할 가치가 있는 오류인지 (타임아웃/연결 오류/429/5xx)."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    name = type(exc).__name__
+    if name in (
+        "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",  # openai
+        "EndpointConnectionError", "ConnectionClosedError", "ReadTimeoutError",
+        "ConnectTimeoutError",  # botocore
+        "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError",  # httpx
+        "ConnectionError", "Timeout",  # requests
+        "YouTubeRequestFailed",  # youtube-transcript-api
+    ):
+        return True
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):  # botocore ClientError
+        err = response.get("Error", {}).get("Code", "")
+        http = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if err in ("Throttling", "ThrottlingException", "SlowDown", "RequestTimeout") or (http and http >= 500):
+            return True
+    status = _status_of(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+# =====================
+# Circuit breaker
+# =====================
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """호출 가능하면 그대로 반환, 아니면 CircuitOpenError."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                # half-open 상태에서는 시험 호출 하나만 통과시킵니다.
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.name, self.recovery_timeout)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """일시적 오류가 아닌 실패(4xx 등) 후 시험 호출 슬롯만 반환합니다."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": self.name, "state": self.state, "failures": self.failures}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=config.RESILIENCE_FAILURE_THRESHOLD,
+                recovery_timeout=config.RESILIENCE_RECOVERY_SECONDS,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> list:
+    with _breakers_lock:
+        return [b.snapshot() for b in _breakers.values()]
+
+
+# =====================
+# Retry
+# =====================
+
+def backoff_delays(retries: int, base: float = None, cap: float = None):
+    """full-jitter 지수 백오프 대기 시간 (retries 개)."""
+    base = config.RESILIENCE_BASE_DELAY if base is None else base
+    cap = config.RESILIENCE_MAX_DELAY if cap is None else cap
+    for attempt in range(retries):
+        yield random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _plan(retries, deadline):
+    retries = config.RESILIENCE_RETRIES if retries is None else retries
+    deadline = config.RESILIENCE_DEADLINE_SECONDS if deadline is None else deadline
+    return retries, deadline
+
+
+def _should_retry(exc, give_up_on) -> bool:
+    if give_up_on and isinstance(exc, give_up_on):
+        return False
+    return is_transient(exc)
+
+
+def call_with_retry(
+    fn: Callable,
+    *args,
+    breaker: str,
+    retries: Optional[int] = None,
+    deadline: Optional[float] = None,
+    give_up_on: Tuple[Type[BaseException], ...] = (),
+    timeout_kwarg: Optional[str] = None,
+    **kwargs,
+):
+    """
+    fn(*args, **kwargs)를 서킷 브레이커 + 백오프 재시도로 호출합니다.
+
+    - give_up_on: 재시도/실패 집계 없이 바로 다시 던질 예외 타입
+    - timeout_kwarg: 지정하면 남은 데드라인을 해당 키워드 인자로 넘겨 한 번의 호출이 데드라인을 넘지 않게 합니다.
+      (OpenAI SDK 호출은 timeout_kwarg="timeout". 호출 쪽이 같은 인자를 직접 넘겼으면 둘 중 작은 값)
+    """
+    retries, deadline = _plan(retries, deadline)
+    cb = get_breaker(breaker)
+    started = time.monotonic()
+    delays = backoff_delays(retries)
+
+    while True:
+        cb.before_call()
+        remaining = deadline - (time.monotonic() - started) if deadline else None
+        if remaining is not None and remaining <= 0:
+            cb.release()
+            raise DeadlineExceeded(f"{breaker} 호출 데드라인({deadline}s) 초과")
+        call_kwargs = dict(kwargs)
+        if timeout_kwarg and remaining is not None:
+            own = call_kwargs.get(timeout_kwarg)
+            call_kwargs[timeout_kwarg] = min(own, remaining) if isinstance(own, (int, float)) else remaining
+        try:
+            result = fn(*args, **call_kwargs)
+        except Exception as e:
+            if not _should_retry(e, give_up_on):
+                cb.release()
+                raise
+            cb.record_failure()
+            delay = next(delays, None)
+            if delay is None:
+                raise
+            if deadline and time.monotonic() - started + delay >= deadline:
+                raise
+            time.sleep(delay)
+            continue
+        cb.record_success()
+        return result
+
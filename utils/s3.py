@@ -1,3 +1,5 @@
+import asyncio
+import io
 import boto3
 import traceback
 import uuid
@@ -5,6 +7,8 @@ import os
 from botocore.exceptions import NoCredentialsError
 from fastapi import UploadFile
 from dotenv import load_dotenv
+import config
+from utils.resilience import S3, CircuitOpenError, call_with_retry
 
 load_dotenv()
 
@@ -60,27 +64,100 @@ def upload_file_to_s3(
 
         # ▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲▲
 
-        # S3에 저장될 최종 파일 경로를 구성합니다.
-        object_name = f"{save_path}/{user_no}/{uuid.uuid4()}-{filename}"
+        start = file_to_upload.tell() if hasattr(file_to_upload, "seek") else None
 
-        # 파일 업로드
-        s3_client.upload_fileobj(
-            file_to_upload,
-            AWS_S3_BUCKET_NAME,
-            object_name,
-            ExtraArgs={'ContentType': content_type}
-        )
+        def _attempt():
+            # 재시도 시 앞선 시도에서 읽은 위치부터 올리지 않도록 처음으로 되돌립니다.
+            if start is not None:
+                file_to_upload.seek(start)
+            return _put_fileobj(file_to_upload, filename, content_type, user_no, save_path)
 
-        # 업로드된 파일의 URL 생성
-        file_url = f"https://{AWS_S3_BUCKET_NAME}.s3.{AWS_S3_REGION}.amazonaws.com/{object_name}"
+        return call_with_retry(_attempt, breaker=S3, retries=config.S3_UPLOAD_RETRIES)
 
-        print(f"S3 업로드 성공: {file_url}")
-        return file_url
+    except CircuitOpenError as e:
+        print(f"S3 업로드 건너뜀: {e}")
+        return None
+    except NoCredentialsError:
+        print("AWS 자격 증명을 찾을 수 없습니다.")
+        return None
+    except Exception as e:
+        print(f"S3 업로드 중 오류 발생: {e}")
+        traceback.print_exc()
+        return None
 
+
+def _put_fileobj(file_to_upload, filename: str, content_type: str, user_no: int, save_path: str) -> str:
+    # S3에 저장될 최종 파일 경로를 구성합니다.
+    object_name = f"{save_path}/{user_no}/{uuid.uuid4()}-{filename}"
+
+    # 파일 업로드
+    s3_client.upload_fileobj(
+        file_to_upload,
+        AWS_S3_BUCKET_NAME,
+        object_name,
+        ExtraArgs={'ContentType': content_type or 'application/octet-stream'}
+    )
+
+    # 업로드된 파일의 URL 생성
+    file_url = f"https://{AWS_S3_BUCKET_NAME}.s3.{AWS_S3_REGION}.amazonaws.com/{object_name}"
+
+    print(f"S3 업로드 성공: {file_url}")
+    return file_url
+
+
+def upload_bytes_to_s3(
+    data: bytes,
+    filename: str,
+    user_no: int,
+    save_path: str = "user_eats",
+    content_type: str = None,
+    retries: int = None,
+):
+    """
+    메모리에 있는 바이트를 S3에 업로드하고 URL을 반환합니다. 실패 시 None.
+    호출마다 새 BytesIO로 감싸므로 같은 버퍼를 다른 작업(이미지 분석 등)과 동시에 써도 안전합니다.
+    """
+    try:
+        return call_with_retry(
+            lambda: _put_fileobj(io.BytesIO(data), filename or "upload", content_type, user_no, save_path),
+            breaker=S3,
+            retries=config.S3_UPLOAD_RETRIES if retries is None else retries,
+        )
+    except CircuitOpenError as e:
+        print(f"S3 업로드 건너뜀: {e}")
+        return None
     except NoCredentialsError:
         print("AWS 자격 증명을 찾을 수 없습니다.")
         return None
     except Exception as e:
         print(f"S3 업로드 중 오류 발생: {e}")
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+
+async def upload_bytes_to_s3_with_retry(
+    data: bytes,
+    filename: str,
+    user_no: int,
+    save_path: str = "user_eats",
+    content_type: str = None,
+    retries: int = None,
+):
+    """
+    upload_bytes_to_s3를 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+    재시도/서킷 브레이커는 utils.resilience가 처리하며, 모든 시도가 실패하면 None.
+    """
+    return await asyncio.to_thread(upload_bytes_to_s3, data, filename, user_no, save_path, content_type, retries)
+
+
+def delete_s3_object_by_url(file_url: str) -> bool:
+    """upload_*가 반환한 URL의 객체를 삭제합니다 (best-effort)."""
+    prefix = f"https://{AWS_S3_BUCKET_NAME}.s3.{AWS_S3_REGION}.amazonaws.com/"
+    if not file_url or not file_url.startswith(prefix):
+        return False
+    try:
+        s3_client.delete_object(Bucket=AWS_S3_BUCKET_NAME, Key=file_url[len(prefix):])
+        return True
+    except Exception as e:
+        print(f"S3 객체 삭제 실패: {e}")
+        return False
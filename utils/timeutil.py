@@ -0,0 +1,94 @@
+"""
+시간대 / 날짜 범위 유틸
+
+DB의 created_at 같은 DateTime 컬럼은 시간대 없는(naive) 값이며, DB_TIMEZONE 기준 시각으로 저장합니다.
+(DB_TIMEZONE을 비워 두면 서버 로컬 시간 = 기존 datetime.now 기본값과 같습니다.)
+
+날짜 조회는 컬럼을 함수로 감싸지 않고(func.date(created_at) == d 는 인덱스를 못 탐)
+사용자 시간대의 하루/주/월을 DB 시각의 반열린 구간 [start, end)로 바꿔 비교합니다.
+    start, end = local_day_bounds(d, tz)
+    .filter(Model.created_at >= start, Model.created_at < end)
+"""
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import config
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = KeyError
+
+PERIODS = ("day", "week", "month")
+
+
+class InvalidTimezone(ValueError):
+    pass
+
+
+@lru_cache(maxsize=128)
+def get_zone(name: Optional[str]) -> tzinfo:
+    """IANA 시간대 이름 → tzinfo. 비어 있으면 DEFAULT_USER_TIMEZONE, 잘못된 이름이면 InvalidTimezone."""
+    name = name or config.DEFAULT_USER_TIMEZONE
+    if ZoneInfo is None:
+        raise InvalidTimezone("zoneinfo를 사용할 수 없습니다 (Python 3.9+ 필요, Windows는 tzdata 패키지 필요).")
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise InvalidTimezone(f"알 수 없는 시간대입니다: {name}") from e
+
+
+def _db_zone() -> Optional[tzinfo]:
+    return get_zone(config.DB_TIMEZONE) if config.DB_TIMEZONE else None
+
+
+def db_now() -> datetime:
+    """DB에 저장할 현재 시각 (DB_TIMEZONE 기준 naive)."""
+    zone = _db_zone()
+    return datetime.now(zone).replace(tzinfo=None) if zone else datetime.now()
+
+
+def to_db_time(aware: datetime) -> datetime:
+    """시간대가 있는 시각 → DB 컬럼과 비교할 naive 시각."""
+    zone = _db_zone()
+    return aware.astimezone(zone).replace(tzinfo=None) if zone else aware.astimezone().replace(tzinfo=None)
+
+
+def local_date_of(db_time: datetime, tz_name: Optional[str] = None) -> date:
+    """DB 시각(naive) → 사용자 시간대의 날짜."""
+    zone = _db_zone()
+    aware = db_time.replace(tzinfo=zone) if zone else db_time.astimezone()
+    return aware.astimezone(get_zone(tz_name)).date()
+
+
+def today_in(tz_name: Optional[str] = None) -> date:
+    """사용자 시간대의 오늘 날짜."""
+    return datetime.now(get_zone(tz_name)).date()
+
+
+def local_range_bounds(start_day: date, end_day: date, tz_name: Optional[str] = None) -> Tuple[datetime, datetime]:
+    """사용자 시간대의 start_day 0시 ~ end_day 다음날 0시 → DB 시각 반열린 구간 [start, end)."""
+    zone = get_zone(tz_name)
+    start = datetime.combine(start_day, time.min, tzinfo=zone)
+    end = datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=zone)
+    return to_db_time(start), to_db_time(end)
+
+
+def local_day_bounds(day: date, tz_name: Optional[str] = None) -> Tuple[datetime, datetime]:
+    return local_range_bounds(day, day, tz_name)
+
+
+def period_days(period: str, anchor: date) -> Tuple[date, date]:
+    """anchor가 속한 하루/주(월요일 시작)/월의 첫날과 마지막 날 (둘 다 포함)."""
+    if period == "day":
+        return anchor, anchor
+    if period == "week":
+        first = anchor - timedelta(days=anchor.weekday())
+        return first, first + timedelta(days=6)
+    if period == "month":
+        first = anchor.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        return first, next_month - timedelta(days=1)
+    raise ValueError(f"period는 {', '.join(PERIODS)} 중 하나여야 합니다: {period}")